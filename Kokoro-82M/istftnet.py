@@ -23,12 +23,18 @@ class AdaIN1d(nn.Module):
         super().__init__()
         self.norm = nn.InstanceNorm1d(num_features, affine=False)
         self.fc = nn.Linear(style_dim, num_features*2)
+        # (1 + gamma, beta) precomputed by models.StyleCache; used instead of fc(s) when set
+        self.cached_style = None
 
-    def forward(self, x, s):
+    def style_params(self, s):
         h = self.fc(s)
         h = h.view(h.size(0), h.size(1), 1)
         gamma, beta = torch.chunk(h, chunks=2, dim=1)
-        return (1 + gamma) * self.norm(x) + beta
+        return 1 + gamma, beta
+
+    def forward(self, x, s):
+        scale, beta = self.cached_style if self.cached_style is not None else self.style_params(s)
+        return scale * self.norm(x) + beta
 
 class AdaINResBlock1(torch.nn.Module):
     def __init__(self, channels, kernel_size=3, dilation=(1, 3, 5), style_dim=64):
@@ -92,7 +98,9 @@ class TorchSTFT(torch.nn.Module):
         self.filter_length = filter_length
         self.hop_length = hop_length
         self.win_length = win_length
-        self.window = torch.from_numpy(get_window(window, win_length, fftbins=True).astype(np.float32))
+        # Moves with the module, so no per-call host-to-device copy
+        self.register_buffer('window', torch.from_numpy(get_window(window, win_length, fftbins=True).astype(np.float32)),
+                             persistent=False)
 
     def transform(self, input_data):
         forward_transform = torch.stft(
@@ -114,6 +122,68 @@ class TorchSTFT(torch.nn.Module):
         reconstruction = self.inverse(self.magnitude, self.phase)
         return reconstruction
     
+class ConvSTFT(torch.nn.Module):
+    """TorchSTFT as fixed-weight conv1d / conv_transpose1d.
+
+    Same transform() and inverse() as TorchSTFT (centered, reflect padded,
+    onesided), with the windowed DFT bases precomputed once and the inverse
+    normalized by the overlap-added squared window, as torch.istft does.
+    For tiny transforms such as n_fft=20, hop=5 this avoids the fixed cost
+    of the FFT calls, and it uses no complex tensors, so the generator can
+    be exported to ONNX or compiled.
+    """
+
+    def __init__(self, filter_length=800, hop_length=200, win_length=800, window='hann'):
+        super().__init__()
+        assert win_length == filter_length, 'ConvSTFT needs win_length == filter_length'
+        self.filter_length = filter_length
+        self.hop_length = hop_length
+        self.win_length = win_length
+        self.bins = filter_length // 2 + 1
+
+        window = get_window(window, win_length, fftbins=True)
+        angle = 2 * np.pi * np.arange(self.bins)[:, None] * np.arange(filter_length) / filter_length
+        cos, sin = np.cos(angle), np.sin(angle)
+        # DC and Nyquist have no imaginary part
+        sin[0] = 0
+        if filter_length % 2 == 0:
+            sin[-1] = 0
+        # irfft counts every bin but DC and Nyquist twice
+        scale = np.full((self.bins, 1), 2.0)
+        scale[0] = 1
+        if filter_length % 2 == 0:
+            scale[-1] = 1
+        forward_basis = np.concatenate([cos, -sin]) * window
+        inverse_basis = np.concatenate([cos * scale, -sin * scale]) * window / filter_length
+        self.register_buffer('forward_basis', torch.from_numpy(forward_basis[:, None, :]).float(), persistent=False)
+        self.register_buffer('inverse_basis', torch.from_numpy(inverse_basis[:, None, :]).float(), persistent=False)
+        self.register_buffer('window_sq', torch.from_numpy(window[None, None, :] ** 2).float(), persistent=False)
+
+    def transform(self, input_data):
+        pad = self.filter_length // 2
+        x = F.pad(input_data.unsqueeze(1), (pad, pad), mode='reflect')
+        spec = F.conv1d(x, self.forward_basis, stride=self.hop_length)
+        # + 0.0 turns -0.0 into 0.0 so atan2 gives pi, not -pi, like torch.angle
+        real, imag = spec[:, :self.bins], spec[:, self.bins:] + 0.0
+        return torch.hypot(real, imag), torch.atan2(imag, real)
+
+    def inverse(self, magnitude, phase):
+        x = torch.cat([magnitude * torch.cos(phase), magnitude * torch.sin(phase)], dim=1)
+        y = F.conv_transpose1d(x, self.inverse_basis, stride=self.hop_length)
+        ones = torch.ones(1, 1, magnitude.shape[-1], device=magnitude.device, dtype=magnitude.dtype)
+        envelope = F.conv_transpose1d(ones, self.window_sq, stride=self.hop_length)
+        pad = self.filter_length // 2
+        return y[..., pad:-pad] / envelope[..., pad:-pad]
+
+    def forward(self, input_data):
+        self.magnitude, self.phase = self.transform(input_data)
+        return self.inverse(self.magnitude, self.phase)
+
+def randn_like(x, generator=None):
+    """torch.randn_like, which takes no generator, drawing from generator when given"""
+    return torch.randn(x.shape, dtype=x.dtype, device=x.device, generator=generator)
+
+
 class SineGen(torch.nn.Module):
     """ Definition of sine generator
     SineGen(samp_rate, harmonic_num = 0,
@@ -143,15 +213,18 @@ class SineGen(torch.nn.Module):
         self.voiced_threshold = voiced_threshold
         self.flag_for_pulse = flag_for_pulse
         self.upsample_scale = upsample_scale
+        self.register_buffer('harmonics', torch.arange(1, self.dim + 1, dtype=torch.float32), persistent=False)
 
     def _f02uv(self, f0):
         # generate uv signal
         uv = (f0 > self.voiced_threshold).type(torch.float32)
         return uv
 
-    def _f02sine(self, f0_values):
+    def _f02sine(self, f0_values, generator=None):
         """ f0_values: (batchsize, length, dim)
             where dim indicates fundamental tone and overtones
+        generator: torch.Generator for the random initial phase, or None
+            for the global RNG
         """
         # convert to F0 in rad. The interger part n can be ignored
         # because 2 * np.pi * n doesn't affect phase
@@ -159,7 +232,7 @@ class SineGen(torch.nn.Module):
 
         # initial phase noise (no noise for fundamental component)
         rand_ini = torch.rand(f0_values.shape[0], f0_values.shape[2], \
-                              device=f0_values.device)
+                              device=f0_values.device, generator=generator)
         rand_ini[:, 0] = 0
         rad_values[:, 0, :] = rad_values[:, 0, :] + rand_ini
 
@@ -221,20 +294,20 @@ class SineGen(torch.nn.Module):
             sines = torch.cos(i_phase * 2 * np.pi)
         return sines
 
-    def forward(self, f0):
+    def forward(self, f0, generator=None):
         """ sine_tensor, uv = forward(f0)
         input F0: tensor(batchsize=1, length, dim=1)
                   f0 for unvoiced steps should be 0
+        generator: torch.Generator for the initial phase and noise, or None
+                  for the global RNG
         output sine_tensor: tensor(batchsize=1, length, dim)
         output uv: tensor(batchsize=1, length, 1)
         """
-        f0_buf = torch.zeros(f0.shape[0], f0.shape[1], self.dim,
-                             device=f0.device)
         # fundamental component
-        fn = torch.multiply(f0, torch.FloatTensor([[range(1, self.harmonic_num + 2)]]).to(f0.device))
+        fn = torch.multiply(f0, self.harmonics)
 
         # generate sine waveforms
-        sine_waves = self._f02sine(fn) * self.sine_amp
+        sine_waves = self._f02sine(fn, generator) * self.sine_amp
 
         # generate uv signal
         # uv = torch.ones(f0.shape)
@@ -245,13 +318,44 @@ class SineGen(torch.nn.Module):
         #        std = self.sine_amp/3 -> max value ~ self.sine_amp
         # .       for voiced regions is self.noise_std
         noise_amp = uv * self.noise_std + (1 - uv) * self.sine_amp / 3
-        noise = noise_amp * torch.randn_like(sine_waves)
+        noise = noise_amp * randn_like(sine_waves, generator)
 
         # first: set the unvoiced part to 0 by uv
         # then: additive noise
         sine_waves = sine_waves * uv + noise
         return sine_waves, uv, noise
 
+    def forward_frames(self, f0, generator=None):
+        """ sine_tensor, uv, noise = forward_frames(f0)
+        Same as forward(f0 nearest-upsampled by upsample_scale), from F0 at
+        frame rate: tensor(batchsize, frames, 1). _f02sine linearly
+        downsamples its piecewise-constant phase increments straight back to
+        the frame values, so here they are computed and accumulated at frame
+        rate, and only the accumulated phase is interpolated to sample rate.
+        """
+        sine_waves, uv, noise_amp = self.frame_sines(f0, generator)
+        noise = noise_amp * randn_like(sine_waves, generator)
+        sine_waves = sine_waves * uv + noise
+        return sine_waves, uv, noise
+
+    def frame_sines(self, f0, generator=None):
+        """ sine_tensor, uv, noise_amp from frame-rate F0, before noise is added """
+        scale = int(self.upsample_scale)
+        rad_values = (torch.multiply(f0, self.harmonics) / self.sampling_rate) % 1
+
+        # _f02sine adds a random initial phase to the first sample, which its
+        # downsample never reads; draw it anyway so seeded runs match forward()
+        torch.rand(f0.shape[0], self.dim, device=f0.device, generator=generator)
+
+        phase = torch.cumsum(rad_values, dim=1) * 2 * np.pi
+        phase = torch.nn.functional.interpolate(phase.transpose(1, 2) * self.upsample_scale,
+                                                scale_factor=self.upsample_scale, mode="linear").transpose(1, 2)
+        sine_waves = torch.sin(phase) * self.sine_amp
+
+        uv = self._f02uv(f0).repeat_interleave(scale, dim=1)
+        noise_amp = uv * self.noise_std + (1 - uv) * self.sine_amp / 3
+        return sine_waves, uv, noise_amp
+
 
 class SourceModuleHnNSF(torch.nn.Module):
     """ SourceModule for hn-nsf
@@ -286,20 +390,37 @@ class SourceModuleHnNSF(torch.nn.Module):
         self.l_linear = torch.nn.Linear(harmonic_num + 1, 1)
         self.l_tanh = torch.nn.Tanh()
 
-    def forward(self, x):
+    def forward(self, x, frame_rate=False, merged_noise=False, generator=None):
         """
         Sine_source, noise_source = SourceModuleHnNSF(F0_sampled)
-        F0_sampled (batchsize, length, 1)
+        F0_sampled (batchsize, length, 1), or (batchsize, frames, 1) at
+            frame rate with frame_rate=True (see SineGen.forward_frames)
         Sine_source (batchsize, length, 1)
         noise_source (batchsize, length 1)
+        merged_noise (frame rate only): draw one noise channel scaled by
+            |l_linear.weight| instead of one per harmonic before merging.
+            The merged noise has the same distribution, for 1/dim of the
+            random draws; noise_source is then None
+        generator: torch.Generator for every random draw, or None for the
+            global RNG; a seeded generator makes the source reproducible
         """
+        if frame_rate and merged_noise:
+            with torch.no_grad():
+                sine_wavs, uv, noise_amp = self.l_sin_gen.frame_sines(x, generator)
+                merged = self.l_linear(sine_wavs * uv)
+                merged += noise_amp * self.l_linear.weight.norm() * randn_like(uv, generator)
+                return self.l_tanh(merged), None, uv
+
         # source for harmonic branch
         with torch.no_grad():
-            sine_wavs, uv, _ = self.l_sin_gen(x)
+            if frame_rate:
+                sine_wavs, uv, _ = self.l_sin_gen.forward_frames(x, generator)
+            else:
+                sine_wavs, uv, _ = self.l_sin_gen(x, generator)
         sine_merge = self.l_tanh(self.l_linear(sine_wavs))
 
         # source for noise branch, in the same shape as uv
-        noise = torch.randn_like(uv) * self.sine_amp / 3
+        noise = randn_like(uv, generator) * self.sine_amp / 3
         return sine_merge, noise, uv
 def padDiff(x):
     return F.pad(F.pad(x, (0,0,-1,1), 'constant', 0) - x, (0,0,0,-1), 'constant', 0)
@@ -351,16 +472,39 @@ class Generator(torch.nn.Module):
         self.conv_post.apply(init_weights)
         self.reflection_pad = torch.nn.ReflectionPad1d((1, 0))
         self.stft = TorchSTFT(filter_length=gen_istft_n_fft, hop_length=gen_istft_hop_size, win_length=gen_istft_n_fft)
+        # Same transforms as conv1d / conv_transpose1d. Matches torch.stft to
+        # float precision except where a bin's phase sits on the +-pi branch
+        # cut, so it is opt-in; set use_conv_stft for ONNX export or compile
+        self.conv_stft = ConvSTFT(filter_length=gen_istft_n_fft, hop_length=gen_istft_hop_size, win_length=gen_istft_n_fft)
+        self.use_conv_stft = False
+        # Build the harmonic source from frame-rate F0 (SineGen.forward_frames);
+        # merged_source_noise also draws its noise as one channel
+        self.frame_rate_source = True
+        self.merged_source_noise = True
         
         
-    def forward(self, x, s, f0):
-        with torch.no_grad():
-            f0 = self.f0_upsamp(f0[:, None]).transpose(1, 2)  # bs,n,t
+    @property
+    def active_stft(self):
+        return self.conv_stft if self.use_conv_stft else self.stft
 
-            har_source, noi_source, uv = self.m_source(f0)
+    def source(self, f0, generator=None):
+        """STFT magnitude and phase of the harmonic source for frame-rate F0"""
+        with torch.no_grad():
+            if self.frame_rate_source:
+                har_source, noi_source, uv = self.m_source(f0[:, :, None], frame_rate=True,
+                                                           merged_noise=self.merged_source_noise,
+                                                           generator=generator)
+            else:
+                f0 = self.f0_upsamp(f0[:, None]).transpose(1, 2)  # bs,n,t
+                har_source, noi_source, uv = self.m_source(f0, generator=generator)
             har_source = har_source.transpose(1, 2).squeeze(1)
-            har_spec, har_phase = self.stft.transform(har_source)
-            har = torch.cat([har_spec, har_phase], dim=1)
+            har_spec, har_phase = self.active_stft.transform(har_source)
+            return torch.cat([har_spec, har_phase], dim=1)
+
+    def forward(self, x, s, f0, har=None, generator=None):
+        # har: source() features precomputed for a longer signal and sliced, see kokoro.decode_stream
+        if har is None:
+            har = self.source(f0, generator)
         
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, LRELU_SLOPE)
@@ -383,7 +527,7 @@ class Generator(torch.nn.Module):
         x = self.conv_post(x)
         spec = torch.exp(x[:,:self.post_n_fft // 2 + 1, :])
         phase = torch.sin(x[:, self.post_n_fft // 2 + 1:, :])
-        return self.stft.inverse(spec, phase)
+        return self.active_stft.inverse(spec, phase)
     
     def fw_phase(self, x, s):
         for i in range(self.num_upsamples):
@@ -502,7 +646,7 @@ class Decoder(nn.Module):
                                    upsample_initial_channel, resblock_dilation_sizes, 
                                    upsample_kernel_sizes, gen_istft_n_fft, gen_istft_hop_size)
         
-    def forward(self, asr, F0_curve, N, s):
+    def forward(self, asr, F0_curve, N, s, har=None, generator=None):
         F0 = self.F0_conv(F0_curve.unsqueeze(1))
         N = self.N_conv(N.unsqueeze(1))
         
@@ -519,5 +663,5 @@ class Decoder(nn.Module):
             if block.upsample_type != "none":
                 res = False
                 
-        x = self.generator(x, s, F0_curve)
+        x = self.generator(x, s, F0_curve, har, generator)
         return x
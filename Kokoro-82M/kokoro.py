@@ -1,50 +1,60 @@
-from phonemizer.backend.espeak.wrapper import EspeakWrapper
+from functools import lru_cache
+import ctypes.util
+import glob
 import os
+import shutil
 import subprocess
+import sys
 
+# Shared-library names probed on each platform, most specific first
+_ESPEAK_NAMES = {
+    'darwin': ['libespeak-ng.dylib', 'libespeak-ng.1.dylib'],
+    'win32': ['libespeak-ng.dll'],
+}.get(sys.platform, ['libespeak-ng.so.1', 'libespeak-ng.so'])
+_ESPEAK_DIRS = [
+    '/opt/homebrew/lib', '/usr/local/lib', '/usr/lib', '/usr/lib64',
+    '/usr/lib/x86_64-linux-gnu', '/usr/lib/aarch64-linux-gnu', '/usr/lib/arm-linux-gnueabihf',
+    'C:\\Program Files\\eSpeak NG',
+]
+
+@lru_cache(maxsize=None)
 def find_espeak_library():
-    """Find the espeak-ng library path"""
-    try:
-        # Try to get the library path from brew
+    """Find the espeak-ng shared library once per process
+
+    Checks PHONEMIZER_ESPEAK_LIBRARY, the dynamic loader's search path,
+    Homebrew (macOS only) and the usual install directories, including
+    Debian/Ubuntu multiarch paths.
+    """
+    env = os.environ.get('PHONEMIZER_ESPEAK_LIBRARY')
+    if env and os.path.exists(env):
+        return env
+
+    # find_library returns a full path on macOS but only a soname on Linux;
+    # phonemizer copies the library file, so a soname must be resolved
+    found = ctypes.util.find_library('espeak-ng')
+    if found and os.path.isabs(found) and os.path.exists(found):
+        return found
+    names = ([found] if found else []) + _ESPEAK_NAMES
+
+    dirs = list(_ESPEAK_DIRS)
+    if sys.platform == 'darwin' and shutil.which('brew'):
         result = subprocess.run(['brew', '--prefix', 'espeak-ng'], capture_output=True, text=True)
         if result.returncode == 0:
-            brew_prefix = result.stdout.strip()
-            lib_path = os.path.join(brew_prefix, 'lib', 'libespeak-ng.dylib')
-            if os.path.exists(lib_path):
-                return lib_path
-            
-            # Try .1.dylib extension
-            lib_path = os.path.join(brew_prefix, 'lib', 'libespeak-ng.1.dylib')
-            if os.path.exists(lib_path):
-                return lib_path
-        
-        # Try common paths
-        common_paths = [
-            '/opt/homebrew/lib/libespeak-ng.dylib',
-            '/opt/homebrew/lib/libespeak-ng.1.dylib',
-            '/usr/local/lib/libespeak-ng.dylib',
-            '/usr/local/lib/libespeak-ng.1.dylib',
-            '/usr/lib/libespeak-ng.dylib',
-            '/usr/lib/libespeak-ng.1.dylib'
-        ]
-        
-        for path in common_paths:
+            dirs.insert(0, os.path.join(result.stdout.strip(), 'lib'))
+    for directory in dirs:
+        for name in names:
+            path = os.path.join(directory, name)
             if os.path.exists(path):
                 return path
-                
-        raise FileNotFoundError("Could not find espeak-ng library")
-        
-    except Exception as e:
-        print(f"Error finding espeak library: {str(e)}")
-        raise
-
-# Set espeak library path
-espeak_lib = find_espeak_library()
-print(f"Using espeak library: {espeak_lib}")
-EspeakWrapper.set_library(espeak_lib)
-
-import phonemizer
+        matches = sorted(glob.glob(os.path.join(directory, 'libespeak-ng.so.*')))
+        if matches:
+            return matches[0]
+
+    raise FileNotFoundError("Could not find espeak-ng library; install espeak-ng or set PHONEMIZER_ESPEAK_LIBRARY")
+
+import hashlib
 import re
+import time
 import torch
 import numpy as np
 
@@ -132,14 +142,22 @@ VOCAB = get_vocab()
 def tokenize(ps):
     return [i for i in map(VOCAB.get, ps) if i is not None]
 
-phonemizers = dict(
-    a=phonemizer.backend.EspeakBackend(language='en-us', preserve_punctuation=True, with_stress=True),
-    b=phonemizer.backend.EspeakBackend(language='en-gb', preserve_punctuation=True, with_stress=True),
-)
+LANGUAGES = dict(a='en-us', b='en-gb')
+
+@lru_cache(maxsize=None)
+def get_phonemizer(lang):
+    """espeak backend for a language, loaded on first use"""
+    from phonemizer.backend import EspeakBackend
+    from phonemizer.backend.espeak.wrapper import EspeakWrapper
+    espeak_lib = find_espeak_library()
+    print(f"Using espeak library: {espeak_lib}")
+    EspeakWrapper.set_library(espeak_lib)
+    return EspeakBackend(language=LANGUAGES[lang], preserve_punctuation=True, with_stress=True)
+
 def phonemize(text, lang, norm=True):
     if norm:
         text = normalize_text(text)
-    ps = phonemizers[lang].phonemize([text])
+    ps = get_phonemizer(lang).phonemize([text])
     ps = ps[0] if ps else ''
     # https://en.wiktionary.org/wiki/kokoro#English
     ps = ps.replace('kəkˈoːɹoʊ', 'kˈoʊkəɹoʊ').replace('kəkˈɔːɹəʊ', 'kˈəʊkəɹəʊ')
@@ -156,13 +174,25 @@ def length_to_mask(lengths):
     mask = torch.gt(mask+1, lengths.unsqueeze(1))
     return mask
 
+# Decoder output samples per asr frame: x2 in the decoder, x10 x6 in the
+# generator's upsampling, x5 in its iSTFT hop
+SAMPLES_PER_FRAME = 600
+
+# Windowed decoding, in asr frames (40 ms each): window length, receptive
+# field context decoded on both sides and discarded, crossfade at seams
+DECODE_WINDOW = 128
+DECODE_CONTEXT = 24
+DECODE_CROSSFADE = 4
+
 @torch.no_grad()
-def forward(model, tokens, ref_s, speed):
+def predict(model, tokens, ref_s, speed):
+    """Everything before the decoder: aligned text features, F0 and energy curves"""
     device = ref_s.device
     tokens = torch.LongTensor([[0, *tokens, 0]]).to(device)
     input_lengths = torch.LongTensor([tokens.shape[-1]]).to(device)
     text_mask = length_to_mask(input_lengths).to(device)
-    bert_dur = model.bert(tokens, attention_mask=(~text_mask).int())
+    # One utterance is never padded, so PL-BERT needs no attention mask
+    bert_dur = model.bert(tokens)
     d_en = model.bert_encoder(bert_dur).transpose(-1, -2)
     s = ref_s[:, 128:]
     d = model.predictor.text_encoder(d_en, s, input_lengths, text_mask)
@@ -179,9 +209,109 @@ def forward(model, tokens, ref_s, speed):
     F0_pred, N_pred = model.predictor.F0Ntrain(en, s)
     t_en = model.text_encoder(tokens, input_lengths, text_mask)
     asr = t_en @ pred_aln_trg.unsqueeze(0).to(device)
-    return model.decoder(asr, F0_pred, N_pred, ref_s[:, :128]).squeeze().cpu().numpy()
+    return asr, F0_pred, N_pred
+
+@torch.no_grad()
+def decode_stream(model, asr, F0_pred, N_pred, s, window=DECODE_WINDOW, context=DECODE_CONTEXT,
+                  crossfade=DECODE_CROSSFADE, generator=None):
+    """Decode window by window, yielding audio as soon as each window is done.
+
+    Each window of asr frames is decoded with `context` extra frames on both
+    sides to cover the convolutions' receptive field, trimmed back, and
+    linearly crossfaded into the next window over `crossfade` frames. Peak
+    activation memory depends on the window, not the utterance length. The
+    harmonic source is built once for the whole utterance and sliced, so its
+    phase runs on across windows. The decoder's instance norms see one
+    window at a time, so the output is close to, not identical with, a
+    single pass; short utterances are decoded in one pass. generator
+    drives the source's random phase and noise (see chunk_generator).
+    """
+    frames = asr.shape[-1]
+    if frames <= window + 2 * context:
+        yield model.decoder(asr, F0_pred, N_pred, s, generator=generator).squeeze().cpu().numpy()
+        return
+    har = model.decoder.generator.source(F0_pred, generator)
+    har_per_frame = (har.shape[-1] - 1) // frames
+    # A last window shorter than its crossfade and context joins the one before
+    starts = list(range(0, frames, window))
+    if frames - starts[-1] < crossfade + context:
+        starts.pop()
+    tail = None
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else frames
+        keep_end = min(end + crossfade, frames)
+        lo, hi = max(0, start - context), min(frames, keep_end + context)
+        audio = model.decoder(asr[..., lo:hi], F0_pred[..., 2 * lo:2 * hi], N_pred[..., 2 * lo:2 * hi], s,
+                              har[..., lo * har_per_frame:hi * har_per_frame + 1]).squeeze().cpu().numpy()
+        audio = audio[(start - lo) * SAMPLES_PER_FRAME:(keep_end - lo) * SAMPLES_PER_FRAME]
+        if tail is not None:
+            fade_in = np.linspace(0, 1, len(tail), endpoint=False, dtype=np.float32) + 0.5 / len(tail)
+            audio[:len(tail)] = tail * (1 - fade_in) + audio[:len(tail)] * fade_in
+        overlap = (keep_end - end) * SAMPLES_PER_FRAME
+        tail = audio[len(audio) - overlap:].copy() if overlap else None
+        yield audio[:len(audio) - overlap]
+
+def chunk_generator(seed, tokens, device):
+    """torch.Generator seeded from seed and the chunk's tokens, or None for the global RNG.
 
-def generate(model, text, voicepack, lang='a', speed=1, ps=None):
+    The seed depends on what is synthesized, not on the order chunks are
+    rendered in, so a chunk comes out byte-identical alone, inside
+    generate_full, or on another worker.
+    """
+    if seed is None:
+        return None
+    digest = hashlib.sha256(f"{seed}:{','.join(map(str, tokens))}".encode('utf-8')).digest()
+    return torch.Generator(device=device).manual_seed(int.from_bytes(digest[:8], 'little') >> 1)
+
+@torch.no_grad()
+def forward(model, tokens, ref_s, speed, window=None, seed=None):
+    """Synthesize tokens; with window (asr frames) the decoder runs window by window,
+    with seed the output is deterministic"""
+    if window is None:
+        generator = chunk_generator(seed, tokens, ref_s.device)
+        asr, F0_pred, N_pred = predict(model, tokens, ref_s, speed)
+        return model.decoder(asr, F0_pred, N_pred, ref_s[:, :128], generator=generator).squeeze().cpu().numpy()
+    return np.concatenate(list(forward_stream(model, tokens, ref_s, speed, window, seed)))
+
+def forward_stream(model, tokens, ref_s, speed, window=DECODE_WINDOW, seed=None):
+    """forward() yielding each decoded window as soon as it is ready"""
+    generator = chunk_generator(seed, tokens, ref_s.device)
+    asr, F0_pred, N_pred = predict(model, tokens, ref_s, speed)
+    yield from decode_stream(model, asr, F0_pred, N_pred, ref_s[:, :128], window, generator=generator)
+
+def forward_voice(model, tokens, voicepack, speed, style_cache=None, window=None, seed=None):
+    """forward() with the voice's style for this length, via models.StyleCache when given"""
+    if style_cache is None:
+        return forward(model, tokens, voicepack[len(tokens)], speed, window, seed)
+    with style_cache.applied(voicepack, len(tokens)) as ref_s:
+        return forward(model, tokens, ref_s, speed, window, seed)
+
+# Token lengths warmed up at startup: a short phrase, a sentence and a
+# paragraph-sized chunk, so each shape class has run once
+WARMUP_TOKENS = (16, 64, 256)
+
+# Phonemes repeated to build warmup chunks; real phonemes give realistic durations
+WARMUP_PHONEMES = "ðə kwˈɪk bɹˈaʊn fˈɑːks dʒˈʌmps ˌoʊvɚ ðə lˈeɪzi dˈɑːɡ. "
+
+def warmup(model, voicepacks, lengths=WARMUP_TOKENS, style_cache=None, window=None, seed=0):
+    """Synthesize dummy chunks so the first real request does not pay for cold paths.
+
+    The first voice runs at every length, which grows the allocator and
+    creates the oneDNN primitives for each shape. Every other voice runs the
+    shortest length once, which pages in its voicepack and fills its style
+    cache entry. Returns the seconds each pass took, keyed by (voice, length).
+    """
+    pattern = tokenize(WARMUP_PHONEMES)
+    timings = {}
+    for n, (name, voicepack) in enumerate(voicepacks.items()):
+        for length in (lengths if n == 0 else sorted(lengths)[:1]):
+            tokens = (pattern * (length // len(pattern) + 1))[:min(length, 510)]
+            start = time.perf_counter()
+            forward_voice(model, tokens, voicepack, 1, style_cache, window, seed)
+            timings[(name, length)] = time.perf_counter() - start
+    return timings
+
+def generate(model, text, voicepack, lang='a', speed=1, ps=None, style_cache=None, window=None, seed=None):
     ps = ps or phonemize(text, lang)
     tokens = tokenize(ps)
     if not tokens:
@@ -189,12 +319,23 @@ def generate(model, text, voicepack, lang='a', speed=1, ps=None):
     elif len(tokens) > 510:
         tokens = tokens[:510]
         print('Truncated to 510 tokens')
-    ref_s = voicepack[len(tokens)]
-    out = forward(model, tokens, ref_s, speed)
+    out = forward_voice(model, tokens, voicepack, speed, style_cache, window, seed)
     ps = ''.join(next(k for k, v in VOCAB.items() if i == v) for i in tokens)
     return out, ps
 
-def generate_full(model, text, voicepack, lang='a', speed=1, ps=None):
+def generate_stream(model, text, voicepack, lang='a', speed=1, ps=None, window=DECODE_WINDOW, seed=None):
+    """Audio of the text piece by piece, one decoded window at a time, in 510-token chunks.
+
+    Runs without a StyleCache, whose affines are installed on the shared
+    layers only for the length of one forward pass, not across yields.
+    """
+    ps = ps or phonemize(text, lang)
+    tokens = tokenize(ps)
+    for i in range(0, len(tokens), 510):
+        chunk = tokens[i:i + 510]
+        yield from forward_stream(model, chunk, voicepack[len(chunk)], speed, window, seed)
+
+def generate_full(model, text, voicepack, lang='a', speed=1, ps=None, style_cache=None, window=None, seed=None):
     ps = ps or phonemize(text, lang)
     tokens = tokenize(ps)
     if not tokens:
@@ -202,8 +343,7 @@ def generate_full(model, text, voicepack, lang='a', speed=1, ps=None):
     outs = []
     loop_count = len(tokens)//510 + (1 if len(tokens) % 510 != 0 else 0)
     for i in range(loop_count):
-        ref_s = voicepack[len(tokens[i*510:(i+1)*510])]
-        out = forward(model, tokens[i*510:(i+1)*510], ref_s, speed)
+        out = forward_voice(model, tokens[i*510:(i+1)*510], voicepack, speed, style_cache, window, seed)
         outs.append(out)
     outs = np.concatenate(outs)
     ps = ''.join(next(k for k, v in VOCAB.items() if i == v) for i in tokens)
@@ -1,5 +1,7 @@
 # https://github.com/yl4579/StyleTTS2/blob/main/models.py
 from istftnet import AdaIN1d, Decoder
+from collections import OrderedDict
+from contextlib import contextmanager
 from munch import Munch
 from pathlib import Path
 from plbert import load_plbert
@@ -38,6 +40,12 @@ class LayerNorm(nn.Module):
         x = F.layer_norm(x, (self.channels,), self.gamma, self.beta, self.eps)
         return x.transpose(1, -1)
     
+def unpadded(lengths, width):
+    """True when every sequence in the batch spans the full width, as in single-utterance inference,
+    so packing, masking and re-padding are all no-ops"""
+    return bool((lengths == width).all())
+
+
 class TextEncoder(nn.Module):
     def __init__(self, channels, kernel_size, depth, n_symbols, actv=nn.LeakyReLU(0.2)):
         super().__init__()
@@ -57,6 +65,8 @@ class TextEncoder(nn.Module):
         self.lstm = nn.LSTM(channels, channels//2, 1, batch_first=True, bidirectional=True)
 
     def forward(self, x, input_lengths, m):
+        if unpadded(input_lengths, m.shape[-1]):
+            return self.forward_unpadded(x)
         x = self.embedding(x)  # [B, T, emb]
         x = x.transpose(1, 2)  # [B, emb, T]
         m = m.to(input_lengths.device).unsqueeze(1)
@@ -78,15 +88,23 @@ class TextEncoder(nn.Module):
             x, batch_first=True)
                 
         x = x.transpose(-1, -2)
-        x_pad = torch.zeros([x.shape[0], x.shape[1], m.shape[-1]])
+        x_pad = x.new_zeros([x.shape[0], x.shape[1], m.shape[-1]])
 
         x_pad[:, :, :x.shape[-1]] = x
-        x = x_pad.to(x.device)
+        x = x_pad
         
         x.masked_fill_(m, 0.0)
         
         return x
 
+    def forward_unpadded(self, x):
+        """forward() for a batch without padding; LSTM weights were flattened in build_model"""
+        x = self.embedding(x).transpose(1, 2)
+        for c in self.cnn:
+            x = c(x)
+        x, _ = self.lstm(x.transpose(1, 2))
+        return x.transpose(-1, -2)
+
     def inference(self, x):
         x = self.embedding(x)
         x = x.transpose(1, 2)
@@ -166,19 +184,23 @@ class AdaLayerNorm(nn.Module):
         self.eps = eps
 
         self.fc = nn.Linear(style_dim, channels*2)
+        # (1 + gamma, beta) precomputed by StyleCache; used instead of fc(s) when set
+        self.cached_style = None
+
+    def style_params(self, s):
+        h = self.fc(s)
+        h = h.view(h.size(0), h.size(1), 1)
+        gamma, beta = torch.chunk(h, chunks=2, dim=1)
+        return 1 + gamma.transpose(1, -1), beta.transpose(1, -1)
 
     def forward(self, x, s):
         x = x.transpose(-1, -2)
         x = x.transpose(1, -1)
                 
-        h = self.fc(s)
-        h = h.view(h.size(0), h.size(1), 1)
-        gamma, beta = torch.chunk(h, chunks=2, dim=1)
-        gamma, beta = gamma.transpose(1, -1), beta.transpose(1, -1)
-        
+        scale, beta = self.cached_style if self.cached_style is not None else self.style_params(s)
         
         x = F.layer_norm(x, (self.channels,), eps=self.eps)
-        x = (1 + gamma) * x + beta
+        x = scale * x + beta
         return x.transpose(1, -1).transpose(-1, -2)
 
 class ProsodyPredictor(nn.Module):
@@ -216,6 +238,11 @@ class ProsodyPredictor(nn.Module):
         text_size = d.shape[1]
         
         # predict duration
+        if unpadded(text_lengths, m.shape[-1]):
+            x, _ = self.lstm(d)
+            duration = self.duration_proj(nn.functional.dropout(x, 0.5, training=self.training))
+            return duration.squeeze(-1), d.transpose(-1, -2) @ alignment
+
         input_lengths = text_lengths.cpu().numpy()
         x = nn.utils.rnn.pack_padded_sequence(
             d, input_lengths, batch_first=True, enforce_sorted=False)
@@ -227,10 +254,10 @@ class ProsodyPredictor(nn.Module):
         x, _ = nn.utils.rnn.pad_packed_sequence(
             x, batch_first=True)
         
-        x_pad = torch.zeros([x.shape[0], m.shape[-1], x.shape[-1]])
+        x_pad = x.new_zeros([x.shape[0], m.shape[-1], x.shape[-1]])
 
         x_pad[:, :x.shape[1], :] = x
-        x = x_pad.to(x.device)
+        x = x_pad
                 
         duration = self.duration_proj(nn.functional.dropout(x, 0.5, training=self.training))
         
@@ -278,6 +305,8 @@ class DurationEncoder(nn.Module):
         self.sty_dim = sty_dim
 
     def forward(self, x, style, text_lengths, m):
+        if unpadded(text_lengths, m.shape[-1]):
+            return self.forward_unpadded(x, style)
         masks = m.to(text_lengths.device)
         
         x = x.permute(2, 0, 1)
@@ -305,12 +334,24 @@ class DurationEncoder(nn.Module):
                 x = F.dropout(x, p=self.dropout, training=self.training)
                 x = x.transpose(-1, -2)
                 
-                x_pad = torch.zeros([x.shape[0], x.shape[1], m.shape[-1]])
+                x_pad = x.new_zeros([x.shape[0], x.shape[1], m.shape[-1]])
 
                 x_pad[:, :, :x.shape[-1]] = x
-                x = x_pad.to(x.device)
+                x = x_pad
         
         return x.transpose(-1, -2)
+
+    def forward_unpadded(self, x, style):
+        """forward() for a batch without padding, kept [B, T, C] throughout"""
+        s = style.unsqueeze(1).expand(-1, x.shape[-1], -1)
+        x = torch.cat([x.transpose(1, 2), s], axis=-1)
+        for block in self.lstms:
+            if isinstance(block, AdaLayerNorm):
+                x = torch.cat([block(x, style), s], axis=-1)
+            else:
+                x, _ = block(x)
+                x = F.dropout(x, p=self.dropout, training=self.training)
+        return x
     
     def inference(self, x, style):
         x = self.embedding(x.transpose(-1, -2)) * np.sqrt(self.d_model)
@@ -334,12 +375,8 @@ def recursive_munch(d):
     else:
         return d
 
-def build_model(path, device):
-    config = Path(__file__).parent / 'config.json'
-    assert config.exists(), f'Config path incorrect: config.json not found at {config}'
-    with open(config, 'r') as r:
-        args = recursive_munch(json.load(r))
-    assert args.decoder.type == 'istftnet', f'Unknown decoder type: {args.decoder.type}'
+def build_modules(args):
+    """The five Kokoro modules, initialised on torch's current default device"""
     decoder = Decoder(dim_in=args.hidden_dim, style_dim=args.style_dim, dim_out=args.n_mels,
             resblock_kernel_sizes = args.decoder.resblock_kernel_sizes,
             upsample_rates = args.decoder.upsample_rates,
@@ -351,22 +388,137 @@ def build_model(path, device):
     predictor = ProsodyPredictor(style_dim=args.style_dim, d_hid=args.hidden_dim, nlayers=args.n_layer, max_dur=args.max_dur, dropout=args.dropout)
     bert = load_plbert()
     bert_encoder = nn.Linear(bert.config.hidden_size, args.hidden_dim)
-    for parent in [bert, bert_encoder, predictor, decoder, text_encoder]:
-        for child in parent.children():
+    return Munch(bert=bert, bert_encoder=bert_encoder, predictor=predictor, decoder=decoder, text_encoder=text_encoder)
+
+def model_tensors(model):
+    """Every parameter and buffer of a model, persistent or not, keyed '<module>.<name>'"""
+    tensors = {}
+    for key, module in model.items():
+        for name, tensor in [*module.named_parameters(), *module.named_buffers()]:
+            tensors[f'{key}.{name}'] = tensor.detach().contiguous()
+    return tensors
+
+def assign_tensors(model, tensors):
+    """Install tensors as the model's parameters and buffers without copying them"""
+    for name, tensor in tensors:
+        key, _, path = name.partition('.')
+        assert key in model, key
+        *parents, attr = path.split('.')
+        module = model[key].get_submodule('.'.join(parents))
+        if attr in module._parameters:
+            tensor = nn.Parameter(tensor, requires_grad=False)
+        # setattr rather than the dicts, so LSTMs refresh their flat weights
+        setattr(module, attr, tensor)
+    for key, module in model.items():
+        left = [n for n, t in [*module.named_parameters(), *module.named_buffers()] if t.is_meta]
+        assert not left, f'{key} tensors missing from the weights file: {left[:5]}'
+
+def load_safetensors(model, path, device):
+    """Map a converted model's weights from disk; on CPU they stay backed by the page cache"""
+    from safetensors import safe_open
+    with safe_open(str(path), framework='pt', device='cpu') as f:
+        tensors = [(name, f.get_tensor(name)) for name in f.keys()]
+    if device != 'cpu':
+        tensors = [(name, t.to(device)) for name, t in tensors]
+    assign_tensors(model, tensors)
+
+def build_model(path, device):
+    config = Path(__file__).parent / 'config.json'
+    assert config.exists(), f'Config path incorrect: config.json not found at {config}'
+    with open(config, 'r') as r:
+        args = recursive_munch(json.load(r))
+    assert args.decoder.type == 'istftnet', f'Unknown decoder type: {args.decoder.type}'
+    if path is not None and str(path).endswith('.safetensors'):
+        # Shapes only: no random init, no host copy of the checkpoint; the
+        # converted file holds every parameter and buffer
+        with torch.device('meta'):
+            model = build_modules(args)
+        load_safetensors(model, path, device)
+        for module in model.values():
+            module.eval()
+    else:
+        model = Munch({key: module.to(device).eval() for key, module in build_modules(args).items()})
+        if path is not None:
+            for key, state_dict in torch.load(path, map_location='cpu', weights_only=True)['net'].items():
+                assert key in model, key
+                try:
+                    model[key].load_state_dict(state_dict)
+                except:
+                    state_dict = {k[7:]: v for k, v in state_dict.items()}
+                    model[key].load_state_dict(state_dict, strict=False)
+    # Once, on the final device, for every LSTM including those nested in
+    # ModuleLists; the unpadded inference paths rely on it
+    for module in model.values():
+        for child in module.modules():
             if isinstance(child, nn.RNNBase):
                 child.flatten_parameters()
-    model = Munch(
-        bert=bert.to(device).eval(),
-        bert_encoder=bert_encoder.to(device).eval(),
-        predictor=predictor.to(device).eval(),
-        decoder=decoder.to(device).eval(),
-        text_encoder=text_encoder.to(device).eval(),
-    )
-    for key, state_dict in torch.load(path, map_location='cpu', weights_only=True)['net'].items():
-        assert key in model, key
-        try:
-            model[key].load_state_dict(state_dict)
-        except:
-            state_dict = {k[7:]: v for k, v in state_dict.items()}
-            model[key].load_state_dict(state_dict, strict=False)
     return model
+
+def load_voicepack(path, device):
+    """A voice's [511, 1, 256] style table from a .pt or converted .safetensors file"""
+    if str(path).endswith('.safetensors'):
+        from safetensors import safe_open
+        with safe_open(str(path), framework='pt', device='cpu') as f:
+            return f.get_tensor('voicepack').to(device)
+    return torch.load(path, weights_only=True).to(device)
+
+class StyleCache:
+    """gamma/beta of every style-conditioned layer, precomputed per (voice, length).
+
+    The style vector is voicepack[len(tokens)], so a voice and a token
+    length fully determine every AdaIN1d and AdaLayerNorm affine. applied()
+    computes them once per pair and installs them on the layers for the
+    duration of a forward pass, skipping their fc. Entries are dropped when
+    any of the fc weights change (load_state_dict, .to(), in-place edits).
+    Not safe for concurrent forward passes on the same model.
+    """
+
+    def __init__(self, model, max_entries=2048):
+        # The predictor is conditioned on ref_s[:, 128:], the decoder on ref_s[:, :128]
+        self.layers = [(layer, half) for module, half in ((model.predictor, slice(128, None)),
+                                                          (model.decoder, slice(None, 128)))
+                       for layer in module.modules() if isinstance(layer, (AdaIN1d, AdaLayerNorm))]
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.fingerprint = self._fingerprint()
+
+    def _fingerprint(self):
+        return tuple((p.data_ptr(), p._version) for layer, _ in self.layers for p in (layer.fc.weight, layer.fc.bias))
+
+    def clear(self):
+        self.entries.clear()
+
+    def lookup(self, voicepack, length):
+        """Style vector and per-layer (1 + gamma, beta) for a voice at a token length"""
+        fingerprint = self._fingerprint()
+        if fingerprint != self.fingerprint:
+            self.clear()
+            self.fingerprint = fingerprint
+        key = (id(voicepack), length)
+        entry = self.entries.get(key)
+        # The entry holds the voicepack, so its id cannot be reused while cached
+        if entry is not None and entry[0] is voicepack:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+        self.misses += 1
+        ref_s = voicepack[length]
+        with torch.no_grad():
+            params = [layer.style_params(ref_s[:, half]) for layer, half in self.layers]
+        self.entries[key] = (voicepack, ref_s, params)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return ref_s, params
+
+    @contextmanager
+    def applied(self, voicepack, length):
+        """Install the cached affines for the with-block and yield the style vector"""
+        ref_s, params = self.lookup(voicepack, length)
+        for (layer, _), cached in zip(self.layers, params):
+            layer.cached_style = cached
+        try:
+            yield ref_s
+        finally:
+            for layer, _ in self.layers:
+                layer.cached_style = None
@@ -1,12 +1,60 @@
 # https://github.com/yl4579/StyleTTS2/blob/main/Utils/PLBERT/util.py
 from transformers import AlbertConfig, AlbertModel
+import torch
+import torch.nn.functional as F
 
 class CustomAlbert(AlbertModel):
-    def forward(self, *args, **kwargs):
-        # Call the original forward method
-        outputs = super().forward(*args, **kwargs)
-        # Only return the last_hidden_state
-        return outputs.last_hidden_state
+    """PL-BERT with an inference path that returns only the last hidden state.
+
+    In eval mode forward() runs the shared ALBERT layer directly: Q, K and V
+    come from one fused projection, attention is F.scaled_dot_product_attention,
+    the mask is dropped when no position is padded, and the pooler and
+    output containers are skipped. Submodules and weights are the stock
+    AlbertModel's, so checkpoints load unchanged. Training, and any extra
+    AlbertModel argument, go through the stock forward.
+    """
+
+    def forward(self, input_ids=None, attention_mask=None, **kwargs):
+        if self.training or kwargs or input_ids is None:
+            return super().forward(input_ids, attention_mask=attention_mask, **kwargs).last_hidden_state
+        return self.forward_fused(input_ids, attention_mask)
+
+    def fused_qkv(self, attention):
+        """[3 * hidden, hidden] weight and bias of query, key and value, rebuilt when any of them change"""
+        tensors = [p for m in (attention.query, attention.key, attention.value) for p in (m.weight, m.bias)]
+        fingerprint = tuple((p.data_ptr(), p._version) for p in tensors)
+        cached = attention.__dict__.get('_fused_qkv')
+        if cached is None or cached[0] != fingerprint:
+            with torch.no_grad():
+                weight = torch.cat(tensors[0::2])
+                bias = torch.cat(tensors[1::2])
+            cached = attention.__dict__['_fused_qkv'] = (fingerprint, weight, bias)
+        return cached[1], cached[2]
+
+    def forward_fused(self, input_ids, attention_mask=None):
+        mask = None
+        if attention_mask is not None and not bool(attention_mask.all()):
+            # [B, 1, 1, T]: every query may attend to the unpadded keys
+            mask = attention_mask[:, None, None, :].bool()
+        x = self.encoder.embedding_hidden_mapping_in(self.embeddings(input_ids))
+        config = self.config
+        for i in range(config.num_hidden_layers):
+            group = self.encoder.albert_layer_groups[int(i / (config.num_hidden_layers / config.num_hidden_groups))]
+            for layer in group.albert_layers:
+                x = self.fused_layer(layer, x, mask)
+        return x
+
+    def fused_layer(self, layer, x, mask):
+        attention = layer.attention
+        batch, length, _ = x.shape
+        weight, bias = self.fused_qkv(attention)
+        # [B, T, 3 * hidden] -> 3 x [B, heads, T, head size]
+        q, k, v = F.linear(x, weight, bias).view(batch, length, 3, attention.num_attention_heads,
+                                                 attention.attention_head_size).permute(2, 0, 3, 1, 4)
+        context = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+        context = context.transpose(1, 2).reshape(batch, length, attention.all_head_size)
+        x = attention.LayerNorm(x + attention.dense(context))
+        return layer.full_layer_layer_norm(x + layer.ffn_output(layer.activation(layer.ffn(x))))
 
 def load_plbert():
     plbert_config = {'vocab_size': 178, 'hidden_size': 768, 'num_attention_heads': 12, 'intermediate_size': 2048, 'max_position_embeddings': 512, 'num_hidden_layers': 12, 'dropout': 0.1}
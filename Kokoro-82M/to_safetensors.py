@@ -0,0 +1,59 @@
+"""Convert the Kokoro checkpoint and voicepacks to safetensors.
+
+Usage:
+    python Kokoro-82M/to_safetensors.py [--model kokoro-v0_19.pth] [--voices voices]
+
+The model is built from the .pth exactly as build_model does, and every
+parameter and buffer is written to kokoro-v0_19.safetensors next to it,
+so loading needs no random init and no key fixups. Each voices/<name>.pt
+becomes voices/<name>.safetensors. build_model and load_voicepack pick
+the format from the file extension; AutoPodcastCreator prefers the
+safetensors files when they exist.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import torch
+from safetensors.torch import save_file
+
+sys.path.append(str(Path(__file__).parent))
+from models import build_model, model_tensors
+
+
+def convert_model(path: Path) -> Path:
+    out = path.with_suffix('.safetensors')
+    with torch.no_grad():
+        tensors = model_tensors(build_model(str(path), 'cpu'))
+    save_file(tensors, str(out), metadata={'source': path.name})
+    print(f"Wrote {len(tensors)} tensors to {out}")
+    return out
+
+
+def convert_voices(directory: Path) -> None:
+    for path in sorted(directory.glob('*.pt')):
+        voicepack = torch.load(path, map_location='cpu', weights_only=True)
+        save_file({'voicepack': voicepack.contiguous()}, str(path.with_suffix('.safetensors')),
+                  metadata={'source': path.name})
+        print(f"Wrote {path.with_suffix('.safetensors')}")
+
+
+def main():
+    here = Path(__file__).parent
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', type=Path, default=here / 'kokoro-v0_19.pth')
+    parser.add_argument('--voices', type=Path, default=here / 'voices')
+    args = parser.parse_args()
+
+    if not args.model.exists():
+        print(f"No model checkpoint at {args.model}")
+        return 1
+    convert_model(args.model)
+    if os.path.isdir(args.voices):
+        convert_voices(args.voices)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
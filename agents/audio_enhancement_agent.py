@@ -1,5 +1,7 @@
 from typing import Dict, List, Tuple
 import numpy as np
+from audio import SAMPLE_RATE
+from audio.dsp import enhance
 from .base_agent import BaseAgent
 
 class AudioEnhancementAgent(BaseAgent):
@@ -33,7 +35,7 @@ class AudioEnhancementAgent(BaseAgent):
             params = eval(response)
             
             # Apply audio enhancements
-            enhanced_audio = self.apply_enhancements(audio, params)
+            enhanced_audio = self.apply_enhancements(audio, params, sample_rate)
             
             return enhanced_audio, params
             
@@ -41,30 +43,13 @@ class AudioEnhancementAgent(BaseAgent):
             print(f"Error in audio enhancement: {str(e)}")
             return audio, {}
     
-    def apply_enhancements(self, audio: np.ndarray, params: Dict) -> np.ndarray:
-        """Apply audio enhancements based on parameters"""
+    def apply_enhancements(self, audio: np.ndarray, params: Dict, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+        """Apply pace, energy, 3-band EQ and clarity based on parameters"""
         try:
-            # 1. Adjust pace
-            if 'pace' in params:
-                # Implement time stretching without affecting pitch
-                pass
-            
-            # 2. Adjust energy
-            if 'energy' in params:
-                audio = audio * float(params['energy'])
-            
-            # 3. Apply EQ
-            if 'eq_settings' in params:
-                # Implement 3-band EQ
-                pass
-            
-            # 4. Enhance clarity
-            if 'clarity' in params:
-                # Implement clarity enhancement
-                pass
+            audio = enhance(audio, params, sample_rate)
             
             # Normalize final output
-            max_val = np.max(np.abs(audio))
+            max_val = np.max(np.abs(audio)) if len(audio) else 0.0
             if max_val > 1.0:
                 audio = audio / max_val
             
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 import os
 import requests
 from typing import Dict, List, Optional
+from telemetry.tracing import span
 
 class BaseAgent(ABC):
     def __init__(self):
@@ -26,13 +27,15 @@ class BaseAgent(ABC):
                 "max_tokens": 2000
             }
             
-            response = requests.post(
-                "https://api.deepseek.com/v1/chat/completions",
-                headers=headers,
-                json=data
-            )
-            
-            response_data = response.json()
+            with span("llm.deepseek", agent=type(self).__name__, prompt_chars=len(prompt)) as s:
+                response = requests.post(
+                    "https://api.deepseek.com/v1/chat/completions",
+                    headers=headers,
+                    json=data
+                )
+                
+                response_data = response.json()
+                s.set(**(response_data.get('usage') or {}))
             return response_data['choices'][0]['message']['content']
             
         except Exception as e:
@@ -2,6 +2,7 @@ from duckduckgo_search import DDGS
 from bs4 import BeautifulSoup
 import requests
 from typing import List, Dict
+from telemetry.tracing import span
 from .base_agent import BaseAgent
 
 class ResearchAgent(BaseAgent):
@@ -30,8 +31,9 @@ class ResearchAgent(BaseAgent):
     def search_topic(self, query: str, num_results: int = 5) -> List[Dict]:
         """Search DuckDuckGo for relevant information"""
         try:
-            with DDGS() as ddgs:
+            with span("search.ddgs", query=query) as s, DDGS() as ddgs:
                 results = list(ddgs.text(query, max_results=num_results))
+                s.set(results=len(results))
             return results
         except Exception as e:
             print(f"Error in DuckDuckGo search: {str(e)}")
@@ -43,14 +45,19 @@ class ResearchAgent(BaseAgent):
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                element.decompose()
-            
-            return ' '.join(soup.stripped_strings)[:5000]
+            with span("fetch.page", url=url) as s:
+                response = requests.get(url, headers=headers, timeout=10)
+                s.set(status=response.status_code, bytes=len(response.content))
+            with span("extract_content", url=url) as s:
+                soup = BeautifulSoup(response.text, 'html.parser')
+                
+                # Remove unwanted elements
+                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+                    element.decompose()
+                
+                text = ' '.join(soup.stripped_strings)[:5000]
+                s.set(chars=len(text))
+            return text
         except Exception as e:
             print(f"Error extracting content from {url}: {str(e)}")
             return ""
@@ -0,0 +1,10 @@
+from .assets import AssetLibrary, LoopedAsset, SAMPLE_RATE
+from .timeline import Clip, Timeline
+from .encoders import ParallelEncoder, make_job_dir
+from .loudness import LoudnessMeter, TruePeakLimiter, db_to_gain
+from .dsp import EnhancementChain, enhance, enhance_many
+from .project import EpisodeProject, segment_hash
+
+__all__ = ['AssetLibrary', 'LoopedAsset', 'SAMPLE_RATE', 'Clip', 'Timeline', 'ParallelEncoder', 'make_job_dir',
+           'LoudnessMeter', 'TruePeakLimiter', 'db_to_gain', 'EnhancementChain', 'enhance', 'enhance_many',
+           'EpisodeProject', 'segment_hash']
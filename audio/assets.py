@@ -0,0 +1,178 @@
+import os
+from math import gcd
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from telemetry.metrics import cache_result
+
+SAMPLE_RATE = 24000
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3', '.aiff', '.aif')
+
+# Largest chunk processed at once when mixing a looped asset into a buffer
+MIX_BLOCK = 65536
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    """Downmix (frames, channels) audio to a 1-D float32 array"""
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Polyphase resample 1-D audio between integer sample rates"""
+    if source_rate == target_rate:
+        return audio
+    from scipy.signal import resample_poly
+
+    g = gcd(int(source_rate), int(target_rate))
+    return resample_poly(audio, target_rate // g, source_rate // g).astype(np.float32)
+
+
+def ingest_file(source: Path, target: Path, sample_rate: int = SAMPLE_RATE) -> Path:
+    """Decode an audio file once and store it as mono float32 .npy at sample_rate"""
+    audio, rate = sf.read(str(source), dtype='float32', always_2d=True)
+    audio = resample(to_mono(audio), rate, sample_rate)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        np.save(f, audio)
+    os.replace(tmp, target)
+    return target
+
+
+class LoopedAsset:
+    """A memory-mapped clip that can be read as if repeated end to end.
+
+    Blocks are served as views into the mapped file, so extending a 30 second
+    bed to a 10 minute segment costs no decode and no copy of the bed.
+    """
+
+    def __init__(self, name: str, data: np.ndarray):
+        if data.ndim != 1 or len(data) == 0:
+            raise ValueError(f"Asset {name} must be non-empty mono audio, got shape {data.shape}")
+        self.name = name
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def blocks(self, length: int, offset: int = 0) -> Iterator[np.ndarray]:
+        """Yield views covering `length` samples of the looped clip starting at offset"""
+        size = len(self.data)
+        pos = offset % size
+        while length > 0:
+            n = min(length, size - pos)
+            yield self.data[pos:pos + n]
+            length -= n
+            pos = 0
+
+    def mix_into(self, out: np.ndarray, gain: float = 1.0, offset: int = 0) -> np.ndarray:
+        """Add gain * looped clip to out in place, using at most MIX_BLOCK scratch samples"""
+        scratch = None if gain == 1.0 else np.empty(min(len(out), MIX_BLOCK), dtype=np.float32)
+        start = 0
+        for view in self.blocks(len(out), offset):
+            for i in range(0, len(view), MIX_BLOCK):
+                block = view[i:i + MIX_BLOCK]
+                dest = out[start:start + len(block)]
+                if scratch is None:
+                    dest += block
+                else:
+                    tmp = scratch[:len(block)]
+                    np.multiply(block, gain, out=tmp)
+                    dest += tmp
+                start += len(block)
+        return out
+
+
+class AssetLibrary:
+    """Music beds and sound effects, preconverted to the speech format.
+
+    `music/` and `effects/` under root are transcoded once into
+    `cache_dir/<kind>/<stem>.npy` (mono float32 at sample_rate) and memory
+    mapped on load. Assets are looked up by lower-cased file stem, so
+    `music/Calm.wav` serves the "calm" mood.
+    """
+
+    KINDS = ('music', 'effects')
+
+    def __init__(self, root: str = '.', cache_dir: Optional[str] = None, sample_rate: int = SAMPLE_RATE):
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.root / '.asset_cache'
+        self.sample_rate = sample_rate
+        self.assets: Dict[str, Dict[str, np.ndarray]] = {kind: {} for kind in self.KINDS}
+        # One LoopedAsset per mood, so segments sharing a mood share a bed
+        self.beds: Dict[str, LoopedAsset] = {}
+
+    def _sources(self, kind: str) -> List[Tuple[Path, Path]]:
+        source_dir = self.root / kind
+        if not source_dir.is_dir():
+            return []
+        target_dir = self.cache_dir / str(self.sample_rate) / kind
+        return [
+            (path, target_dir / (path.stem.lower() + '.npy'))
+            for path in sorted(source_dir.iterdir())
+            if path.suffix.lower() in AUDIO_EXTENSIONS
+        ]
+
+    def ingest(self, force: bool = False) -> List[Path]:
+        """Transcode new or changed source files; returns the cache files written"""
+        written = []
+        for kind in self.KINDS:
+            for source, target in self._sources(kind):
+                fresh = not force and target.exists() and target.stat().st_mtime >= source.stat().st_mtime
+                cache_result("asset_transcode", fresh)
+                if fresh:
+                    continue
+                try:
+                    print(f"Ingesting {kind} asset: {source}")
+                    written.append(ingest_file(source, target, self.sample_rate))
+                except Exception as e:
+                    print(f"Error ingesting {source}: {str(e)}")
+        return written
+
+    def load(self, ingest: bool = True) -> 'AssetLibrary':
+        """Memory-map every cached asset, ingesting stale ones first"""
+        if ingest:
+            self.ingest()
+        self.beds = {}
+        for kind in self.KINDS:
+            self.assets[kind] = {}
+            for _, target in self._sources(kind):
+                if target.exists():
+                    self.assets[kind][target.stem] = np.load(target, mmap_mode='r')
+        print(f"Loaded {len(self.assets['music'])} music beds and {len(self.assets['effects'])} sound effects")
+        return self
+
+    def music(self, mood: str) -> Optional[LoopedAsset]:
+        """Looped music bed for a mood, or None if there is no such track"""
+        data = self.assets['music'].get(mood.lower())
+        cache_result("music", data is not None)
+        if data is None or len(data) == 0:
+            return None
+        if mood.lower() not in self.beds:
+            self.beds[mood.lower()] = LoopedAsset(mood.lower(), data)
+        return self.beds[mood.lower()]
+
+    def effect(self, effect_type: str) -> Optional[np.ndarray]:
+        """Memory-mapped sound effect samples, or None if there is no such effect"""
+        data = self.assets['effects'].get(effect_type.lower())
+        cache_result("effects", data is not None)
+        return data
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preconvert music/ and effects/ into the asset cache")
+    parser.add_argument('--root', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--force', action='store_true', help="Re-transcode even if the cache is fresh")
+    args = parser.parse_args()
+
+    library = AssetLibrary(args.root, args.cache_dir)
+    written = library.ingest(force=args.force)
+    print(f"Wrote {len(written)} cached assets to {library.cache_dir}")
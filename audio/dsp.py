@@ -0,0 +1,251 @@
+"""Speech enhancement DSP: 3-band EQ, clarity, compression and time/pitch.
+
+The filter chain is stateful and block-based: EQ and presence filters run
+as one cascade of second-order sections and the compressor's detectors are
+one-pole IIR filters, all carrying their state between blocks, so a segment
+is processed in O(block) working memory. Time-stretching is a phase vocoder
+vectorized over chunks of STFT frames. SciPy's filters and FFTs release
+the GIL, which lets enhance_many() process segments on parallel threads.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from math import cos, pi, sin, sqrt
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import butter, lfilter, lfilter_zi, resample_poly, sosfilt
+
+from telemetry.tracing import bind
+
+from .assets import SAMPLE_RATE
+from .timeline import BLOCK_SIZE
+
+# Band centres of the 3-band EQ
+LOW_SHELF_HZ = 200.0
+MID_PEAK_HZ = 1000.0
+HIGH_SHELF_HZ = 4000.0
+EQ_LIMIT_DB = 12.0
+
+# Clarity: rumble high-pass, presence boost and compression, scaled by 0-1
+RUMBLE_HZ = 80.0
+PRESENCE_HZ = 3000.0
+PRESENCE_MAX_DB = 6.0
+COMPRESSOR_THRESHOLD_DB = -24.0
+COMPRESSOR_MAX_RATIO = 4.0
+
+# Phase vocoder frame and hop (n_fft must be 4 * hop for the overlap-add)
+STRETCH_FFT = 1024
+STRETCH_HOP = STRETCH_FFT // 4
+STRETCH_CHUNK = 2048  # output frames synthesized per vectorized pass
+
+
+def _number(value, default: float, lo: float, hi: float) -> float:
+    """Coerce an LLM-provided parameter to a float within [lo, hi]"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    if value != value:  # NaN
+        return default
+    return min(max(value, lo), hi)
+
+
+def peaking_sos(freq: float, gain_db: float, q: float = 0.7071, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """RBJ peaking EQ biquad as one second-order section"""
+    a = 10.0 ** (gain_db / 40.0)
+    w0 = 2.0 * pi * freq / sample_rate
+    alpha = sin(w0) / (2.0 * q)
+    b = [1.0 + alpha * a, -2.0 * cos(w0), 1.0 - alpha * a]
+    den = [1.0 + alpha / a, -2.0 * cos(w0), 1.0 - alpha / a]
+    return np.array([b + den]) / den[0]
+
+
+def shelf_sos(freq: float, gain_db: float, high: bool, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """RBJ low or high shelf biquad (slope 1) as one second-order section"""
+    a = 10.0 ** (gain_db / 40.0)
+    w0 = 2.0 * pi * freq / sample_rate
+    c = cos(w0)
+    beta = 2.0 * sqrt(a) * sin(w0) / 2.0 * sqrt(2.0)
+    sign = -1.0 if high else 1.0
+    b = [a * ((a + 1) - sign * (a - 1) * c + beta),
+         sign * 2.0 * a * ((a - 1) - sign * (a + 1) * c),
+         a * ((a + 1) - sign * (a - 1) * c - beta)]
+    den = [(a + 1) + sign * (a - 1) * c + beta,
+           -sign * 2.0 * ((a - 1) + sign * (a + 1) * c),
+           (a + 1) + sign * (a - 1) * c - beta]
+    return np.array([b + den]) / den[0]
+
+
+class EnhancementChain:
+    """Stateful EQ -> clarity -> compressor -> gain chain for one segment.
+
+    Call process() on consecutive blocks of the same signal; the result is
+    identical for any block size.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, low_db: float = 0.0, mid_db: float = 0.0,
+                 high_db: float = 0.0, clarity: float = 0.0, energy: float = 1.0):
+        self.sample_rate = sample_rate
+        self.energy = energy
+        sections = []
+        if low_db:
+            sections.append(shelf_sos(LOW_SHELF_HZ, low_db, False, sample_rate))
+        if mid_db:
+            sections.append(peaking_sos(MID_PEAK_HZ, mid_db, 1.0, sample_rate))
+        if high_db:
+            sections.append(shelf_sos(HIGH_SHELF_HZ, high_db, True, sample_rate))
+        if clarity:
+            sections.append(butter(2, RUMBLE_HZ, 'highpass', fs=sample_rate, output='sos'))
+            sections.append(peaking_sos(PRESENCE_HZ, PRESENCE_MAX_DB * clarity, 1.2, sample_rate))
+        self._sos = np.concatenate(sections) if sections else None
+        self._zi = np.zeros((len(self._sos), 2)) if sections else None
+
+        # Compressor: 10 ms RMS detector and 50 ms gain smoothing, both one-pole
+        self.ratio = 1.0 + (COMPRESSOR_MAX_RATIO - 1.0) * clarity
+        self._detector = self._one_pole(0.010)
+        self._smoother = self._one_pole(0.050)
+        self._detector_zi = None
+        self._smoother_zi = None
+
+    def _one_pole(self, seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+        pole = np.exp(-1.0 / (seconds * self.sample_rate))
+        return np.array([1.0 - pole]), np.array([1.0, -pole])
+
+    @classmethod
+    def from_params(cls, params: Dict, sample_rate: int = SAMPLE_RATE) -> 'EnhancementChain':
+        """Build a chain from enhancement parameters (eq_settings, clarity, energy)"""
+        eq = params.get('eq_settings') or {}
+        if not isinstance(eq, dict):
+            eq = {}
+        return cls(
+            sample_rate,
+            low_db=_number(eq.get('low'), 0.0, -EQ_LIMIT_DB, EQ_LIMIT_DB),
+            mid_db=_number(eq.get('mid'), 0.0, -EQ_LIMIT_DB, EQ_LIMIT_DB),
+            high_db=_number(eq.get('high'), 0.0, -EQ_LIMIT_DB, EQ_LIMIT_DB),
+            clarity=_number(params.get('clarity'), 0.0, 0.0, 1.0),
+            energy=_number(params.get('energy'), 1.0, 0.0, 2.0),
+        )
+
+    def _compress(self, block: np.ndarray) -> np.ndarray:
+        squares = block * block
+        if self._detector_zi is None:
+            self._detector_zi = lfilter_zi(*self._detector) * squares[0]
+        power, self._detector_zi = lfilter(*self._detector, squares, zi=self._detector_zi)
+        level_db = 10.0 * np.log10(np.maximum(power, 1e-12))
+        over = np.maximum(level_db - COMPRESSOR_THRESHOLD_DB, 0.0)
+        gain_db = -over * (1.0 - 1.0 / self.ratio)
+        if self._smoother_zi is None:
+            self._smoother_zi = lfilter_zi(*self._smoother) * gain_db[0]
+        gain_db, self._smoother_zi = lfilter(*self._smoother, gain_db, zi=self._smoother_zi)
+        return block * 10.0 ** (gain_db / 20.0)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Enhance one block; returns a new float32 array of the same length"""
+        block = np.asarray(block, dtype=np.float64)
+        if not len(block):
+            return block.astype(np.float32)
+        if self._sos is not None:
+            block, self._zi = sosfilt(self._sos, block, zi=self._zi)
+        if self.ratio > 1.0:
+            block = self._compress(block)
+        if self.energy != 1.0:
+            block = block * self.energy
+        return block.astype(np.float32)
+
+
+def _stft_frames(x: np.ndarray, first: int, last: int, window: np.ndarray) -> np.ndarray:
+    """rFFT of analysis frames first..last (inclusive) of the centred signal x"""
+    frames = np.lib.stride_tricks.sliding_window_view(x, STRETCH_FFT)[first * STRETCH_HOP:last * STRETCH_HOP + 1:STRETCH_HOP]
+    return sp_fft.rfft(frames * window, axis=1)
+
+
+def time_stretch(audio: np.ndarray, rate: float) -> np.ndarray:
+    """Change duration by 1/rate without changing pitch (phase vocoder)
+
+    rate > 1 speeds speech up. Frames are synthesized STRETCH_CHUNK at a
+    time with the running phase carried across chunks, so working memory
+    beyond the output is bounded.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if rate == 1.0 or len(audio) < STRETCH_FFT:
+        return audio
+    pad = STRETCH_FFT // 2
+    x = np.pad(audio, (pad, pad + STRETCH_FFT))
+    n_frames = 1 + (len(x) - STRETCH_FFT) // STRETCH_HOP
+    window = np.hanning(STRETCH_FFT + 1)[:-1].astype(np.float32)
+    omega = (2.0 * pi * STRETCH_HOP * np.arange(STRETCH_FFT // 2 + 1) / STRETCH_FFT).astype(np.float32)
+
+    steps = np.arange(0, n_frames - 1, rate)
+    out = np.zeros(STRETCH_HOP * (len(steps) + 3), dtype=np.float32)
+    phase = None
+    for j0 in range(0, len(steps), STRETCH_CHUNK):
+        chunk = steps[j0:j0 + STRETCH_CHUNK]
+        index = chunk.astype(np.int64)
+        first = int(index[0])
+        spec = _stft_frames(x, first, int(index[-1]) + 1, window)
+        left, right = spec[index - first], spec[index - first + 1]
+        frac = (chunk - index).astype(np.float32)[:, None]
+        magnitude = (1.0 - frac) * np.abs(left) + frac * np.abs(right)
+
+        advance = np.angle(right) - np.angle(left) - omega
+        advance -= 2.0 * pi * np.round(advance / (2.0 * pi))
+        advance += omega
+        if phase is None:
+            phase = np.angle(left[0])
+        phases = phase + np.concatenate([np.zeros((1, len(omega)), dtype=np.float32),
+                                         np.cumsum(advance[:-1], axis=0)])
+        phase = phases[-1] + advance[-1]
+
+        frames = sp_fft.irfft(magnitude * np.exp(1j * phases), STRETCH_FFT, axis=1).astype(np.float32) * window
+        # n_fft = 4 * hop, so overlap-add is four shifted reshapes
+        base = j0 * STRETCH_HOP
+        count = len(chunk) * STRETCH_HOP
+        for k in range(4):
+            out[base + k * STRETCH_HOP:base + k * STRETCH_HOP + count] += \
+                frames[:, k * STRETCH_HOP:(k + 1) * STRETCH_HOP].reshape(-1)
+
+    out /= float(np.sum(window ** 2) / STRETCH_HOP)
+    length = int(round(len(audio) / rate))
+    return out[pad:pad + length]
+
+
+def pitch_ratio(value) -> float:
+    """Interpret an LLM pitch value: 0.5-2.0 is a frequency ratio, otherwise semitones"""
+    value = _number(value, 1.0, -12.0, 12.0)
+    if 0.5 <= value <= 2.0:
+        return value
+    return 2.0 ** (value / 12.0)
+
+
+def stretch_and_shift(audio: np.ndarray, pace: float = 1.0, pitch: float = 1.0) -> np.ndarray:
+    """Speed up by pace and transpose by the pitch ratio in one vocoder pass"""
+    if pitch == 1.0:
+        return time_stretch(audio, pace)
+    ratio = Fraction(pitch).limit_denominator(64)
+    stretched = time_stretch(audio, pace / float(ratio))
+    # Resampling by 1/ratio restores the duration and shifts pitch by ratio
+    return resample_poly(stretched, ratio.denominator, ratio.numerator).astype(np.float32)
+
+
+def enhance(audio: np.ndarray, params: Dict, sample_rate: int = SAMPLE_RATE,
+            block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Apply pace/pitch, then the EQ/clarity/compressor chain block by block"""
+    pace = _number(params.get('pace', params.get('speed')), 1.0, 0.5, 2.0)
+    pitch = pitch_ratio(params['pitch']) if 'pitch' in params else 1.0
+    audio = stretch_and_shift(audio, pace, pitch)
+
+    chain = EnhancementChain.from_params(params, sample_rate)
+    out = np.empty(len(audio), dtype=np.float32)
+    for start in range(0, len(audio), block_size):
+        out[start:start + block_size] = chain.process(audio[start:start + block_size])
+    return out
+
+
+def enhance_many(items: List[Tuple[np.ndarray, Dict]], sample_rate: int = SAMPLE_RATE,
+                 workers: Optional[int] = None) -> List[np.ndarray]:
+    """Enhance several (audio, params) segments on a thread pool, preserving order"""
+    workers = workers or min(len(items), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enhance') as pool:
+        return list(pool.map(bind(lambda item: enhance(item[0], item[1], sample_rate)), items))
@@ -0,0 +1,190 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import soundfile as sf
+
+from telemetry import metrics
+from telemetry.tracing import bind, span
+
+from .assets import SAMPLE_RATE
+
+# extension -> (libsndfile format, subtype, ffmpeg codec args for the fallback)
+FORMATS = {
+    'wav': ('WAV', 'PCM_16', None),
+    'flac': ('FLAC', 'PCM_16', None),
+    'opus': ('OGG', 'OPUS', ['-c:a', 'libopus', '-b:a', '48k']),
+    'mp3': ('MP3', 'MPEG_LAYER_III', ['-c:a', 'libmp3lame', '-b:a', '96k']),
+}
+
+QUEUE_DEPTH = 8
+
+
+def make_job_dir(root: str = 'output', job_id: Optional[str] = None) -> str:
+    """Create a fresh directory for one render job and return its path"""
+    if job_id is None:
+        job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    job_dir = os.path.join(root, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    return job_dir
+
+
+class SoundFileEncoder:
+    """Incremental encoder writing through libsndfile"""
+
+    def __init__(self, path: str, fmt: str, sample_rate: int = SAMPLE_RATE):
+        container, subtype, _ = FORMATS[fmt]
+        self.path = path
+        self.file = sf.SoundFile(path, 'w', sample_rate, 1, subtype=subtype, format=container)
+
+    def write(self, block: np.ndarray) -> None:
+        self.file.write(block)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class FFmpegEncoder:
+    """Incremental encoder piping raw float32 samples into ffmpeg"""
+
+    def __init__(self, path: str, fmt: str, sample_rate: int = SAMPLE_RATE):
+        ffmpeg = shutil.which('ffmpeg')
+        codec = FORMATS[fmt][2]
+        if ffmpeg is None or codec is None:
+            raise RuntimeError(f"No encoder available for {fmt}: libsndfile lacks it and ffmpeg was not found")
+        self.path = path
+        self.process = subprocess.Popen(
+            [ffmpeg, '-loglevel', 'error', '-y', '-f', 'f32le', '-ar', str(sample_rate), '-ac', '1',
+             '-i', '-', *codec, path],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, block: np.ndarray) -> None:
+        self.process.stdin.write(np.ascontiguousarray(block, dtype='<f4').tobytes())
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode} writing {self.path}")
+
+
+def open_encoder(path: str, fmt: str, sample_rate: int = SAMPLE_RATE):
+    """Open a streaming encoder for fmt, preferring libsndfile over ffmpeg"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    container, subtype, _ = FORMATS[fmt]
+    if sf.check_format(container, subtype):
+        return SoundFileEncoder(path, fmt, sample_rate)
+    return FFmpegEncoder(path, fmt, sample_rate)
+
+
+class ParallelEncoder:
+    """Encode one stream of blocks into several formats at once.
+
+    Each format gets its own thread fed through a bounded queue, so
+    encoders run concurrently (libsndfile and ffmpeg pipes release the GIL)
+    while at most QUEUE_DEPTH blocks per format are buffered. A format that
+    fails is dropped with a warning; close() raises only if every format
+    failed.
+
+        with ParallelEncoder(job_dir, 'episode', ['wav', 'mp3']) as encoder:
+            for _, block in timeline.blocks():
+                encoder.write(block)
+        encoder.outputs  # {'wav': '.../episode.wav', 'mp3': '.../episode.mp3'}
+    """
+
+    def __init__(self, directory: str, basename: str, formats: Iterable[str],
+                 sample_rate: int = SAMPLE_RATE, queue_depth: int = QUEUE_DEPTH):
+        self.outputs: Dict[str, str] = {}
+        self.errors: Dict[str, Exception] = {}
+        self.frames = 0
+        self._workers = []
+        for fmt in dict.fromkeys(formats):
+            path = os.path.join(directory, f"{basename}.{fmt}")
+            try:
+                encoder = open_encoder(path, fmt, sample_rate)
+            except Exception as e:
+                print(f"Warning: skipping {fmt} output: {str(e)}")
+                self.errors[fmt] = e
+                continue
+            blocks = queue.Queue(maxsize=queue_depth)
+            thread = threading.Thread(target=bind(self._run), args=(fmt, encoder, blocks),
+                                      name=f"encode-{fmt}", daemon=True)
+            thread.start()
+            self._workers.append((fmt, encoder, blocks, thread))
+        if not self._workers:
+            raise RuntimeError(f"Could not open any output format: {self.errors}")
+
+    def _run(self, fmt: str, encoder, blocks: queue.Queue) -> None:
+        with span(f"encode.{fmt}", path=encoder.path) as s:
+            self._drain(fmt, encoder, blocks, s)
+
+    def _drain(self, fmt: str, encoder, blocks: queue.Queue, s) -> None:
+        failed = False
+        samples = 0
+        busy = 0.0  # seconds spent encoding, excluding waits for input
+        while True:
+            block = blocks.get()
+            if block is None:
+                break
+            if failed:
+                continue  # keep draining so the producer never blocks
+            start = time.perf_counter()
+            samples += len(block)
+            try:
+                encoder.write(block)
+            except Exception as e:
+                self.errors[fmt] = e
+                failed = True
+            busy += time.perf_counter() - start
+        start = time.perf_counter()
+        try:
+            encoder.close()
+        except Exception as e:
+            self.errors.setdefault(fmt, e)
+        metrics.STAGE_SECONDS.observe(busy + time.perf_counter() - start, stage="encode")
+        s.set(samples=samples, busy_s=busy)
+
+    def write(self, block: np.ndarray) -> None:
+        """Queue a block for every format; the block is copied once and shared"""
+        block = np.array(block, dtype=np.float32)
+        self.frames += len(block)
+        for fmt, _, blocks, _ in self._workers:
+            blocks.put(block)
+            metrics.QUEUE_DEPTH.set(blocks.qsize(), queue=f"encode-{fmt}")
+
+    def close(self) -> Dict[str, str]:
+        """Flush all encoders and return {format: path} for the ones that succeeded"""
+        for _, _, blocks, _ in self._workers:
+            blocks.put(None)
+        for fmt, encoder, _, thread in self._workers:
+            thread.join()
+            metrics.QUEUE_DEPTH.set(0, queue=f"encode-{fmt}")
+            if fmt in self.errors:
+                print(f"Warning: {fmt} encoding failed: {str(self.errors[fmt])}")
+                if os.path.exists(encoder.path):
+                    os.remove(encoder.path)
+            else:
+                self.outputs[fmt] = encoder.path
+        self._workers = []
+        if not self.outputs:
+            raise RuntimeError(f"All output encoders failed: {self.errors}")
+        return self.outputs
+
+    def __enter__(self) -> 'ParallelEncoder':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._workers:
+            try:
+                self.close()
+            except Exception:
+                if exc_type is None:
+                    raise
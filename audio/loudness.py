@@ -0,0 +1,262 @@
+"""EBU R128 / ITU-R BS.1770-4 loudness measurement and normalization.
+
+Everything here is block-streaming: filters carry their state between
+blocks, the meter keeps one energy value per 100 ms, and the limiter holds
+only its lookahead, so an episode of any length is processed in O(block)
+memory.
+"""
+from math import log10, pi, tan
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import numpy as np
+from scipy.ndimage import minimum_filter1d
+from scipy.signal import firwin, sosfilt
+
+from .assets import SAMPLE_RATE
+
+TARGET_LUFS = -16.0        # Apple Podcasts / most podcast hosts
+TRUE_PEAK_CEILING = -1.0   # dBTP
+ABSOLUTE_GATE = -70.0      # LUFS
+RELATIVE_GATE = -10.0      # LU below the absolute-gated loudness
+
+# 4x oversampling interpolator for true-peak detection (BS.1770-4 Annex 2)
+_OVERSAMPLE = 4
+_TP_TAPS = 48
+_TP_MARGIN = _TP_TAPS // _OVERSAMPLE // 2
+
+
+def db_to_gain(db: float) -> float:
+    """Convert a level in dB to a linear amplitude factor"""
+    return 10.0 ** (float(db) / 20.0)
+
+
+def gain_to_db(gain: float) -> float:
+    """Convert a linear amplitude factor to dB"""
+    return 20.0 * log10(max(float(gain), 1e-12))
+
+
+def k_weighting_sos(sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """BS.1770 K-weighting (shelf + high-pass) as second-order sections at any rate"""
+    # Pre-filter: high shelf modelling the acoustic effect of the head
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = tan(pi * f0 / sample_rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    # RLB weighting: second-order high-pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = tan(pi * f0 / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+_TP_PHASES = [np.asarray(p, dtype=np.float64) for p in
+              (firwin(_TP_TAPS, 1.0 / _OVERSAMPLE) * _OVERSAMPLE).reshape(-1, _OVERSAMPLE).T]
+
+
+def _true_peaks(x: np.ndarray) -> np.ndarray:
+    """Per-sample true-peak magnitude for x[m:-m] where m = _TP_MARGIN
+
+    Each output is the largest of the sample itself and the interpolated
+    values around it, so the result is valid only where the interpolator
+    sees a full window of neighbours.
+    """
+    m = _TP_MARGIN
+    n = len(x) - 2 * m
+    if n <= 0:
+        return np.zeros(0)
+    peaks = np.abs(x[m:m + n]).astype(np.float64)
+    for phase in _TP_PHASES:
+        # full convolution index 2m + i interpolates between x[m + i] and x[m + i + 1]
+        y = np.convolve(x, phase, mode='full')[2 * m:2 * m + n]
+        np.maximum(peaks, np.abs(y), out=peaks)
+    return peaks
+
+
+class LoudnessMeter:
+    """Streaming gated integrated loudness (LUFS) and true peak.
+
+    Feed blocks of any size with add(); read integrated_loudness() and
+    true_peak_db() at any time.
+    """
+
+    STEP = 0.1      # 100 ms hop between gating blocks
+    WINDOW = 4      # gating block = 4 steps = 400 ms
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.step = int(round(sample_rate * self.STEP))
+        self._sos = k_weighting_sos(sample_rate)
+        self._zi = np.zeros((self._sos.shape[0], 2))
+        self._partial = 0.0     # sum of squares in the current 100 ms step
+        self._partial_n = 0
+        self._steps: List[float] = []  # mean square of each complete step
+        self._tp_tail = np.zeros(2 * _TP_MARGIN)
+        self._peak = 0.0
+        self.frames = 0
+
+    def add(self, block: np.ndarray) -> None:
+        block = np.asarray(block, dtype=np.float64)
+        if not len(block):
+            return
+        self.frames += len(block)
+
+        ext = np.concatenate([self._tp_tail, block])
+        peaks = _true_peaks(ext)
+        if len(peaks):
+            self._peak = max(self._peak, float(peaks.max()))
+        self._tp_tail = ext[-2 * _TP_MARGIN:]
+
+        weighted, self._zi = sosfilt(self._sos, block, zi=self._zi)
+        squares = weighted * weighted
+        pos = 0
+        if self._partial_n:
+            take = min(self.step - self._partial_n, len(squares))
+            self._partial += float(squares[:take].sum())
+            self._partial_n += take
+            pos = take
+            if self._partial_n == self.step:
+                self._steps.append(self._partial / self.step)
+                self._partial, self._partial_n = 0.0, 0
+        whole = (len(squares) - pos) // self.step
+        if whole:
+            sums = squares[pos:pos + whole * self.step].reshape(whole, self.step).mean(axis=1)
+            self._steps.extend(sums.tolist())
+            pos += whole * self.step
+        if pos < len(squares):
+            self._partial += float(squares[pos:].sum())
+            self._partial_n += len(squares) - pos
+
+    def _block_energies(self) -> np.ndarray:
+        steps = np.asarray(self._steps)
+        if len(steps) < self.WINDOW:
+            return np.zeros(0)
+        windows = np.lib.stride_tricks.sliding_window_view(steps, self.WINDOW)
+        return windows.mean(axis=1)
+
+    def integrated_loudness(self) -> float:
+        """Gated integrated loudness in LUFS (-inf for silence or < 400 ms)"""
+        energies = self._block_energies()
+        energies = energies[energies > 0]
+        if not len(energies):
+            return float('-inf')
+        loudness = -0.691 + 10.0 * np.log10(energies)
+        gated = energies[loudness > ABSOLUTE_GATE]
+        if not len(gated):
+            return float('-inf')
+        relative = -0.691 + 10.0 * log10(gated.mean()) + RELATIVE_GATE
+        gated = energies[(loudness > ABSOLUTE_GATE) & (loudness > relative)]
+        if not len(gated):
+            return float('-inf')
+        return -0.691 + 10.0 * log10(gated.mean())
+
+    def true_peak_db(self) -> float:
+        """Maximum true peak seen so far in dBTP (ignores the last few samples)"""
+        return gain_to_db(self._peak) if self._peak > 0 else float('-inf')
+
+
+class TruePeakLimiter:
+    """Lookahead brickwall limiter on the 4x-oversampled peak, block-vectorized.
+
+    The required gain per sample is min(1, ceiling / true peak). It is
+    min-filtered over [t - release, t + lookahead] and then box-averaged
+    over the lookahead, which guarantees the gain has fully ramped down by
+    the time a peak arrives. Output is delayed by lookahead + interpolator
+    margin samples; flush() returns the tail so no audio is lost.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, ceiling_db: float = TRUE_PEAK_CEILING,
+                 lookahead_ms: float = 5.0, release_ms: float = 50.0):
+        self.ceiling = db_to_gain(ceiling_db)
+        self.attack = max(1, int(sample_rate * lookahead_ms / 1000.0))
+        self.release = max(0, int(sample_rate * release_ms / 1000.0))
+        # samples of history every output sample depends on
+        self._back = self.attack - 1 + self.release + _TP_MARGIN
+        # samples of future every output sample depends on
+        self._ahead = self.attack + _TP_MARGIN
+        self._buf = np.zeros(self._back)   # history + pending input
+        self._pending = 0                   # input samples not yet emitted
+
+    def _run(self, final: bool) -> np.ndarray:
+        buf = self._buf
+        if final:
+            buf = np.concatenate([buf, np.zeros(self._ahead)])
+        m = _TP_MARGIN
+        peaks = _true_peaks(buf)                             # buf index m + i
+        with np.errstate(divide='ignore'):
+            required = np.minimum(1.0, self.ceiling / peaks)
+        window = self.release + self.attack + 1
+        # minimum over required[i - release .. i + attack]
+        mins = minimum_filter1d(required, window, mode='nearest',
+                                origin=(window - 1) // 2 - self.attack)
+        # mean of mins[j - attack + 1 .. j]
+        csum = np.concatenate([[0.0], np.cumsum(mins)])
+        gains = (csum[self.attack:] - csum[:-self.attack]) / self.attack  # index j - attack + 1
+
+        # gains[k] belongs to buf index m + k + attack - 1; it is trustworthy
+        # when the whole dependency window lies inside buf.
+        first = self._back
+        last = len(buf) - self._ahead
+        count = min(self._pending, max(last - first, 0))
+        out = buf[first:first + count] * gains[first - m - self.attack + 1:first - m - self.attack + 1 + count]
+
+        self._pending -= count
+        keep = self._back + self._pending
+        self._buf = self._buf[len(self._buf) - keep:] if keep else np.zeros(0)
+        return out.astype(np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Limit one block; returns the samples that are ready (delayed)"""
+        self._buf = np.concatenate([self._buf, np.asarray(block, dtype=np.float64)])
+        self._pending += len(block)
+        return self._run(final=False)
+
+    def flush(self) -> np.ndarray:
+        """Return all remaining samples"""
+        return self._run(final=True)
+
+
+def measure(blocks: Iterable[np.ndarray], sample_rate: int = SAMPLE_RATE) -> LoudnessMeter:
+    """Run a meter over a stream of blocks"""
+    meter = LoudnessMeter(sample_rate)
+    for block in blocks:
+        meter.add(block)
+    return meter
+
+
+def normalization_gain(meter: LoudnessMeter, target_lufs: float = TARGET_LUFS, max_gain_db: float = 30.0) -> float:
+    """Gain in dB that brings the metered audio to target_lufs"""
+    loudness = meter.integrated_loudness()
+    gain_db = 0.0 if loudness == float('-inf') else min(target_lufs - loudness, max_gain_db)
+    print(f"Loudness: {loudness:.1f} LUFS, true peak {meter.true_peak_db():.1f} dBTP, "
+          f"applying {gain_db:+.1f} dB toward {target_lufs:.1f} LUFS")
+    return gain_db
+
+
+def normalize(make_blocks: Callable[[], Iterable[np.ndarray]], sample_rate: int = SAMPLE_RATE,
+              target_lufs: float = TARGET_LUFS, ceiling_db: float = TRUE_PEAK_CEILING,
+              max_gain_db: float = 30.0, meter: Optional[LoudnessMeter] = None,
+              gain_db: Optional[float] = None) -> Iterator[np.ndarray]:
+    """Two-pass streaming normalization to target_lufs with a true-peak ceiling.
+
+    make_blocks is called twice (measure, then apply) and must yield the
+    same audio both times, e.g. lambda: (b for _, b in timeline.blocks()).
+    Neither pass holds more than one block plus the limiter lookahead. A
+    gain_db from normalization_gain() skips the measuring pass.
+    """
+    if gain_db is None:
+        if meter is None:
+            meter = measure(make_blocks(), sample_rate)
+        gain_db = normalization_gain(meter, target_lufs, max_gain_db)
+    gain = db_to_gain(gain_db)
+    limiter = TruePeakLimiter(sample_rate, ceiling_db)
+    for block in make_blocks():
+        out = limiter.process(np.asarray(block, dtype=np.float64) * gain)
+        if len(out):
+            yield out
+    tail = limiter.flush()
+    if len(tail):
+        yield tail
@@ -0,0 +1,194 @@
+"""On-disk episode projects for incremental re-export.
+
+A rendered episode keeps, next to its encoded outputs in the job
+directory:
+
+    project.json        settings, mix parameters, loudness gain and one
+                        entry per segment: content hash, stem and the
+                        speech's sample offsets on the timeline
+    stems/<i>-<hash>.npy   enhanced speech of each segment
+    mixdown.npy         the loudness-normalized mix that was encoded
+
+When the script changes, only segments whose hash changed are re-rendered.
+splice() then streams a new mixdown: unchanged audio is copied from the
+old one, and every dirty run of segments is mixed again from the stems,
+padded on both sides so music bed crossfades are rebuilt in full, and
+crossfaded back in at the joins. Samples outside those regions are never
+mixed or normalized again.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .assets import SAMPLE_RATE
+from .loudness import TRUE_PEAK_CEILING, TruePeakLimiter, db_to_gain
+from .timeline import BLOCK_SIZE, Timeline
+
+PROJECT_FILE = 'project.json'
+STEM_DIR = 'stems'
+MIXDOWN_FILE = 'mixdown.npy'
+VERSION = 1
+
+# Length of the crossfade where re-rendered audio joins the old mixdown
+SPLICE_CROSSFADE_SECONDS = 0.05
+
+# Segment fields that change its audio; titles and notes do not
+AUDIO_FIELDS = ('content', 'lines', 'speaker', 'enhancements', 'music', 'sound_effect')
+
+# (old start, old end, new start, new end) of one re-rendered region
+Region = Tuple[int, int, int, int]
+
+
+def segment_hash(segment: Dict, settings: Dict) -> str:
+    """Hash of everything that determines a segment's rendered audio"""
+    fields = {k: segment.get(k) for k in AUDIO_FIELDS}
+    payload = json.dumps([fields, settings], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class EpisodeProject:
+    """Stems, offsets and mixdown of one rendered episode"""
+
+    def __init__(self, job_dir: str, sample_rate: int = SAMPLE_RATE):
+        self.job_dir = job_dir
+        self.sample_rate = sample_rate
+        self.data: Dict = {'version': VERSION, 'sample_rate': sample_rate, 'settings': {}, 'mix': {},
+                           'segments': [], 'length': 0}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.job_dir, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path(PROJECT_FILE)) and os.path.exists(self.path(MIXDOWN_FILE))
+
+    def load(self) -> 'EpisodeProject':
+        with open(self.path(PROJECT_FILE), encoding='utf-8') as f:
+            self.data = json.load(f)
+        if self.data.get('version') != VERSION:
+            raise ValueError(f"Unsupported project version {self.data.get('version')} in {self.job_dir}")
+        self.sample_rate = self.data['sample_rate']
+        return self
+
+    def save(self) -> str:
+        path = self.path(PROJECT_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    @property
+    def segments(self) -> List[Dict]:
+        return self.data['segments']
+
+    def save_stem(self, index: int, digest: str, audio: np.ndarray) -> str:
+        """Write a segment's enhanced speech and return its path relative to the job"""
+        name = os.path.join(STEM_DIR, f"{index:03d}-{digest}.npy")
+        os.makedirs(self.path(STEM_DIR), exist_ok=True)
+        np.save(self.path(name), np.asarray(audio, dtype=np.float32))
+        return name
+
+    def load_stem(self, entry: Dict) -> np.ndarray:
+        return np.load(self.path(entry['stem']), mmap_mode='r')
+
+    def prune_stems(self) -> None:
+        """Delete stems no segment refers to any more"""
+        used = {os.path.normpath(s['stem']) for s in self.segments if s.get('stem')}
+        directory = self.path(STEM_DIR)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if os.path.join(STEM_DIR, name) not in used:
+                os.remove(os.path.join(directory, name))
+
+    def open_mixdown(self, length: int, name: str = MIXDOWN_FILE) -> np.ndarray:
+        """Writable memmap for a mixdown of length samples"""
+        return np.lib.format.open_memmap(self.path(name), mode='w+', dtype=np.float32, shape=(length,))
+
+    def mixdown(self) -> np.ndarray:
+        return np.load(self.path(MIXDOWN_FILE), mmap_mode='r')
+
+    def boundaries(self, segments: List[Dict], total: int) -> List[Tuple[int, int]]:
+        """[start, end) of each segment's share of the mix, split halfway between speech clips"""
+        bounds = []
+        for i, entry in enumerate(segments):
+            lo = 0 if i == 0 else (segments[i - 1]['end'] + entry['start']) // 2
+            hi = total if i + 1 == len(segments) else (entry['end'] + segments[i + 1]['start']) // 2
+            bounds.append((lo, hi))
+        return bounds
+
+    def regions(self, dirty: List[int], new_segments: List[Dict], new_total: int, pad: int) -> List[Region]:
+        """Old and new sample ranges covering each run of consecutive dirty segments, padded by pad"""
+        old_bounds = self.boundaries(self.segments, self.data['length'])
+        new_bounds = self.boundaries(new_segments, new_total)
+        runs: List[List[int]] = []
+        for i in sorted(dirty):
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        regions = []
+        for first, last in runs:
+            lo_pad = min(pad, old_bounds[first][0], new_bounds[first][0])
+            hi_pad = min(pad, self.data['length'] - old_bounds[last][1], new_total - new_bounds[last][1])
+            region = (old_bounds[first][0] - lo_pad, old_bounds[last][1] + hi_pad,
+                      new_bounds[first][0] - lo_pad, new_bounds[last][1] + hi_pad)
+            # Padding can make neighbouring runs overlap; merge them
+            if regions and region[0] <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], region[1], regions[-1][2], region[3])
+            else:
+                regions.append(region)
+        return regions
+
+    def splice(self, timeline: Timeline, regions: List[Region], gain_db: float,
+               crossfade_seconds: float = SPLICE_CROSSFADE_SECONDS,
+               ceiling_db: float = TRUE_PEAK_CEILING) -> Iterator[np.ndarray]:
+        """Blocks of the new mixdown: old audio outside regions, timeline audio inside.
+
+        Each region is mixed from the new timeline, given the episode's
+        loudness gain and limited, then joined to the old mixdown with
+        linear crossfades at both ends; the audio on both sides of a join
+        is the same unchanged material, so the seam is inaudible.
+        """
+        old = self.mixdown()
+        fade = int(round(crossfade_seconds * self.sample_rate))
+        gain = db_to_gain(gain_db)
+        position = 0
+        for old_lo, old_hi, new_lo, new_hi in _join(regions, 2 * fade):
+            head = min(fade, old_lo, (new_hi - new_lo) // 2)
+            tail = min(fade, len(old) - old_hi, (new_hi - new_lo) // 2)
+            yield from _copy(old, position, old_lo - head)
+
+            limiter = TruePeakLimiter(self.sample_rate, ceiling_db)
+            parts = [limiter.process(np.asarray(b, dtype=np.float64) * gain)
+                     for _, b in timeline.blocks(start=new_lo - head, stop=new_hi + tail)]
+            parts.append(limiter.flush())
+            region = np.concatenate(parts)
+
+            if head:
+                ramp = np.linspace(0, 1, head, endpoint=False, dtype=np.float32) + 0.5 / head
+                region[:head] = old[old_lo - head:old_lo] * (1 - ramp) + region[:head] * ramp
+            if tail:
+                ramp = np.linspace(0, 1, tail, endpoint=False, dtype=np.float32) + 0.5 / tail
+                region[-tail:] = region[-tail:] * (1 - ramp) + old[old_hi:old_hi + tail] * ramp
+            yield region
+            position = old_hi + tail
+        yield from _copy(old, position, len(old))
+
+
+def _join(regions: List[Region], gap: int) -> List[Region]:
+    """Merge regions less than gap samples apart, so their crossfades never overlap"""
+    joined: List[Region] = []
+    for region in regions:
+        if joined and region[0] - joined[-1][1] < gap:
+            # Old and new audio between the two regions is the same material
+            joined[-1] = (joined[-1][0], region[1], joined[-1][2], region[3])
+        else:
+            joined.append(region)
+    return joined
+
+
+def _copy(source: np.ndarray, start: int, stop: int, block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+    for lo in range(start, stop, block_size):
+        yield np.asarray(source[lo:min(lo + block_size, stop)])
@@ -0,0 +1,238 @@
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .assets import LoopedAsset, SAMPLE_RATE
+
+BLOCK_SIZE = 65536
+
+Source = Union[np.ndarray, LoopedAsset]
+
+
+def same_bed(a: Optional[LoopedAsset], b: Optional[LoopedAsset]) -> bool:
+    """True when two music beds play the same track"""
+    return a is b or (a is not None and b is not None and a.name == b.name and a.data is b.data)
+
+
+def bed_runs(beds: List[Tuple[Optional[LoopedAsset], int, int, float]]) -> List[int]:
+    """For each (bed, start, end, gain) region, the index of the first region its music bed plays from.
+
+    Regions that add_music_beds merges share one index; a region without
+    music starts its own.
+    """
+    runs: List[int] = []
+    for i, (bed, _, _, gain) in enumerate(beds):
+        if i and bed is not None and same_bed(beds[i - 1][0], bed) and beds[i - 1][3] == gain:
+            runs.append(runs[-1])
+        else:
+            runs.append(i)
+    return runs
+
+
+class Clip:
+    """One source placed on the timeline at a sample offset.
+
+    `source` is either a finite 1-D array (speech, effects) or a LoopedAsset
+    (music beds), which needs an explicit length. Fades are equal-power and
+    measured in samples, so two beds overlapping by N samples with
+    fade_out=N / fade_in=N crossfade at constant power.
+    """
+
+    __slots__ = ('source', 'start', 'length', 'gain', 'fade_in', 'fade_out', 'offset')
+
+    def __init__(self, source: Source, start: int, length: Optional[int] = None, gain: float = 1.0,
+                 fade_in: int = 0, fade_out: int = 0, offset: int = 0):
+        if length is None:
+            if isinstance(source, LoopedAsset):
+                raise ValueError("Looped clips need an explicit length")
+            length = len(source) - offset
+        self.source = source
+        self.start = int(start)
+        self.length = max(int(length), 0)
+        self.gain = float(gain)
+        self.fade_in = min(int(fade_in), self.length)
+        self.fade_out = min(int(fade_out), self.length)
+        self.offset = int(offset)
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+    def _views(self, begin: int, count: int) -> Iterator[np.ndarray]:
+        """Source samples [begin, begin + count) relative to the clip start"""
+        if isinstance(self.source, LoopedAsset):
+            yield from self.source.blocks(count, self.offset + begin)
+        else:
+            yield self.source[self.offset + begin:self.offset + begin + count]
+
+    def _envelope(self, begin: int, count: int) -> Optional[np.ndarray]:
+        """Fade envelope for clip samples [begin, begin + count), None if flat"""
+        in_fade = self.fade_in and begin < self.fade_in
+        out_fade = self.fade_out and begin + count > self.length - self.fade_out
+        if not in_fade and not out_fade:
+            return None
+        pos = np.arange(begin, begin + count, dtype=np.float32)
+        env = np.ones(count, dtype=np.float32)
+        if in_fade:
+            np.minimum(env, np.sin(0.5 * np.pi * np.clip(pos / self.fade_in, 0, 1)), out=env)
+        if out_fade:
+            np.minimum(env, np.sin(0.5 * np.pi * np.clip((self.length - pos) / self.fade_out, 0, 1)), out=env)
+        return env
+
+    def mix_into(self, block: np.ndarray, block_start: int, scratch: np.ndarray) -> None:
+        """Add this clip's contribution to block, which starts at block_start"""
+        lo = max(self.start, block_start)
+        hi = min(self.end, block_start + len(block))
+        if hi <= lo:
+            return
+        begin = lo - self.start
+        env = self._envelope(begin, hi - lo)
+        pos = lo - block_start
+        done = 0
+        for view in self._views(begin, hi - lo):
+            n = len(view)
+            tmp = scratch[:n]
+            if env is None:
+                np.multiply(view, self.gain, out=tmp)
+            else:
+                np.multiply(view, env[done:done + n], out=tmp)
+                tmp *= self.gain
+            block[pos:pos + n] += tmp
+            pos += n
+            done += n
+
+
+class Timeline:
+    """Sample-accurate episode timeline rendered block by block.
+
+    Speech, music beds and effects are placed at absolute sample offsets and
+    summed one block at a time, so working memory is O(block) regardless of
+    episode length and the episode is never concatenated or copied as a
+    whole. render() collects the blocks into a preallocated float32 buffer,
+    or an np.memmap when given a path.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.clips: List[Clip] = []
+        self.cursor = 0
+
+    def __len__(self) -> int:
+        return max([self.cursor] + [c.end for c in self.clips])
+
+    @property
+    def duration(self) -> float:
+        return len(self) / self.sample_rate
+
+    def seconds_to_samples(self, seconds: float) -> int:
+        return int(round(float(seconds) * self.sample_rate))
+
+    def add(self, clip: Clip) -> Clip:
+        self.clips.append(clip)
+        return clip
+
+    def add_speech(self, audio: np.ndarray, start: Optional[int] = None, gap: int = 0, gain: float = 1.0) -> Clip:
+        """Place speech at start, or after the previous speech plus gap samples"""
+        if start is None:
+            start = self.cursor + (gap if self.cursor else 0)
+        clip = self.add(Clip(audio, start, gain=gain))
+        self.cursor = max(self.cursor, clip.end)
+        return clip
+
+    def add_music(self, bed: LoopedAsset, start: int, length: int, gain: float = 1.0,
+                  fade_in: int = 0, fade_out: int = 0, offset: int = 0) -> Clip:
+        """Place a looped music bed over [start, start + length)"""
+        return self.add(Clip(bed, start, length, gain, fade_in, fade_out, offset))
+
+    def add_music_beds(self, beds: List[Tuple[Optional[LoopedAsset], int, int, float]], crossfade: int) -> List[Clip]:
+        """Lay out consecutive (bed, start, end, gain) regions with crossfades.
+
+        Adjacent regions using the same bed and gain are merged so the track
+        keeps playing instead of restarting; a change of bed overlaps the
+        outgoing and incoming tracks by `crossfade` samples, and the first
+        and last beds fade in and out over the same length. A bed of None
+        leaves that region without music.
+        """
+        # Stretch each region to the start of the next so music bridges gaps
+        beds = [
+            (bed, start, max(end, beds[i + 1][1]) if i + 1 < len(beds) else end, gain)
+            for i, (bed, start, end, gain) in enumerate(beds)
+        ]
+        merged: List[list] = []
+        for bed, start, end, gain in beds:
+            if merged and same_bed(merged[-1][0], bed) and merged[-1][3] == gain and merged[-1][2] >= start:
+                merged[-1][2] = end
+            else:
+                merged.append([bed, start, end, gain])
+
+        clips = []
+        for i, (bed, start, end, gain) in enumerate(merged):
+            if bed is None:
+                continue
+            lead = min(crossfade // 2, start) if i > 0 else 0
+            tail = crossfade - crossfade // 2 if i + 1 < len(merged) else 0
+            clips.append(self.add_music(bed, start - lead, end - start + lead + tail, gain,
+                                        fade_in=crossfade, fade_out=crossfade))
+        return clips
+
+    def add_effect(self, effect: np.ndarray, start: int, gain: float = 1.0) -> Clip:
+        """Place a one-shot sound effect at start"""
+        return self.add(Clip(effect, max(int(start), 0), gain=gain))
+
+    def blocks(self, block_size: int = BLOCK_SIZE, start: int = 0,
+               stop: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (offset, samples) for consecutive rendered blocks of [start, stop).
+
+        The yielded array is reused for the next block, so consumers must
+        copy or write it out before advancing the iterator.
+        """
+        total = len(self) if stop is None else min(int(stop), len(self))
+        clips = sorted(self.clips, key=lambda c: c.start)
+        block = np.empty(block_size, dtype=np.float32)
+        scratch = np.empty(block_size, dtype=np.float32)
+        active: List[Clip] = []
+        next_clip = 0
+        for block_start in range(max(int(start), 0), total, block_size):
+            n = min(block_size, total - block_start)
+            out = block[:n]
+            out.fill(0)
+            block_end = block_start + n
+            while next_clip < len(clips) and clips[next_clip].start < block_end:
+                active.append(clips[next_clip])
+                next_clip += 1
+            active = [c for c in active if c.end > block_start]
+            for clip in active:
+                clip.mix_into(out, block_start, scratch)
+            yield block_start, out
+
+    def peak(self, block_size: int = BLOCK_SIZE) -> float:
+        """Sample peak of the mixdown, measured block by block without storing it"""
+        peak = 0.0
+        for _, block in self.blocks(block_size):
+            if len(block):
+                peak = max(peak, float(np.max(np.abs(block))))
+        return peak
+
+    def render(self, path: Optional[str] = None, block_size: int = BLOCK_SIZE, normalize: bool = True) -> np.ndarray:
+        """Render the whole episode into one float32 buffer.
+
+        With a path the buffer is an .npy-backed np.memmap, keeping resident
+        memory bounded for multi-hour episodes. With normalize, a single
+        episode-wide gain brings the peak back under full scale.
+        """
+        total = len(self)
+        if path:
+            out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(total,))
+        else:
+            out = np.empty(total, dtype=np.float32)
+
+        peak = 0.0
+        for start, block in self.blocks(block_size):
+            out[start:start + len(block)] = block
+            if len(block):
+                peak = max(peak, float(np.max(np.abs(block))))
+
+        if normalize and peak > 1.0:
+            for start in range(0, total, block_size):
+                out[start:start + block_size] /= peak
+        return out
@@ -1,47 +1,96 @@
 import os
+import hashlib
+import threading
 import numpy as np
-import soundfile as sf
 import traceback
-import gradio as gr
-from typing import Dict, List, Optional
-from crew import PodcastCrew
-from agents import (
-    ResearchAgent,
-    ContentAgent,
-    FactCheckingAgent,
-    ShowNotesAgent,
-    AudioEnhancementAgent
-)
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+from audio import (AssetLibrary, Clip, EpisodeProject, LoopedAsset, Timeline, ParallelEncoder, make_job_dir, loudness,
+                   db_to_gain, segment_hash)
+from audio.project import MIXDOWN_FILE
+from audio.timeline import bed_runs
+from audio.dsp import enhance
+from crew.checkpoint import RunCheckpoint
+from tts.dialogue import DialogueRenderer, VoiceCast
+from tts.topology import apply_saved
+from telemetry.metrics import (AUDIO_SECONDS, ENGINE_READY, JOBS, QUEUE_DEPTH, STAGE_SECONDS, SYNTHESIS_RTF,
+                               start_from_env, write_metrics)
+from telemetry.tracing import bind, span, start_trace, stop_trace
 import json
-import requests
-from pathlib import Path
 from datetime import datetime
-import torch
 import sys
-import soundfile as sf
+import time
 
-# Add Kokoro to path
+# Add Kokoro to path. torch, Kokoro, CrewAI and Gradio are imported where
+# they are first needed, so a headless synthesis worker skips the crew and
+# UI import graph entirely.
 kokoro_path = os.path.join(os.path.dirname(__file__), 'Kokoro-82M')
 sys.path.append(kokoro_path)
 
-from models import build_model
-from kokoro import generate
-
 class AutoPodcastCreator:
+    # Silence between segments and overlap when the music bed changes
+    SEGMENT_GAP_SECONDS = 0.0
+    MUSIC_CROSSFADE_SECONDS = 2.0
+    
+    # Every job renders into its own OUTPUT_ROOT/<job id>/ directory
+    OUTPUT_ROOT = "output"
+    OUTPUT_FORMATS = ("wav", "mp3")
+    
+    # Integrated loudness of the final mix, in LUFS
+    TARGET_LUFS = loudness.TARGET_LUFS
+
+    # Reuse each voice's style-conditioned layer parameters across chunks
+    CACHE_STYLES = True
+
+    # Decode long chunks in windows of this many 40 ms frames to bound the
+    # vocoder's peak memory; None decodes every chunk in one pass. Windowed
+    # output only approximates a single pass (instance norms see one window),
+    # so episodes use single-pass decoding; stream_speech always uses windows
+    DECODE_WINDOW = None
+    STREAM_WINDOW = 128
+
+    # Seed for the vocoder's random phase and noise, mixed with each chunk's
+    # tokens, so the same text, voice and speed always give the same audio;
+    # None draws fresh noise on every call
+    SYNTHESIS_SEED = 0
+
+    # Apply the thread counts and core pinning saved by benchmarks.autotune
+    APPLY_TOPOLOGY = True
+
+    # Token lengths synthesized in the background at startup (see
+    # kokoro.warmup); synthesis waits until warmup is done. Empty skips it
+    WARMUP_TOKENS = (16, 64, 256)
+
+    # Threads running the enhancement DSP alongside speech synthesis
+    ENHANCEMENT_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+    
     def __init__(self):
         """Initialize the podcast creator with CrewAI"""
         print("Initializing AutoPodcastCreator...")
         
-        # Initialize CrewAI
-        self.podcast_crew = PodcastCrew()
+        # CrewAI is set up on first use; see podcast_crew
+        self._podcast_crew = None
+        
+        # Set once the model is loaded and warmed up
+        self.ready = threading.Event()
+        ENGINE_READY.set(0)
         
         try:
+            # Before torch starts its thread pools; a batch worker has already applied its own slot
+            self.topology = apply_saved() if self.APPLY_TOPOLOGY else None
+            
+            import torch
+            from models import StyleCache, build_model, load_voicepack
+            
             # Initialize Kokoro model
             print("Loading Kokoro-82M model...")
             self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
             print(f"Using device: {self.device}")
             
-            model_path = os.path.join(kokoro_path, 'kokoro-v0_19.pth')
+            # Converted weights are mapped from the page cache instead of unpickled
+            model_path = os.path.join(kokoro_path, 'kokoro-v0_19.safetensors')
+            if not os.path.exists(model_path):
+                model_path = os.path.join(kokoro_path, 'kokoro-v0_19.pth')
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"Model file not found: {model_path}")
             print(f"Loading model from: {model_path}")
@@ -51,6 +100,9 @@ class AutoPodcastCreator:
                 raise RuntimeError("Failed to build Kokoro model")
             print("Model loaded successfully")
             
+            # Per-voice, per-length AdaIN affines shared by every chunk of every episode
+            self.style_cache = StyleCache(self.model) if self.CACHE_STYLES else None
+            
             # Load voice packs
             self.voicepacks = {}
             voices_dir = os.path.join(kokoro_path, 'voices')
@@ -58,15 +110,20 @@ class AutoPodcastCreator:
                 raise FileNotFoundError(f"Voices directory not found: {voices_dir}")
             print(f"Loading voice packs from: {voices_dir}")
             
-            voice_files = [f for f in os.listdir(voices_dir) if f.endswith('.pt')]
+            # One file per voice, preferring the converted .safetensors over the .pt
+            voice_files = {}
+            for voice_file in sorted(os.listdir(voices_dir)):
+                name, ext = os.path.splitext(voice_file)
+                if ext == '.safetensors' or (ext == '.pt' and name not in voice_files):
+                    voice_files[name] = voice_file
             if not voice_files:
                 raise FileNotFoundError(f"No voice pack files found in {voices_dir}")
             
-            for voice_file in voice_files:
+            for name, voice_file in voice_files.items():
                 try:
                     voice_path = os.path.join(voices_dir, voice_file)
                     print(f"Loading voice pack: {voice_file}")
-                    self.voicepacks[voice_file[:-3]] = torch.load(voice_path, weights_only=True).to(self.device)
+                    self.voicepacks[name] = load_voicepack(voice_path, self.device)
                 except Exception as e:
                     print(f"Error loading voice pack {voice_file}: {str(e)}")
             
@@ -77,6 +134,10 @@ class AutoPodcastCreator:
             # Set sample rate
             self.SAMPLE_RATE = 24000
             
+            # Preconverted, memory-mapped music beds and sound effects
+            self.assets = AssetLibrary(os.path.dirname(os.path.abspath(__file__)), sample_rate=self.SAMPLE_RATE).load()
+            
+            self.start_warmup()
             print("Initialization complete")
             
         except Exception as e:
@@ -84,6 +145,51 @@ class AutoPodcastCreator:
             traceback.print_exc()
             raise RuntimeError(f"Failed to initialize AutoPodcastCreator: {str(e)}")
     
+    def start_warmup(self) -> None:
+        """Warm the model up on a background thread and mark the engine ready when done"""
+        if not self.WARMUP_TOKENS:
+            self._mark_ready("without warmup")
+            return
+        threading.Thread(target=self.warmup, name="kokoro-warmup", daemon=True).start()
+    
+    def warmup(self) -> None:
+        """Synthesize dummy chunks for every loaded voice and warm up the phonemizer"""
+        from kokoro import phonemize, warmup
+        start = time.perf_counter()
+        try:
+            with STAGE_SECONDS.time(stage="warmup"), span("tts.warmup", voices=len(self.voicepacks)):
+                timings = warmup(self.model, self.voicepacks, self.WARMUP_TOKENS, self.style_cache,
+                                 self.DECODE_WINDOW, self.SYNTHESIS_SEED)
+            first = next(iter(self.voicepacks))
+            print("Warmup passes: " + ", ".join(f"{n} tokens {timings[(first, n)]:.2f}s"
+                                                for n in self.WARMUP_TOKENS if (first, n) in timings))
+        except Exception as e:
+            print(f"Error during model warmup: {str(e)}")
+            traceback.print_exc()
+        for lang in ('a', 'b'):
+            try:
+                phonemize("Warming up.", lang)
+            except Exception as e:
+                print(f"Phonemizer warmup failed for '{lang}': {str(e)}")
+        self._mark_ready(f"after {time.perf_counter() - start:.1f}s warmup")
+    
+    def _mark_ready(self, how: str) -> None:
+        self.ready.set()
+        ENGINE_READY.set(1)
+        print(f"Synthesis engine ready {how}")
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warmup has finished; False if timeout ran out first"""
+        return self.ready.wait(timeout)
+    
+    @property
+    def podcast_crew(self):
+        """CrewAI pipeline, imported and initialized the first time content is needed"""
+        if self._podcast_crew is None:
+            from crew import PodcastCrew
+            self._podcast_crew = PodcastCrew()
+        return self._podcast_crew
+    
     def get_voicepack(self, voice_type):
         """Get the appropriate voicepack based on selection"""
         voice_mapping = {
@@ -135,14 +241,31 @@ class AutoPodcastCreator:
             
             # Generate audio using Kokoro
             print("Calling Kokoro generate function...")
+            from kokoro import generate, phonemize
+            lang = 'a' if accent == "American" else 'b'  # 'a' for American English, 'b' for British English
             try:
-                audio, phonemes = generate(
-                    self.model, 
-                    text, 
-                    voicepack,
-                    lang='a' if accent == "American" else 'b',  # 'a' for American English, 'b' for British English
-                    speed=speed
-                )
+                with STAGE_SECONDS.time(stage="phonemize"), span("tts.phonemize", chars=len(text)) as s:
+                    ps = phonemize(text, lang)
+                    s.set(phonemes=len(ps))
+                # The warmup thread shares the model and style cache
+                if not self.ready.is_set():
+                    print("Waiting for model warmup to finish...")
+                    self.wait_until_ready()
+                start = time.perf_counter()
+                with STAGE_SECONDS.time(stage="synthesis"), span("tts.forward", tokens=len(ps)) as s:
+                    audio, phonemes = generate(
+                        self.model, 
+                        text, 
+                        voicepack,
+                        lang=lang,
+                        speed=speed,
+                        ps=ps,
+                        style_cache=self.style_cache,
+                        window=self.DECODE_WINDOW,
+                        seed=self.SYNTHESIS_SEED
+                    )
+                    s.set(samples=len(audio))
+                elapsed = time.perf_counter() - start
             except Exception as e:
                 raise RuntimeError(f"Kokoro generation failed: {str(e)}")
             
@@ -166,12 +289,31 @@ class AutoPodcastCreator:
             if not np.isfinite(audio).all():
                 raise RuntimeError("Generated audio contains invalid values (inf/nan)")
             
+            audio_seconds = len(audio) / self.SAMPLE_RATE
+            SYNTHESIS_RTF.observe(elapsed / audio_seconds)
+            AUDIO_SECONDS.inc(audio_seconds, kind="speech")
+            
             return audio
             
         except Exception as e:
             print(f"Error in speech generation: {str(e)}")
             print(traceback.format_exc())
             return None
+    
+    def stream_speech(self, text: str, voice_type: str, accent: str, speed: float) -> Iterator[np.ndarray]:
+        """Speech for text, yielded one decoded window at a time so playback can start early"""
+        from kokoro import generate_stream, phonemize
+        voicepack = self.get_voicepack(voice_type)
+        lang = 'a' if accent == "American" else 'b'
+        with STAGE_SECONDS.time(stage="phonemize"), span("tts.phonemize", chars=len(text)):
+            ps = phonemize(text, lang)
+        if not self.ready.is_set():
+            self.wait_until_ready()
+        with span("tts.stream", tokens=len(ps)):
+            for audio in generate_stream(self.model, text, voicepack, lang=lang, speed=speed, ps=ps,
+                                         window=self.STREAM_WINDOW, seed=self.SYNTHESIS_SEED):
+                AUDIO_SECONDS.inc(len(audio) / self.SAMPLE_RATE, kind="speech")
+                yield audio
         
     def create_full_podcast(
             self,
@@ -183,32 +325,74 @@ class AutoPodcastCreator:
             accent: str = "American",
             speed: float = 1.0,
             style: str = "Conversational",
-            progress_callback=None
+            progress_callback=None,
+            output_formats: Optional[List[str]] = None,
+            job_id: Optional[str] = None,
+            script: Optional[Dict] = None,
+            resume_from: Optional[str] = None,
+            speaker_voices: Optional[Dict[str, str]] = None
         ):
-        """Create a full podcast with audio for a given topic"""
+        """Create a full podcast with audio for a given topic.
+
+        A pre-written script (title, description and segments, in the shape
+        PodcastCrew.create_podcast returns) skips the crew entirely. Every
+        stage is checkpointed in the job directory, so calling again with the
+        same job_id resumes after the last completed stage; resume_from
+        reruns a stage (see crew.checkpoint.STAGES) and everything after it.
+
+        Each speaker role gets its own voice: speaker_voices maps roles such
+        as "host" or "guest" to voice names, and unnamed speakers after the
+        first are cast from the remaining voices for the accent.
+        """
+        job_dir = make_job_dir(self.OUTPUT_ROOT, job_id)
+        checkpoint = RunCheckpoint(job_dir)
+        if resume_from is not None:
+            checkpoint.invalidate_from(resume_from)
+        trace = start_trace(os.path.basename(job_dir))
+        job_span = trace.begin("job", {"topic": topic, "duration_minutes": duration_minutes})
         try:
             print(f"\nStarting podcast creation for topic: {topic}")
             
-            # Get podcast content from CrewAI
-            print("Getting content from CrewAI...")
-            crew_result = self.podcast_crew.create_podcast(topic, duration_minutes, style, progress_callback)
-            print(f"\nParsed CrewAI Result: {json.dumps(crew_result, indent=2)}")
+            if script is not None:
+                from crew.parsing import normalize_segments
+                print("Using pre-written script")
+                crew_result = dict(script, segments=normalize_segments(list(script.get("segments", []))))
+                checkpoint.save("script", crew_result)
+            else:
+                checkpoint.match({"topic": topic, "duration_minutes": duration_minutes, "style": style})
+                crew_result = checkpoint.load("script")
+                if crew_result is not None:
+                    print("Resuming script from checkpoint")
+                else:
+                    # Get podcast content from CrewAI
+                    print("Getting content from CrewAI...")
+                    crew_result = self.podcast_crew.create_podcast(topic, duration_minutes, style, progress_callback,
+                                                                   checkpoint=checkpoint)
+                    checkpoint.save("script", crew_result)
+                    print(f"\nParsed CrewAI Result: {json.dumps(crew_result, indent=2)}")
             
             if progress_callback:
                 progress_callback("Audio Generator", "Starting audio generation...")
             
-            # Process each segment
-            all_audio = []
+            # Lay each segment out on a single episode timeline
+            timeline = Timeline(self.SAMPLE_RATE)
+            music_regions = []
             segments = crew_result.get("segments", [])
             print(f"CrewAI result structure: {crew_result.keys()}")
             print(f"Segments: {segments}")
             
             if not segments:
                 raise Exception("No segments found in CrewAI output")
-            
-            for segment in segments:
+
+            # Split segments into per-speaker chunks, each voiced by its speaker's voicepack
+            cast = VoiceCast(voice_type, accent, speaker_voices)
+            renderer = DialogueRenderer(
+                lambda text, voice, chunk_accent, chunk_speed: self.synthesize_chunk(
+                    checkpoint, text, voice, chunk_accent, chunk_speed),
+                self.SAMPLE_RATE)
+            chunks = []
+            for index, segment in enumerate(segments):
                 try:
-                    # Generate speech for this segment
                     text = segment.get("content", "")
                     if not text:
                         print(f"Warning: Empty content in segment: {segment}")
@@ -221,181 +405,332 @@ class AutoPodcastCreator:
                     # Get audio parameters from segment enhancements
                     enhancements = segment.get("enhancements", {})
                     segment_speed = enhancements.get("speed", speed)
+                    chunks.extend(renderer.plan(index, segment, cast, segment_speed))
                     
-                    # Generate speech
-                    print(f"\nGenerating speech with parameters:")
-                    print(f"Voice type: {voice_type}")
-                    print(f"Accent: {accent}")
-                    print(f"Speed: {segment_speed}")
-                    
-                    audio = self.generate_speech(text, voice_type, accent, segment_speed)
-                    if audio is None:
-                        print(f"Warning: Failed to generate audio for segment: {segment.get('title', 'Untitled')}")
-                        continue
-                    
-                    print("Speech generated successfully")
-                    
-                    # Add background music if requested
-                    if add_music and segment.get("music"):
-                        music_info = segment["music"]
-                        if isinstance(music_info, dict):
-                            mood = music_info.get("mood")
-                            volume = music_info.get("volume", music_volume)
-                        else:
-                            mood = music_info
-                            volume = music_volume
-                            
-                        if mood:
-                            print(f"\nAdding background music:")
-                            print(f"Mood: {mood}")
-                            print(f"Volume: {volume}")
-                            
-                            music_file = self.get_background_music(mood)
-                            if music_file:
-                                music = self.load_and_adjust_music(music_file, len(audio), volume)
-                                audio = self.mix_audio(audio, music)
-                                print("Music added successfully")
-                            else:
-                                print(f"Warning: Music file not found for mood: {mood}")
-                    
-                    # Add sound effects if specified
-                    if segment.get("sound_effect"):
-                        effect_type = segment["sound_effect"]
-                        print(f"\nAdding sound effect: {effect_type}")
-                        
-                        effect = self.get_sound_effect(effect_type)
-                        if effect is not None:
-                            # TODO: Mix effect at the right timestamp
-                            print("Sound effect added successfully")
-                        else:
-                            print(f"Warning: Sound effect not found: {effect_type}")
-                    
-                    all_audio.append(audio)
+                except Exception as e:
+                    print(f"Error processing segment: {str(e)}")
+                    traceback.print_exc()
+            
+            enhancer = ThreadPoolExecutor(max_workers=self.ENHANCEMENT_WORKERS, thread_name_prefix="enhance")
+            futures = {}
+            
+            def submit(index, audio):
+                segment = segments[index]
+                if audio is None:
+                    print(f"Warning: Failed to generate audio for segment: {segment.get('title', 'Untitled')}")
+                    return
+                print(f"Speech generated for segment: {segment.get('title', 'Untitled')}")
+                # Enhance on a worker thread while the remaining chunks are synthesized
+                future = enhancer.submit(bind(self.apply_audio_enhancements), audio, segment.get("enhancements", {}))
+                QUEUE_DEPTH.inc(queue="enhance")
+                future.add_done_callback(lambda _: QUEUE_DEPTH.dec(queue="enhance"))
+                futures[index] = future
+            
+            renderer.render(chunks, on_segment=submit)
+
+            enhancer.shutdown(wait=False)
+            settings = self._project_settings(voice_type, accent, speed, speaker_voices, add_music, music_volume)
+            project = EpisodeProject(job_dir, self.SAMPLE_RATE)
+            for index, future in sorted(futures.items()):
+                segment = segments[index]
+                try:
+                    audio = future.result()
+                    speech = self._place_segment(timeline, segment, audio, add_music, music_volume, music_regions)
+                    digest = segment_hash(segment, settings)
+                    project.segments.append({"index": index, "hash": digest, "start": speech.start, "end": speech.end,
+                                             "stem": project.save_stem(index, digest, audio)})
                     print(f"Segment {segment.get('title', 'Untitled')} processed successfully")
                     
                 except Exception as e:
                     print(f"Error processing segment: {str(e)}")
                     traceback.print_exc()
             
-            print(f"Found {len(all_audio)} segments to process")
+            print(f"Found {len(music_regions)} segments to process")
             
-            if not all_audio:
+            if not music_regions:
                 raise Exception("No audio segments were generated successfully")
             
-            # Combine all segments
-            final_audio = np.concatenate(all_audio)
+            timeline.add_music_beds(music_regions, timeline.seconds_to_samples(self.MUSIC_CROSSFADE_SECONDS))
+            # Which segment each segment's music bed starts in, so reexport knows what a length change moves
+            for entry, run in zip(project.segments, bed_runs(music_regions)):
+                entry["bed"] = project.segments[run]["index"]
             
-            # Save to file
-            output_file = "output.wav"
-            sf.write(output_file, final_audio, self.SAMPLE_RATE)
+            # Stream the mixdown block by block into every output format and the project's mixdown
+            formats = list(output_formats or self.OUTPUT_FORMATS)
+            print(f"Encoding {timeline.duration:.1f}s of audio to {formats} in {job_dir}")
+            with STAGE_SECONDS.time(stage="mix"), span("mix", samples=len(timeline), clips=len(timeline.clips)):
+                gain_db = loudness.normalization_gain(
+                    loudness.measure((b for _, b in timeline.blocks()), self.SAMPLE_RATE), self.TARGET_LUFS)
+                blocks = loudness.normalize(lambda: (b for _, b in timeline.blocks()), self.SAMPLE_RATE,
+                                            target_lufs=self.TARGET_LUFS, gain_db=gain_db)
+                outputs = self._export(project, blocks, len(timeline), formats)
+            project.data.update(
+                title=crew_result.get("title", "Untitled Podcast"), description=crew_result.get("description", ""),
+                settings=settings, cast=cast.voices, formats=formats, outputs=outputs, length=len(timeline),
+                mix={"gain_db": gain_db, "target_lufs": self.TARGET_LUFS,
+                     "segment_gap_seconds": self.SEGMENT_GAP_SECONDS,
+                     "music_crossfade_seconds": self.MUSIC_CROSSFADE_SECONDS})
+            project.save()
+            output_file = outputs.get("wav") or next(iter(outputs.values()))
+            AUDIO_SECONDS.inc(timeline.duration, kind="episode")
+            JOBS.inc(status="success")
+            write_metrics(os.path.join(job_dir, "metrics.prom"))
             
             return {
                 "title": crew_result.get("title", "Untitled Podcast"),
                 "description": crew_result.get("description", ""),
                 "audio_file": output_file,
-                "duration": len(final_audio) / self.SAMPLE_RATE,
+                "outputs": outputs,
+                "job_dir": job_dir,
+                "duration": timeline.duration,
                 "segments": segments
             }
             
         except Exception as e:
             print(f"Error in create_full_podcast: {str(e)}")
+            JOBS.inc(status="failure")
+            job_span.set(error=str(e))
             raise
+        finally:
+            trace.finish(job_span)
+            stop_trace()
+            trace.save(os.path.join(job_dir, "trace.json"))
+            for row in trace.summary(5):
+                print(f"  {row['name']}: {row['total_s']:.2f}s total, {row['self_s']:.2f}s self over {row['count']} spans")
+
+    def _project_settings(self, voice_type: str, accent: str, speed: float,
+                          speaker_voices: Optional[Dict[str, str]], add_music: bool, music_volume: float) -> Dict:
+        """Episode-wide settings that go into every segment's hash"""
+        return {"voice_type": voice_type, "accent": accent, "speed": speed, "speaker_voices": speaker_voices or {},
+                "add_music": add_music, "music_volume": music_volume, "seed": self.SYNTHESIS_SEED}
+    
+    def _export(self, project: EpisodeProject, blocks, length: int, formats: List[str]) -> Dict[str, str]:
+        """Write mixdown blocks to the project's mixdown.npy and encode them to every format"""
+        mixdown = project.open_mixdown(length, "mixdown.tmp.npy")
+        position = 0
+        with ParallelEncoder(project.job_dir, "episode", formats, self.SAMPLE_RATE) as encoder:
+            for block in blocks:
+                mixdown[position:position + len(block)] = block
+                position += len(block)
+                encoder.write(block)
+        mixdown.flush()
+        del mixdown
+        os.replace(project.path("mixdown.tmp.npy"), project.path(MIXDOWN_FILE))
+        return encoder.outputs
+    
+    def reexport(self, job_id: str, script: Dict) -> Dict:
+        """Re-render only the segments of an edited script whose audio changed.
+
+        Segments are matched by position; each one whose text, speakers,
+        enhancements, music or effect differs from the rendered episode is
+        synthesized, enhanced and mixed again, then spliced into the existing
+        mixdown (see audio.project). Changing the number of segments, or a
+        job without a project, falls back to a full render of the script
+        with the saved settings.
+        """
+        job_dir = os.path.join(self.OUTPUT_ROOT, job_id)
+        project = EpisodeProject(job_dir, self.SAMPLE_RATE)
+        if not project.exists():
+            raise FileNotFoundError(f"No episode project found for run {job_id} in {self.OUTPUT_ROOT}")
+        project.load()
+        settings = project.data["settings"]
+        from crew.parsing import normalize_segments
+        script = dict(script, segments=normalize_segments([dict(s) for s in script.get("segments", [])]))
+        segments = script["segments"]
+        
+        rendered = {entry["index"]: entry for entry in project.segments}
+        if len(segments) != len(rendered) or set(rendered) != set(range(len(segments))):
+            print("Segments were added, removed or failed before; re-rendering the whole episode")
+            return self.create_full_podcast(
+                script.get("title", ""), 0, add_music=settings["add_music"], music_volume=settings["music_volume"],
+                voice_type=settings["voice_type"], accent=settings["accent"], speed=settings["speed"],
+                output_formats=project.data["formats"], job_id=job_id, script=script,
+                speaker_voices=settings["speaker_voices"] or None)
+        
+        start = time.perf_counter()
+        hashes = [segment_hash(segment, settings) for segment in segments]
+        dirty = [i for i, digest in enumerate(hashes) if digest != rendered[i]["hash"]]
+        checkpoint = RunCheckpoint(job_dir)
+        checkpoint.save("script", script)
+        if not dirty:
+            print("No segment changed; the episode is up to date")
+            outputs = project.data["outputs"]
+            return {"title": project.data["title"], "description": project.data["description"],
+                    "audio_file": outputs.get("wav") or next(iter(outputs.values())), "outputs": outputs,
+                    "job_dir": job_dir, "duration": project.data["length"] / self.SAMPLE_RATE,
+                    "segments": segments, "rerendered": []}
+        print(f"Re-exporting {len(dirty)} of {len(segments)} segments: {dirty}")
+        
+        # Synthesize and enhance the dirty segments with the episode's cast
+        cast = VoiceCast(settings["voice_type"], settings["accent"], project.data.get("cast"))
+        renderer = DialogueRenderer(
+            lambda text, voice, chunk_accent, chunk_speed: self.synthesize_chunk(
+                checkpoint, text, voice, chunk_accent, chunk_speed),
+            self.SAMPLE_RATE)
+        chunks = []
+        for index in dirty:
+            segment_speed = segments[index].get("enhancements", {}).get("speed", settings["speed"])
+            chunks.extend(renderer.plan(index, segments[index], cast, segment_speed))
+        stems = {}
+        for index, audio in renderer.render(chunks).items():
+            if audio is None:
+                raise RuntimeError(f"Failed to synthesize segment {index}: {segments[index].get('title', 'Untitled')}")
+            stems[index] = self.apply_audio_enhancements(audio, segments[index].get("enhancements", {}))
+        missing = [i for i in dirty if i not in stems]
+        if missing:
+            raise RuntimeError(f"Segments {missing} have no speech to render")
+        
+        # Lay the whole episode out again; clean segments come straight from their stems
+        timeline = Timeline(self.SAMPLE_RATE)
+        music_regions, entries = [], []
+        for index, segment in enumerate(segments):
+            audio = stems[index] if index in stems else project.load_stem(rendered[index])
+            speech = self._place_segment(timeline, segment, audio, settings["add_music"], settings["music_volume"],
+                                         music_regions)
+            stem = project.save_stem(index, hashes[index], audio) if index in stems else rendered[index]["stem"]
+            entries.append({"index": index, "hash": hashes[index], "start": speech.start, "end": speech.end,
+                            "stem": stem})
+        crossfade = timeline.seconds_to_samples(project.data["mix"]["music_crossfade_seconds"])
+        timeline.add_music_beds(music_regions, crossfade)
+        
+        # A music bed that plays through a dirty segment carries on from a new
+        # loop position after it, in the old layout or the new one, so every
+        # later segment on that bed is remixed from its stem too
+        runs = bed_runs(music_regions)
+        remix = set(dirty)
+        for index, entry in enumerate(entries):
+            entry["bed"] = runs[index]
+            starts = (runs[index], rendered[index].get("bed", index))
+            if any(start <= d < index for start in starts for d in dirty):
+                remix.add(index)
 
-    def get_background_music(self, mood: str) -> str:
-        """Get appropriate background music file based on mood"""
-        music_mapping = {
-            "upbeat": "music/upbeat.wav",
-            "calm": "music/calm.wav",
-            "dramatic": "music/dramatic.wav",
-            "tech": "music/tech.wav",
-            "inspirational": "music/inspirational.wav"
+        # Splice the re-rendered regions into the old mixdown and re-encode it
+        regions = project.regions(sorted(remix), entries, len(timeline), crossfade)
+        with STAGE_SECONDS.time(stage="mix"), span("mix.splice", regions=len(regions), samples=len(timeline)):
+            blocks = project.splice(timeline, regions, project.data["mix"]["gain_db"])
+            outputs = self._export(project, blocks, len(timeline), project.data["formats"])
+        project.data.update(title=script.get("title", project.data.get("title")),
+                            description=script.get("description", project.data.get("description")),
+                            cast=cast.voices, outputs=outputs, length=len(timeline))
+        project.data["segments"] = entries
+        project.save()
+        project.prune_stems()
+        print(f"Re-exported {len(dirty)} segments in {time.perf_counter() - start:.1f}s")
+        
+        return {
+            "title": project.data["title"],
+            "description": project.data["description"],
+            "audio_file": outputs.get("wav") or next(iter(outputs.values())),
+            "outputs": outputs,
+            "job_dir": job_dir,
+            "duration": timeline.duration,
+            "segments": segments,
+            "rerendered": dirty
         }
-        return music_mapping.get(mood.lower())
+    
+    def _place_segment(self, timeline: Timeline, segment: Dict, audio: np.ndarray, add_music: bool,
+                       music_volume: float, music_regions: List) -> Clip:
+        """Put a segment's speech, music region and sound effect on the timeline"""
+        speech = timeline.add_speech(audio, gap=timeline.seconds_to_samples(self.SEGMENT_GAP_SECONDS))
+        
+        # Add background music if requested
+        music = None
+        volume = music_volume
+        if add_music and segment.get("music"):
+            music_info = segment["music"]
+            if isinstance(music_info, dict):
+                mood = music_info.get("mood")
+                volume = music_info.get("volume", music_volume)
+            else:
+                mood = music_info
+                volume = music_volume
+                
+            if mood:
+                print(f"\nAdding background music:")
+                print(f"Mood: {mood}")
+                print(f"Volume: {volume}")
+                
+                music = self.get_background_music(mood)
+                if music is not None:
+                    print("Music added successfully")
+                else:
+                    print(f"Warning: Music file not found for mood: {mood}")
+        try:
+            volume = float(volume)
+        except (TypeError, ValueError):
+            volume = float(music_volume)
+        music_regions.append((music, speech.start, speech.end, db_to_gain(volume)))
+        
+        # Add sound effects if specified
+        if segment.get("sound_effect"):
+            effect_type = segment["sound_effect"]
+            print(f"\nAdding sound effect: {effect_type}")
+            
+            effect = self.get_sound_effect(effect_type)
+            if effect is not None:
+                # Effects mark the segment boundary
+                timeline.add_effect(effect, speech.start)
+                print("Sound effect added successfully")
+            else:
+                print(f"Warning: Sound effect not found: {effect_type}")
+        return speech
+    
+    def synthesize_chunk(self, checkpoint: RunCheckpoint, text: str, voice_type: str, accent: str,
+                         speed: float) -> Optional[np.ndarray]:
+        """Speech for one chunk, reused from the checkpoint when the text and voice are unchanged"""
+        key = hashlib.sha1(json.dumps([text, voice_type, accent, speed, self.SYNTHESIS_SEED]).encode('utf-8')).hexdigest()[:16]
+        path = checkpoint.path("synthesis", key, ext=".npy")
+        if os.path.exists(path):
+            print(f"Reusing synthesized speech from {path}")
+            return np.load(path)
+        
+        audio = self.generate_speech(text, voice_type, accent, speed)
+        if audio is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path[:-len(".npy")] + ".tmp.npy"
+            np.save(tmp, audio)
+            os.replace(tmp, path)
+        return audio
+
+    def revoice(self, job_id: str, voice_type: str, accent: str = "American", speed: float = 1.0, **kwargs) -> Dict:
+        """Re-render an earlier run's script with other voice settings, without calling the LLMs"""
+        job_dir = os.path.join(self.OUTPUT_ROOT, job_id)
+        script = RunCheckpoint(job_dir).load("script") if os.path.isdir(job_dir) else None
+        if script is None:
+            raise FileNotFoundError(f"No script checkpoint found for run {job_id} in {self.OUTPUT_ROOT}")
+        return self.create_full_podcast(script.get("title", ""), 0, voice_type=voice_type, accent=accent,
+                                        speed=speed, job_id=job_id, script=script, **kwargs)
+
+    def get_background_music(self, mood: str) -> Optional[LoopedAsset]:
+        """Get appropriate background music bed based on mood"""
+        return self.assets.music(mood)
     
     def get_sound_effect(self, effect_type: str) -> np.ndarray:
         """Get sound effect based on type"""
         try:
-            effects_mapping = {
-                "transition": "effects/transition.wav",
-                "highlight": "effects/highlight.wav",
-                "quote": "effects/quote.wav",
-                "stats": "effects/stats.wav",
-                "conclusion": "effects/conclusion.wav"
-            }
-            
-            effect_path = effects_mapping.get(effect_type.lower())
-            if effect_path and os.path.exists(effect_path):
-                audio, _ = sf.read(effect_path)
-                return audio
-            return None
+            return self.assets.effect(effect_type)
             
         except Exception as e:
             print(f"Error loading sound effect: {str(e)}")
             return None
     
-    def load_and_adjust_music(self, music_file: str, target_length: int, volume: float) -> np.ndarray:
-        """Load and adjust background music to match speech length"""
-        try:
-            if not os.path.exists(music_file):
-                return np.zeros(target_length)
-            
-            music, _ = sf.read(music_file)
-            
-            # Loop music if needed
-            if len(music) < target_length:
-                repeats = target_length // len(music) + 1
-                music = np.tile(music, repeats)
-            
-            # Trim to match speech length
-            music = music[:target_length]
-            
-            # Apply volume adjustment
-            music = music * volume
-            
-            return music
-            
-        except Exception as e:
-            print(f"Error processing music: {str(e)}")
-            return np.zeros(target_length)
-    
-    def mix_audio(self, speech: np.ndarray, music: np.ndarray) -> np.ndarray:
-        """Mix speech and background music"""
-        try:
-            # Ensure both arrays are the same length
-            min_length = min(len(speech), len(music))
-            speech = speech[:min_length]
-            music = music[:min_length]
-            
-            # Mix audio
-            mixed = speech + music
-            
-            # Normalize to prevent clipping
-            max_val = np.max(np.abs(mixed))
-            if max_val > 1.0:
-                mixed = mixed / max_val
-            
-            return mixed
-            
-        except Exception as e:
-            print(f"Error mixing audio: {str(e)}")
-            return speech
-
     def apply_audio_enhancements(self, audio: np.ndarray, enhancement: Dict) -> np.ndarray:
         """Apply audio enhancements based on the enhancement parameters"""
         try:
-            # Apply pitch adjustment if specified
-            if 'pitch' in enhancement:
-                # For now, we'll skip pitch adjustment as it requires additional libraries
-                pass
+            # Voice settings may be nested under "voice"; speed was already
+            # applied by the TTS model, so only pitch, EQ and clarity remain
+            if not isinstance(enhancement, dict):
+                return audio
+            voice = enhancement.get('voice')
+            params = {**enhancement, **voice} if isinstance(voice, dict) else dict(enhancement)
+            params.pop('speed', None)
+            params.pop('pace', None)
+            with STAGE_SECONDS.time(stage="dsp"), span("dsp.enhance", samples=len(audio)):
+                audio = enhance(audio, params, self.SAMPLE_RATE)
 
-            # Apply volume adjustment
+            # Apply volume adjustment in dB; episode loudness is set at mixdown
             if 'volume' in enhancement:
-                audio = audio * float(enhancement['volume'])
-
-            # Normalize audio
-            max_val = np.max(np.abs(audio))
-            if max_val > 1.0:
-                audio = audio / max_val
+                audio = audio * db_to_gain(enhancement['volume'])
 
             return audio
 
@@ -424,6 +759,7 @@ class AutoPodcastCreator:
                 "title": result["title"],
                 "description": result["description"],
                 "audio_path": result["audio_file"],
+                "outputs": result["outputs"],
                 "duration": result["duration"],
                 "segments": result["segments"]
             }
@@ -434,6 +770,8 @@ class AutoPodcastCreator:
             raise
 
 def create_gradio_interface():
+    import gradio as gr
+    
     creator = AutoPodcastCreator()
     
     def generate_podcast_ui(topic, duration_minutes, style, voice_type, accent, speed, add_music=True, music_volume=-20, progress=gr.Progress()):
@@ -683,6 +1021,7 @@ def create_gradio_interface():
 if __name__ == "__main__":
     try:
         print("Starting AI Podcast Creator...")
+        start_from_env()
         interface = create_gradio_interface()
         print("Launching web interface...")
         interface.launch(share=True)  # share=True creates a public URL
@@ -0,0 +1,251 @@
+"""Render podcast episodes headlessly from a manifest.
+
+Usage:
+    python batch_render.py episodes.json [--workers N] [--output-root output] [--force]
+        [--resume-from STAGE]
+
+The manifest is a JSON object with optional "defaults" applied to every
+episode and a list of "episodes" (a bare list works too):
+
+    {
+      "defaults": {"duration_minutes": 5, "voice_type": "Bella (American Female)",
+                   "accent": "American", "speed": 1.0, "style": "Conversational",
+                   "add_music": true, "music_volume": -20, "output_formats": ["wav", "mp3"]},
+      "episodes": [
+        {"id": "ai-health", "topic": "The Future of AI in Healthcare"},
+        {"id": "intro", "title": "Welcome", "script": "scripts/intro.txt"}
+      ]
+    }
+
+An episode either has a topic, which goes through PodcastCrew, or a
+script, which is synthesized directly. A script is an object in the
+crew's result shape (title, description, segments), a path to a JSON
+file holding one, or a path to a text file whose blank-line separated
+paragraphs become segments. Relative paths resolve against the manifest.
+
+Each episode renders into <output-root>/<id>/. A finished episode leaves
+an episode.json there and is skipped on the next run unless --force is
+given, so an interrupted overnight batch can simply be restarted; an
+episode that failed part-way resumes from its last checkpointed stage
+(--resume-from reruns a given stage and everything after it). Every
+worker is a separate process holding its own model. Workers default to
+the process count benchmarks.autotune saved for this machine; each one
+takes a slot of that topology with its thread count and cores. Without a
+tuned topology, or with another --workers, the cores are split evenly.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from crew.checkpoint import STAGES
+from tts.topology import Topology, available_cpus
+
+EPISODE_FIELDS = ('topic', 'duration_minutes', 'add_music', 'music_volume', 'voice_type', 'accent',
+                  'speed', 'style', 'output_formats', 'resume_from', 'speaker_voices')
+DEFAULTS = {
+    'duration_minutes': 5,
+    'add_music': True,
+    'music_volume': -20,
+    'voice_type': 'Default Mix (Bella & Sarah)',
+    'accent': 'American',
+    'speed': 1.0,
+    'style': 'Conversational',
+}
+DONE_FILE = 'episode.json'
+
+# One creator per worker process, built by _init_worker
+_creator = None
+
+
+def slugify(text: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    return slug[:60] or 'episode'
+
+
+def load_script(script, base_dir: str, title: Optional[str] = None) -> Dict:
+    """Turn a manifest script entry into the crew's result shape"""
+    if isinstance(script, dict):
+        return script
+    path = script if os.path.isabs(script) else os.path.join(base_dir, script)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Script not found: {path}")
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        text = f.read()
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    return {
+        'title': title or os.path.splitext(os.path.basename(path))[0],
+        'description': '',
+        'segments': [{'title': f"Part {i}", 'content': p} for i, p in enumerate(paragraphs, 1)],
+    }
+
+
+def load_manifest(path: str) -> List[Dict]:
+    """Episodes from the manifest with defaults applied and scripts loaded"""
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'episodes': manifest}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = {**DEFAULTS, **manifest.get('defaults', {})}
+
+    episodes, seen = [], set()
+    for i, entry in enumerate(manifest.get('episodes', []), 1):
+        episode = {**defaults, **entry}
+        if 'script' in episode:
+            episode['script'] = load_script(episode['script'], base_dir, episode.get('title'))
+            episode.setdefault('topic', episode['script'].get('title', ''))
+        elif not episode.get('topic'):
+            raise ValueError(f"Episode {i} in {path} needs a topic or a script")
+        episode['id'] = str(episode.get('id') or slugify(episode.get('title') or episode['topic']))
+        if episode['id'] in seen:
+            raise ValueError(f"Duplicate episode id in {path}: {episode['id']}")
+        seen.add(episode['id'])
+        episodes.append(episode)
+    return episodes
+
+
+def is_done(output_root: str, episode_id: str) -> bool:
+    return os.path.exists(os.path.join(output_root, episode_id, DONE_FILE))
+
+
+def _init_worker(output_root: str, topology: Topology, slots=None) -> None:
+    """Pin the worker to its topology slot and load the model once per worker process"""
+    global _creator
+    topology.apply(slots.get() if slots is not None else 0)
+    from auto_podcast_creator import AutoPodcastCreator
+    _creator = AutoPodcastCreator()
+    _creator.OUTPUT_ROOT = output_root
+
+
+def render_episode(episode: Dict) -> Dict:
+    """Render one episode in the current worker and mark it done"""
+    start = time.perf_counter()
+    try:
+        kwargs = {k: episode[k] for k in EPISODE_FIELDS if k in episode}
+        result = _creator.create_full_podcast(job_id=episode['id'], script=episode.get('script'), **kwargs)
+        summary = {
+            'id': episode['id'],
+            'status': 'done',
+            'title': result['title'],
+            'description': result['description'],
+            'duration': result['duration'],
+            'outputs': result['outputs'],
+            'segments': len(result['segments']),
+            'wall_seconds': time.perf_counter() - start,
+            'finished': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(os.path.join(result['job_dir'], DONE_FILE), 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+    except Exception as e:
+        traceback.print_exc()
+        return {'id': episode['id'], 'status': 'failed', 'error': str(e),
+                'wall_seconds': time.perf_counter() - start}
+
+
+def worker_topology(workers: Optional[int]) -> Topology:
+    """The tuned topology when it fits the worker count, else an even split of the cores"""
+    tuned = Topology.load()
+    if tuned is not None and workers in (None, tuned.processes):
+        return tuned
+    workers = workers or 1
+    return Topology(workers, max(1, len(available_cpus()) // workers))
+
+
+def run_batch(episodes: List[Dict], output_root: str, workers: Optional[int] = None, force: bool = False,
+              resume_from: Optional[str] = None) -> Dict:
+    """Render every episode not already done and summarize throughput"""
+    todo, results = [], []
+    for episode in episodes:
+        if resume_from is not None:
+            episode = dict(episode, resume_from=resume_from)
+        if not force and is_done(output_root, episode['id']):
+            print(f"Skipping {episode['id']}: already rendered")
+            results.append({'id': episode['id'], 'status': 'skipped'})
+        else:
+            todo.append(episode)
+    topology = worker_topology(workers)
+    workers = topology.processes
+    print(f"Rendering {len(todo)} of {len(episodes)} episodes with {workers} worker(s) of {topology.threads} threads")
+
+    start = time.perf_counter()
+    if todo and workers <= 1:
+        _init_worker(output_root, topology)
+        for episode in todo:
+            results.append(_report(render_episode(episode)))
+    elif todo:
+        slots = mp.Queue()
+        for slot in range(workers):
+            slots.put(slot)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(output_root, topology, slots)) as pool:
+            futures = [pool.submit(render_episode, e) for e in todo]
+            for future in as_completed(futures):
+                results.append(_report(future.result()))
+    wall = time.perf_counter() - start
+
+    done = [r for r in results if r['status'] == 'done']
+    audio = sum(r['duration'] for r in done)
+    summary = {
+        'episodes': len(episodes),
+        'done': len(done),
+        'skipped': sum(r['status'] == 'skipped' for r in results),
+        'failed': sum(r['status'] == 'failed' for r in results),
+        'workers': workers,
+        'wall_seconds': wall,
+        'audio_seconds': audio,
+        'episodes_per_hour': len(done) * 3600.0 / wall if wall > 0 else 0.0,
+        'audio_minutes_per_wall_minute': audio / wall if wall > 0 else 0.0,
+        'results': results,
+    }
+    return summary
+
+
+def _report(result: Dict) -> Dict:
+    if result['status'] == 'done':
+        print(f"Done {result['id']}: {result['duration']:.1f}s of audio in {result['wall_seconds']:.1f}s")
+    else:
+        print(f"Failed {result['id']} after {result['wall_seconds']:.1f}s: {result['error']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="JSON manifest of episodes")
+    parser.add_argument("--workers", type=int, help="Episodes rendered in parallel (default: the tuned topology)")
+    parser.add_argument("--output-root", default="output", help="Directory holding one folder per episode")
+    parser.add_argument("--force", action="store_true", help="Re-render episodes that are already done")
+    parser.add_argument("--resume-from", choices=STAGES, help="Rerun this stage and every later one")
+    args = parser.parse_args()
+
+    load_dotenv()
+    episodes = load_manifest(args.manifest)
+    summary = run_batch(episodes, args.output_root, args.workers, args.force, args.resume_from)
+
+    os.makedirs(args.output_root, exist_ok=True)
+    summary_file = os.path.join(args.output_root, f"batch-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(summary_file, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print("\n=== Batch Summary ===")
+    print(f"Episodes: {summary['done']} done, {summary['skipped']} skipped, {summary['failed']} failed")
+    print(f"Wall time: {summary['wall_seconds'] / 60:.1f} min for {summary['audio_seconds'] / 60:.1f} min of audio")
+    print(f"Throughput: {summary['episodes_per_hour']:.1f} episodes/hour, "
+          f"{summary['audio_minutes_per_wall_minute']:.2f} audio min per wall min")
+    print(f"Summary saved to: {summary_file}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
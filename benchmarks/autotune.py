@@ -0,0 +1,172 @@
+"""Find the fastest synthesis process and thread topology for this machine.
+
+Usage:
+    python -m benchmarks.autotune [--tokens 64 128 256] [--repeat 3] [--processes 1 2 4]
+        [--threads 1 2 4] [--max-processes N] [--no-pin] [--weights PATH] [--output topology.json]
+        [--dry-run]
+
+Every candidate runs `processes` fresh interpreters with `threads` torch
+threads each, pinned to their own cores (see tts.topology). Each process
+loads the model, warms up, waits for the others and then synthesizes
+`repeat` chunks at each token length with the production settings: style
+cache, single-pass decoding and a fixed seed. The table shows aggregate
+throughput (seconds of audio per wall second, summed over the processes)
+and per-chunk p50 latency. The fastest candidate is saved for this machine
+and applied by AutoPodcastCreator and batch_render at startup.
+
+Kokoro synthesizes one chunk per forward pass, so there is no batch size
+to tune; more chunks in flight means more processes. Candidates default
+to powers of two that fit the available cores, and to as many processes
+as free memory allows at about PROCESS_MB each. Without --weights (or
+when kokoro-v0_19.pth is missing) the model is randomly initialised with
+durations pinned as in bench_kokoro, which times the same work.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+from benchmarks.common import percentile, print_table
+from tts.topology import TOPOLOGY_FILE, Topology, available_cpus, machine_key
+
+KOKORO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Kokoro-82M')
+
+# Resident memory of one synthesis process with the model loaded
+PROCESS_MB = 1500
+
+
+def powers_of_two(limit: int):
+    values, n = [], 1
+    while n <= limit:
+        values.append(n)
+        n *= 2
+    if limit not in values:
+        values.append(limit)
+    return values
+
+
+def available_mb() -> float:
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float('inf')
+
+
+def candidates(cpus: int, processes=None, threads=None, max_processes=None):
+    """(processes, threads) pairs that fit in the available cores"""
+    pairs = []
+    for t in threads or powers_of_two(cpus):
+        for p in processes or powers_of_two(max(1, cpus // t)):
+            if p * t <= cpus and p <= max_processes:
+                pairs.append((p, t))
+    return sorted(set(pairs))
+
+
+def _worker(index, topology, tokens, repeat, weights, barrier, results):
+    """Synthesize in one pinned process and report audio seconds, wall time and chunk latencies"""
+    try:
+        Topology(**topology).apply(index)
+        import sys
+        import torch
+        sys.path.append(KOKORO_DIR)
+        import kokoro
+        from benchmarks.bench_kokoro import STYLE_DIM, VOCAB_SIZE, make_model
+        from models import StyleCache
+
+        model, _ = make_model(weights, 'cpu')
+        style_cache = StyleCache(model)
+        generator = torch.Generator().manual_seed(index)
+        voicepack = torch.randn(511, 1, STYLE_DIM, generator=generator)
+        chunks = [torch.randint(1, VOCAB_SIZE, (n,), generator=generator).tolist() for n in tokens]
+
+        def synthesize(ids):
+            return kokoro.forward_voice(model, ids, voicepack, 1.0, style_cache, seed=0)
+
+        for ids in chunks:
+            synthesize(ids)
+        barrier.wait()
+        latencies, samples = [], 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for ids in chunks:
+                chunk_start = time.perf_counter()
+                samples += len(synthesize(ids))
+                latencies.append(time.perf_counter() - chunk_start)
+        results.put((index, samples, time.perf_counter() - start, latencies, None))
+    except Exception as e:
+        barrier.abort()
+        results.put((index, 0, 0.0, [], str(e)))
+
+
+def run_candidate(topology: Topology, tokens, repeat: int, weights: str):
+    """Aggregate throughput and chunk latency of one topology, or an error"""
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(topology.processes)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(i, topology.to_dict(), tokens, repeat, weights, barrier, results))
+             for i in range(topology.processes)]
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    errors = [r[4] for r in reports if r[4]]
+    if errors:
+        return {"error": errors[0]}
+    wall = max(r[2] for r in reports)
+    latencies = sorted(l for r in reports for l in r[3])
+    from benchmarks.bench_kokoro import SAMPLE_RATE
+    return {
+        "audio_per_wall_s": sum(r[1] for r in reports) / SAMPLE_RATE / wall,
+        "chunk_p50_ms": percentile(latencies, 50) * 1e3,
+        "wall_s": wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[64, 128, 256],
+                        help="Chunk lengths every process synthesizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the chunk lengths per process")
+    parser.add_argument("--processes", type=int, nargs="+", help="Process counts to try")
+    parser.add_argument("--threads", type=int, nargs="+", help="Threads per process to try")
+    parser.add_argument("--max-processes", type=int, help="Upper bound on processes (default: by free memory)")
+    parser.add_argument("--no-pin", action="store_true", help="Leave core placement to the scheduler")
+    parser.add_argument("--weights", default=os.path.join(KOKORO_DIR, 'kokoro-v0_19.pth'))
+    parser.add_argument("--output", default=TOPOLOGY_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="Measure without saving the result")
+    args = parser.parse_args()
+
+    cpus = len(available_cpus())
+    max_processes = args.max_processes or max(1, int(available_mb() // PROCESS_MB))
+    pairs = candidates(cpus, args.processes, args.threads, max_processes)
+    print(f"Machine: {machine_key()}")
+    print(f"Trying {len(pairs)} topologies on {cpus} cores, at most {max_processes} processes")
+
+    rows, best = [], None
+    for processes, threads in pairs:
+        topology = Topology(processes, threads, pin=not args.no_pin)
+        print(f"Measuring {topology}...")
+        result = run_candidate(topology, args.tokens, args.repeat, args.weights)
+        rows.append(dict(processes=processes, threads=threads, pinned=topology.pin, **result))
+        if "error" not in result and (best is None or result["audio_per_wall_s"] > best.results["audio_per_wall_s"]):
+            topology.results = dict(result, tokens=args.tokens, measured=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            best = topology
+
+    print_table(rows, ["processes", "threads", "pinned", "audio_per_wall_s", "chunk_p50_ms", "wall_s", "error"])
+    if best is None:
+        print("No topology completed; nothing saved")
+        return 1
+    print(f"Fastest: {best} at {best.results['audio_per_wall_s']:.2f} s of audio per second")
+    if not args.dry_run:
+        print(f"Saved to {best.save(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
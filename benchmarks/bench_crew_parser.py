@@ -0,0 +1,112 @@
+"""Benchmark the crew output parser on realistic multi-kilobyte outputs.
+
+Usage:
+    python -m benchmarks.bench_crew_parser [--segments 8 32 128] [--repeat 50]
+
+Each document is shaped like the content stage output (title, keywords and a
+list of segments with music, effects, enhancements and speaker lines) and is
+rendered in the three forms CrewAI agents actually return:
+
+- json:    strict JSON inside prose and a Markdown fence
+- python:  ``str(dict)``, i.e. single quotes and True/False/None
+- sloppy:  JSON with trailing commas, unquoted keys and comments
+
+``json.loads`` and ``ast.literal_eval`` are timed on the forms they accept as
+reference points.
+"""
+import argparse
+import ast
+import json
+import random
+
+from benchmarks.common import measure, print_table
+from crew.parsing import parse_crew_json
+
+WORDS = (
+    "artificial intelligence healthcare diagnosis model clinicians patients "
+    "data privacy imaging radiology accuracy trial regulation hospital "
+    "workflow outcomes research evidence adoption future ethics"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def make_content(segments: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "title": "The Future of AI in Healthcare",
+        "description": _sentence(rng, 40),
+        "keywords": [rng.choice(WORDS) for _ in range(8)],
+        "segments": [
+            {
+                "timestamp": f"{i * 2:02d}:00",
+                "title": _sentence(rng, 5),
+                "speaker": rng.choice(["Host", "Guest", "Expert"]),
+                "tone": rng.choice(["excited", "serious", "curious"]),
+                "music": {"mood": rng.choice(["upbeat", "calm", "tech"]), "volume": -20.0},
+                "sound_effect": rng.choice(["transition", "highlight", "stats"]),
+                "content": " ".join(_sentence(rng, 18) for _ in range(6)),
+                "lines": [
+                    {"speaker": rng.choice(["Host", "Guest"]), "text": _sentence(rng, 25)}
+                    for _ in range(4)
+                ],
+                "enhancements": {"speed": 1.0, "emphasis": [], "pauses": None, "loud": False},
+            }
+            for i in range(segments)
+        ],
+    }
+
+
+def as_json(data: dict) -> str:
+    return f"Here is the final answer:\n```json\n{json.dumps(data, indent=2)}\n```\n"
+
+
+def as_python(data: dict) -> str:
+    return str(data)
+
+
+def as_sloppy(data: dict) -> str:
+    text = json.dumps(data, indent=2)
+    text = text.replace('\n  }', ',\n  }').replace('\n    }', ',  // end\n    }')
+    text = text.replace('"title":', 'title:').replace('"speaker":', 'speaker:')
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = []
+    for segments in args.segments:
+        data = make_content(segments)
+        documents = {"json": as_json(data), "python": as_python(data), "sloppy": as_sloppy(data)}
+        for form, text in documents.items():
+            assert parse_crew_json(text) == json.loads(json.dumps(data)), form
+            cases = [("parse_crew_json", lambda t=text: parse_crew_json(t))]
+            if form == "json":
+                body = text[text.find('{'):text.rfind('}') + 1]
+                cases.append(("json.loads", lambda b=body: json.loads(b)))
+            elif form == "python":
+                cases.append(("ast.literal_eval", lambda t=text: ast.literal_eval(t)))
+            for name, fn in cases:
+                stats = measure(fn, repeat=args.repeat)
+                rows.append({
+                    "segments": segments,
+                    "form": form,
+                    "KiB": len(text) / 1024,
+                    "parser": name,
+                    "p50 ms": stats["p50"] * 1e3,
+                    "p90 ms": stats["p90"] * 1e3,
+                    "MiB/s": len(text) / stats["p50"] / 2**20,
+                })
+
+    print_table(rows, ["segments", "form", "KiB", "parser", "p50 ms", "p90 ms", "MiB/s"])
+
+
+if __name__ == "__main__":
+    main()
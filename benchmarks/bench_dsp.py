@@ -0,0 +1,82 @@
+"""Benchmark the speech enhancement DSP in seconds of audio per second.
+
+Usage:
+    python -m benchmarks.bench_dsp [--seconds 60] [--segments 8] [--workers 1 2 4] [--repeat 5]
+
+Each stage (EQ, clarity + compressor, time-stretch, pitch shift and the
+full chain) is timed on a synthetic speech-like signal: a harmonic voice
+with a wandering fundamental, syllable-rate amplitude modulation and a
+little noise. The parallel rows run --segments segments through
+enhance_many() with each worker count; throughput only scales when the
+machine has the cores for it.
+"""
+import argparse
+
+import numpy as np
+
+from audio.assets import SAMPLE_RATE
+from audio.dsp import EnhancementChain, enhance, enhance_many, stretch_and_shift
+from audio.timeline import BLOCK_SIZE
+from benchmarks.common import measure, print_table
+
+STAGES = {
+    "eq": {"eq_settings": {"low": 3, "mid": -2, "high": 4}},
+    "clarity": {"clarity": 0.7},
+    "stretch": {"pace": 1.15},
+    "pitch": {"pitch": 2},
+    "full": {"eq_settings": {"low": 3, "mid": -2, "high": 4}, "clarity": 0.7, "energy": 1.1,
+             "pace": 1.1, "pitch": 1},
+}
+
+
+def make_speech(seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 140.0 + 25.0 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t) ** 2
+    return (0.2 * voice * syllables + 0.005 * rng.standard_normal(n)).astype(np.float32)
+
+
+def run_chain(audio: np.ndarray, params: dict) -> None:
+    chain = EnhancementChain.from_params(params)
+    for start in range(0, len(audio), BLOCK_SIZE):
+        chain.process(audio[start:start + BLOCK_SIZE])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0, help="Length of each segment")
+    parser.add_argument("--segments", type=int, default=8, help="Segments in the parallel runs")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    audio = make_speech(args.seconds)
+    cases = [
+        ("eq", lambda: run_chain(audio, STAGES["eq"])),
+        ("clarity", lambda: run_chain(audio, STAGES["clarity"])),
+        ("stretch", lambda: stretch_and_shift(audio, pace=1.15)),
+        ("pitch", lambda: stretch_and_shift(audio, pitch=2 ** (2 / 12))),
+        ("full", lambda: enhance(audio, STAGES["full"])),
+    ]
+    rows = []
+    for name, fn in cases:
+        stats = measure(fn, repeat=args.repeat, warmup=1)
+        rows.append({"case": name, "workers": 1, "audio s": args.seconds,
+                     "p50 s": stats["p50"], "audio s/s": args.seconds / stats["p50"]})
+
+    items = [(make_speech(args.seconds, seed), STAGES["full"]) for seed in range(args.segments)]
+    total = args.seconds * args.segments
+    for workers in args.workers:
+        stats = measure(lambda: enhance_many(items, workers=workers), repeat=args.repeat, warmup=1)
+        rows.append({"case": "enhance_many", "workers": workers, "audio s": total,
+                     "p50 s": stats["p50"], "audio s/s": total / stats["p50"]})
+
+    print_table(rows, ["case", "workers", "audio s", "p50 s", "audio s/s"])
+
+
+if __name__ == "__main__":
+    main()
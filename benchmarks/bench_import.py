@@ -0,0 +1,99 @@
+"""Measure cold import time of the entry points in fresh interpreters.
+
+Usage:
+    python -m benchmarks.bench_import [--modules telemetry audio crew kokoro auto_podcast_creator] [--repeat 5]
+
+Each import runs in a new `python -X importtime` process, so nothing is
+cached between runs. The table shows wall-clock p50 and the interpreter's
+own cumulative import time. It also lists which heavy dependencies
+(torch, gradio, crewai, langchain, phonemizer) the import pulled in, and
+the slowest direct dependencies. A module whose dependencies are missing is
+reported with the import error instead of a time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import percentile, print_table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('torch', 'gradio', 'crewai', 'langchain', 'phonemizer', 'transformers', 'scipy')
+
+PROBE = """
+import json, sys
+sys.path.append({kokoro!r})
+import {module}
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+def parse_importtime(stderr: str):
+    """(cumulative µs per direct dependency, total µs) from -X importtime output"""
+    top, total = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        total += int(self_us)
+        # nested imports are indented by two spaces per level; keep the
+        # direct dependencies of the top-level imports
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 1:
+            top[name.strip()] = max(top.get(name.strip(), 0), int(cumulative_us))
+    return top, total
+
+
+def import_once(module: str):
+    code = PROBE.format(kokoro=os.path.join(ROOT, 'Kokoro-82M'), module=module, heavy=HEAVY)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+        return None, error, [], {}
+    top, total = parse_importtime(proc.stderr)
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    return elapsed, total / 1e6, heavy, top
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+",
+                        default=["telemetry", "audio", "crew", "kokoro", "auto_podcast_creator"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="Slowest direct dependencies to list")
+    args = parser.parse_args()
+
+    rows = []
+    for module in args.modules:
+        walls, totals, heavy, top, error = [], [], [], {}, None
+        for _ in range(args.repeat):
+            wall, total, heavy, top = import_once(module)
+            if wall is None:
+                error = total
+                break
+            walls.append(wall)
+            totals.append(total)
+        if error:
+            rows.append({"module": module, "error": error})
+            continue
+        walls.sort()
+        totals.sort()
+        slowest = sorted(top.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+        rows.append({
+            "module": module,
+            "wall p50 s": percentile(walls, 50),
+            "import s": percentile(totals, 50),
+            "heavy deps": ",".join(heavy) or "-",
+            "slowest": ", ".join(f"{name} {us / 1e6:.2f}s" for name, us in slowest),
+        })
+
+    print_table(rows, ["module", "wall p50 s", "import s", "heavy deps", "slowest", "error"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Benchmark the Kokoro text frontend and model stages offline on CPU.
+
+Usage:
+    python -m benchmarks.bench_kokoro [--tokens 16 32 64 128 256 510] [--repeat 10]
+        [--weights PATH] [--threads N] [--save-baseline] [--tolerance 0.15]
+
+Times normalize_text, phonemize and tokenize, then each model stage of
+kokoro.forward (BERT, and for comparison the stock AlbertModel forward as
+bert_stock, the duration predictor, F0Ntrain, the text encoder, the
+decoder, its harmonic source and the windowed decoder) and the full
+forward pass at each token length, with and without the per-voice
+StyleCache (forward_cached). For every case it reports latency
+percentiles, real-time factor (p50 latency over the seconds of audio the
+forward pass produces at that length) and the peak RSS reached while the
+case ran.
+
+Without --weights (or when kokoro-v0_19.pth is missing) the model is
+randomly initialised. The duration head is then pinned to
+FRAMES_PER_TOKEN frames per token so the amount of audio, and therefore
+every timing, is repeatable. Frontend stages need espeak-ng and
+phonemizer; they are skipped with a note when the phonemizer cannot be
+loaded.
+
+Results are compared against benchmarks/baselines/kokoro_cpu.json and any
+case slower than --tolerance is flagged. --save-baseline rewrites it.
+"""
+import argparse
+import math
+import os
+import sys
+
+import torch
+
+from benchmarks.common import (compare, load_baseline, machine_info, measure, peak_rss_mb, print_table,
+                               reset_peak_rss, save_baseline)
+
+KOKORO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Kokoro-82M')
+sys.path.append(KOKORO_DIR)
+
+from models import StyleCache, build_model  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'kokoro_cpu.json')
+SAMPLE_RATE = 24000
+FRAMES_PER_TOKEN = 3
+STYLE_DIM = 256
+VOCAB_SIZE = 178
+
+SENTENCE = ("Dr. Smith said the 2024 trial cost $4.5 million, and 12:30 was the "
+            "earliest slot; results improved by 3.7% over the previous year. ")
+
+
+def load_frontend():
+    """Import kokoro.py and check its espeak phonemizer, printing why if it is unusable"""
+    import kokoro
+    try:
+        kokoro.get_phonemizer('a')
+        return kokoro, True
+    except Exception as e:
+        print(f"Text frontend unavailable, skipping frontend stages: {str(e)}")
+        return kokoro, False
+
+
+def make_model(weights, device: str):
+    if weights and os.path.exists(weights):
+        return build_model(weights, device), False
+    torch.manual_seed(0)
+    model = build_model(None, device)
+    # sum(sigmoid(bias)) over max_dur outputs == FRAMES_PER_TOKEN for every token
+    proj = model.predictor.duration_proj.linear_layer
+    p = FRAMES_PER_TOKEN / proj.out_features
+    with torch.no_grad():
+        proj.weight.zero_()
+        proj.bias.fill_(math.log(p / (1.0 - p)))
+    return model, True
+
+
+def make_text(tokens: int) -> str:
+    """Text whose phonemized length is roughly the given number of tokens"""
+    return (SENTENCE * (tokens // len(SENTENCE) + 1))[:tokens]
+
+
+def stage_inputs(model, tokens, ref_s, speed: float = 1.0):
+    """Run kokoro.forward step by step, returning every stage's inputs and the output length"""
+    tokens = torch.LongTensor([[0, *tokens, 0]]).to(ref_s.device)
+    input_lengths = torch.LongTensor([tokens.shape[-1]]).to(ref_s.device)
+    text_mask = torch.gt(torch.arange(tokens.shape[-1]).unsqueeze(0) + 1, input_lengths.unsqueeze(1))
+    s = ref_s[:, 128:]
+    with torch.no_grad():
+        bert_dur = model.bert(tokens)
+        d_en = model.bert_encoder(bert_dur).transpose(-1, -2)
+        d = model.predictor.text_encoder(d_en, s, input_lengths, text_mask)
+        x, _ = model.predictor.lstm(d)
+        duration = torch.sigmoid(model.predictor.duration_proj(x)).sum(axis=-1) / speed
+        pred_dur = torch.round(duration).clamp(min=1).long()
+        alignment = torch.repeat_interleave(torch.eye(tokens.shape[-1]), pred_dur[0], dim=1).unsqueeze(0)
+        en = d.transpose(-1, -2) @ alignment
+        F0_pred, N_pred = model.predictor.F0Ntrain(en, s)
+        asr = model.text_encoder(tokens, input_lengths, text_mask) @ alignment
+        audio = model.decoder(asr, F0_pred, N_pred, ref_s[:, :128]).squeeze()
+    return dict(tokens=tokens, input_lengths=input_lengths, text_mask=text_mask, s=s, d_en=d_en,
+                en=en, asr=asr, F0_pred=F0_pred, N_pred=N_pred, samples=audio.shape[-1])
+
+
+def model_cases(model, kokoro, token_ids, voicepack, style_cache, x):
+    """(name, fn) for each model stage, bound to precomputed inputs"""
+    p = model.predictor
+    ref_s = voicepack[len(token_ids)]
+
+    def bert():
+        return model.bert_encoder(model.bert(x['tokens']))
+
+    def bert_stock():
+        # transformers' own AlbertModel forward with the mask kokoro used to pass
+        from transformers import AlbertModel
+        hidden = AlbertModel.forward(model.bert, x['tokens'], attention_mask=(~x['text_mask']).int())
+        return model.bert_encoder(hidden.last_hidden_state)
+
+    def predictor():
+        d = p.text_encoder(x['d_en'], x['s'], x['input_lengths'], x['text_mask'])
+        return p.duration_proj(p.lstm(d)[0])
+
+    def forward():
+        return kokoro.forward(model, token_ids, ref_s, 1.0)
+
+    def forward_cached():
+        return kokoro.forward_voice(model, token_ids, voicepack, 1.0, style_cache)
+
+    cases = [
+        ("bert", bert),
+        ("bert_stock", bert_stock),
+        ("predictor", predictor),
+        ("F0Ntrain", lambda: p.F0Ntrain(x['en'], x['s'])),
+        ("text_encoder", lambda: model.text_encoder(x['tokens'], x['input_lengths'], x['text_mask'])),
+        ("decoder", lambda: model.decoder(x['asr'], x['F0_pred'], x['N_pred'], ref_s[:, :128])),
+        ("source", lambda: model.decoder.generator.source(x['F0_pred'])),
+        ("decoder_windowed", lambda: list(kokoro.decode_stream(model, x['asr'], x['F0_pred'], x['N_pred'],
+                                                               ref_s[:, :128]))),
+        ("forward", forward),
+        ("forward_cached", forward_cached),
+    ]
+    return [(name, torch.no_grad()(fn)) for name, fn in cases]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[16, 32, 64, 128, 256, 510])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--weights", default=os.path.join(KOKORO_DIR, 'kokoro-v0_19.pth'))
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    kokoro, frontend = load_frontend()
+    model, random_weights = make_model(args.weights, 'cpu')
+    style_cache = StyleCache(model)
+    print(f"Model: {'random weights' if random_weights else args.weights}, torch {torch.__version__}, "
+          f"{torch.get_num_threads()} threads")
+
+    baseline = load_baseline(args.baseline)
+    info = dict(machine_info(), torch=torch.__version__, threads=torch.get_num_threads(),
+                random_weights=random_weights)
+    if baseline and baseline.get("machine") != info:
+        print(f"Warning: baseline was recorded on {baseline.get('machine')}; comparisons are indicative only")
+    previous = baseline.get("results", {}) if baseline else {}
+
+    generator = torch.Generator().manual_seed(0)
+    results, rows = {}, []
+    for length in args.tokens:
+        token_ids = torch.randint(1, VOCAB_SIZE, (length,), generator=generator).tolist()
+        # Only row len(token_ids) of a voicepack is used
+        voicepack = torch.randn(511, 1, STYLE_DIM, generator=generator)
+        x = stage_inputs(model, token_ids, voicepack[length])
+        audio_seconds = x['samples'] / SAMPLE_RATE
+
+        cases = []
+        if frontend:
+            text = make_text(length)
+            phonemes = kokoro.phonemize(text, 'a')
+            cases += [
+                ("normalize_text", lambda t=text: kokoro.normalize_text(t)),
+                ("phonemize", lambda t=text: kokoro.phonemize(t, 'a')),
+                ("tokenize", lambda ps=phonemes: kokoro.tokenize(ps)),
+            ]
+        cases += model_cases(model, kokoro, token_ids, voicepack, style_cache, x)
+
+        for name, fn in cases:
+            reset_peak_rss()
+            stats = measure(fn, repeat=args.repeat, warmup=1)
+            key = f"{name}@{length}"
+            results[key] = {"p50_ms": stats["p50"] * 1e3, "p90_ms": stats["p90"] * 1e3,
+                            "p99_ms": stats["p99"] * 1e3, "rtf": stats["p50"] / audio_seconds,
+                            "peak_rss_mb": peak_rss_mb()}
+            rows.append(dict(stage=name, tokens=length, audio_s=audio_seconds, **results[key],
+                             vs_baseline=compare(results[key]["p50_ms"],
+                                                 previous.get(key, {}).get("p50_ms"), args.tolerance)))
+
+    print_table(rows, ["stage", "tokens", "audio_s", "p50_ms", "p90_ms", "p99_ms", "rtf", "peak_rss_mb",
+                       "vs_baseline"])
+    if args.save_baseline:
+        save_baseline(args.baseline, results, info)
+
+
+if __name__ == "__main__":
+    main()
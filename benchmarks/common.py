@@ -0,0 +1,118 @@
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted sequence"""
+    if not sorted_values:
+        return float('nan')
+    k = (len(sorted_values) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Time fn() repeat times after warmup calls and summarize in seconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "min": samples[0],
+        "p50": percentile(samples, 50),
+        "p90": percentile(samples, 90),
+        "p99": percentile(samples, 99),
+        "mean": sum(samples) / len(samples),
+        "runs": len(samples),
+    }
+
+
+def print_table(rows: List[Dict[str, object]], columns: List[str]) -> None:
+    """Print rows as a fixed-width text table"""
+    def fmt(value):
+        if isinstance(value, float):
+            return f"{value:.3f}"
+        return str(value)
+
+    cells = [[fmt(row.get(c, "")) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS watermark (Linux only); False if unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB since the last reset"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024.0
+
+
+def machine_info() -> Dict[str, object]:
+    """Host details stored with baselines so comparisons across machines are flagged"""
+    import os
+    import platform
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]], info: Dict[str, object]) -> None:
+    """Write benchmark results keyed by case name as the new baseline"""
+    import json
+    import os
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"machine": info, "results": results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Saved baseline for {len(results)} cases to {path}")
+
+
+def load_baseline(path: str) -> Optional[Dict[str, object]]:
+    """Read a baseline written by save_baseline, or None if there is none"""
+    import json
+    import os
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(value: float, baseline: Optional[float], tolerance: float) -> str:
+    """Describe value against its baseline, flagging changes beyond tolerance"""
+    if not baseline:
+        return "new"
+    change = value / baseline - 1.0
+    label = f"{change:+.0%}"
+    if change > tolerance:
+        return label + " REGRESSION"
+    if change < -tolerance:
+        return label + " faster"
+    return label
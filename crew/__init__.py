@@ -1,5 +1,32 @@
-from .podcast_crew import PodcastCrew
-from .agents import PodcastCrewAgents
-from .tasks import PodcastCrewTasks
+"""CrewAI podcast pipeline.
 
-__all__ = ['PodcastCrew', 'PodcastCrewAgents', 'PodcastCrewTasks']
+Exports are resolved on first access (PEP 562), so importing a light
+helper such as parse_crew_json does not load crewai and langchain.
+"""
+import importlib
+
+_EXPORTS = {
+    'PodcastCrew': '.podcast_crew',
+    'PodcastCrewAgents': '.agents',
+    'PodcastCrewTasks': '.tasks',
+    'parse_crew_json': '.parsing',
+    'normalize_segments': '.parsing',
+    'CrewOutputParseError': '.parsing',
+    'RunCheckpoint': '.checkpoint',
+}
+
+__all__ = ['PodcastCrew', 'PodcastCrewAgents', 'PodcastCrewTasks', 'parse_crew_json', 'normalize_segments',
+           'CrewOutputParseError', 'RunCheckpoint']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -6,12 +6,20 @@ import requests
 import json
 import os
 from .llm import get_llm
+from telemetry.tracing import span
+
+def search(query: str) -> str:
+    """DuckDuckGo search for the research agent, traced per query"""
+    with span("search.ddgs", query=query) as s:
+        result = DuckDuckGoSearchRun().run(query)
+        s.set(bytes=len(result.encode("utf-8")))
+        return result
 
 class PodcastCrewAgents:
     def __init__(self):
         self.search_tool = Tool(
             name="Search",
-            func=lambda q: DuckDuckGoSearchRun().run(q),
+            func=search,
             description="Search the internet for information about a topic"
         )
         self.llm = get_llm()
@@ -0,0 +1,83 @@
+"""Per-run checkpoints of parsed stage outputs.
+
+Every stage of a run writes its parsed output under
+<run_dir>/checkpoints/ as soon as it finishes:
+
+    research.json, content.json, fact_check.json, show_notes.json
+    enhancement/<segment>.json      one per segment
+    script.json                     the assembled crew result
+    synthesis/<key>.npy             raw speech per chunk, keyed by text and voice
+
+A rerun with the same run directory loads whatever is already there, so
+a failure late in a run only repeats the stage that failed.
+invalidate_from() drops a stage and everything after it to force those
+stages to run again.
+"""
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+STAGES = ('research', 'content', 'fact_check', 'show_notes', 'enhancement', 'script', 'synthesis')
+
+RUN_FILE = 'run.json'
+
+
+class RunCheckpoint:
+    """Stage outputs persisted in one run directory"""
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        self.root = os.path.join(run_dir, 'checkpoints')
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, stage: str, part: Optional[str] = None, ext: str = '.json') -> str:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}; expected one of {STAGES}")
+        if part is None:
+            return os.path.join(self.root, stage + ext)
+        return os.path.join(self.root, stage, str(part) + ext)
+
+    def load(self, stage: str, part: Optional[str] = None) -> Any:
+        """Parsed output of a stage, or None if it has not completed"""
+        path = self.path(stage, part)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable checkpoint {path}: {str(e)}")
+            return None
+
+    def save(self, stage: str, data: Any, part: Optional[str] = None) -> str:
+        """Write a stage's output atomically so a crash never leaves half a file"""
+        path = self.path(stage, part)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def invalidate_from(self, stage: str) -> None:
+        """Drop the checkpoints of stage and every later stage"""
+        for name in STAGES[STAGES.index(stage):]:
+            single = self.path(name)
+            if os.path.exists(single):
+                os.remove(single)
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def match(self, params: Dict[str, Any]) -> bool:
+        """Keep checkpoints only if they were made for the same run parameters"""
+        path = os.path.join(self.run_dir, RUN_FILE)
+        previous = None
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f)
+        if previous is not None and previous != params:
+            print(f"Run parameters changed since the last attempt; discarding checkpoints in {self.root}")
+            self.invalidate_from(STAGES[0])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(params, f, indent=2)
+        return previous == params
@@ -1,12 +1,26 @@
 from crewai import LLM
 import os
+from telemetry.tracing import span
+
+class TracedLLM(LLM):
+    """DeepSeek LLM that records each call as a trace span"""
+    
+    def call(self, messages, *args, **kwargs):
+        if isinstance(messages, list):
+            prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        else:
+            prompt_chars = len(str(messages))
+        with span("llm.call", model=self.model, prompt_chars=prompt_chars) as s:
+            response = super().call(messages, *args, **kwargs)
+            s.set(response_chars=len(str(response)))
+            return response
 
 def get_llm():
     """Create and configure the DeepSeek LLM for use with CrewAI"""
     if not os.getenv('DEEPSEEK_API_KEY'):
         raise ValueError("DEEPSEEK_API_KEY environment variable not set")
         
-    return LLM(
+    return TracedLLM(
         model="deepseek-chat",
         api_key=os.getenv('DEEPSEEK_API_KEY'),
         api_base="https://api.deepseek.com/v1",
@@ -0,0 +1,249 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, List, Optional
+
+# Token patterns. Every pattern is anchored with .match(text, pos) so the
+# parser never rescans text it has already consumed.
+_SKIP = re.compile(r'(?:\s+|//[^\n]*|#[^\n]*)*')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_IDENT = re.compile(r'[A-Za-z_$][A-Za-z0-9_$\-]*')
+_SINGLE_QUOTED = re.compile(r"'([^'\\]*(?:\\.[^'\\]*)*)'", re.DOTALL)
+_ESCAPE = re.compile(r'\\(u[0-9a-fA-F]{4}|.)', re.DOTALL)
+
+_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f',
+    '0': '\0', '/': '/', '\\': '\\', "'": "'", '"': '"', '\n': '',
+}
+
+_LITERALS = {
+    'true': True, 'True': True,
+    'false': False, 'False': False,
+    'null': None, 'None': None, 'none': None,
+}
+
+# Parser states
+_VALUE = 0   # expecting a value (or ']' to close a list)
+_KEY = 1     # expecting a property name (or '}' to close a dict)
+_COLON = 2   # expecting ':' after a property name
+_AFTER = 3   # a value was just completed; expecting ',', a closer or '+'
+
+_EXCERPT_RADIUS = 40
+
+_strict_decoder = json.JSONDecoder()
+
+
+class CrewOutputParseError(ValueError):
+    """Raised when crew output cannot be parsed into a JSON object.
+
+    Carries the absolute character offset of the failure together with a
+    1-based line/column and a short excerpt around it, so callers can log a
+    single precise line instead of the whole document.
+    """
+
+    def __init__(self, message: str, text: str, position: int, stage: Optional[str] = None):
+        self.message = message
+        self.position = position
+        self.stage = stage
+        self.line = text.count('\n', 0, position) + 1
+        self.column = position - (text.rfind('\n', 0, position) + 1) + 1
+        start = max(0, position - _EXCERPT_RADIUS)
+        end = min(len(text), position + _EXCERPT_RADIUS)
+        self.excerpt = text[start:end].replace('\n', ' ')
+        self.pointer = position - start
+        where = f"{stage} output" if stage else "output"
+        super().__init__(
+            f"{message} in {where} at line {self.line}, column {self.column} "
+            f"(char {position}): ...{self.excerpt}..."
+        )
+
+
+def _unescape(body: str) -> str:
+    """Decode backslash escapes in a single-quoted Python-style string"""
+    if '\\' not in body:
+        return body
+
+    def replace(match):
+        esc = match.group(1)
+        if len(esc) == 5:
+            return chr(int(esc[1:], 16))
+        return _ESCAPES.get(esc, '\\' + esc)
+
+    return _ESCAPE.sub(replace, body)
+
+
+def _json_key(key: Any) -> str:
+    """Coerce Python literal keys (ints, bools, None) to JSON property names"""
+    if isinstance(key, str):
+        return key
+    return json.dumps(key)
+
+
+def _read_string(text: str, pos: int, stage: Optional[str]):
+    """Read a single- or double-quoted string starting at text[pos]"""
+    if text[pos] == '"':
+        try:
+            return scanstring(text, pos + 1, False)
+        except ValueError:
+            raise CrewOutputParseError("Unterminated string", text, pos, stage) from None
+    match = _SINGLE_QUOTED.match(text, pos)
+    if match is None:
+        raise CrewOutputParseError("Unterminated string", text, pos, stage)
+    return _unescape(match.group(1)), match.end()
+
+
+def _read_key(text: str, pos: int, frame: list, stage: Optional[str]) -> int:
+    """Read a quoted or bare property name into frame and return the new offset"""
+    c = text[pos]
+    if c == '"' or c == "'":
+        frame[1], pos = _read_string(text, pos, stage)
+        return pos
+    match = _IDENT.match(text, pos) or _NUMBER.match(text, pos)
+    if match is None:
+        raise CrewOutputParseError(f"Expected property name, found {c!r}", text, pos, stage)
+    frame[1] = match.group()
+    return match.end()
+
+
+def _read_scalar(text: str, pos: int, stage: Optional[str]):
+    """Read a string, number or literal starting at text[pos]"""
+    c = text[pos]
+    if c == '"' or c == "'":
+        return _read_string(text, pos, stage)
+    match = _NUMBER.match(text, pos)
+    if match is not None:
+        literal = match.group()
+        if '.' in literal or 'e' in literal or 'E' in literal:
+            return float(literal), match.end()
+        return int(literal), match.end()
+    match = _IDENT.match(text, pos)
+    if match is None or match.group() not in _LITERALS:
+        raise CrewOutputParseError(f"Unexpected {c!r} where a value was expected", text, pos, stage)
+    return _LITERALS[match.group()], match.end()
+
+
+def parse_crew_json(text: str, stage: Optional[str] = None) -> Any:
+    """Extract and parse the first JSON object embedded in crew output.
+
+    Runs in a single left-to-right pass with an explicit container stack, so
+    cost is linear in the length of the output and nesting depth is not
+    limited by Python's recursion limit. Besides strict JSON it accepts what
+    LLMs commonly emit: Python literals (single quotes, True/False/None),
+    trailing commas, unquoted property names, missing commas between
+    elements, ``"a" + "b"`` string concatenation, ``//`` and ``#`` comments,
+    and prose or Markdown fences around the object.
+
+    Strict JSON is handed to the C decoder first; only output it rejects
+    goes through the tolerant scanner, so the worst case is two linear passes.
+
+    Raises CrewOutputParseError with the exact offset of the first problem.
+    """
+    start = text.find('{')
+    if start == -1:
+        raise CrewOutputParseError("No JSON object found", text, 0, stage)
+
+    try:
+        return _strict_decoder.raw_decode(text, start)[0]
+    except (ValueError, RecursionError):
+        # The C decoder recurses per nesting level; the scanner below does not
+        pass
+
+    n = len(text)
+    pos = start
+    stack: List[list] = []  # frames of [container, pending_key]
+    state = _VALUE
+    concat = False
+
+    while True:
+        pos = _SKIP.match(text, pos).end()
+        if pos >= n:
+            raise CrewOutputParseError(
+                f"Unexpected end of input ({len(stack)} unclosed container(s))",
+                text, n, stage)
+        c = text[pos]
+
+        if state == _COLON:
+            if c == ':' or c == '=':
+                pos += 1
+                state = _VALUE
+                continue
+            raise CrewOutputParseError("Expected ':' after property name", text, pos, stage)
+
+        if state == _AFTER:
+            if c == ',':
+                pos += 1
+                state = _KEY if isinstance(stack[-1][0], dict) else _VALUE
+                continue
+            if c == '+':
+                pos += 1
+                concat = True
+                state = _VALUE
+                continue
+            if c != '}' and c != ']':
+                # Missing comma between members/elements: rescan c as the
+                # start of the next key or value.
+                state = _KEY if isinstance(stack[-1][0], dict) else _VALUE
+                continue
+            if (c == ']') != isinstance(stack[-1][0], list):
+                raise CrewOutputParseError(f"Mismatched {c!r}", text, pos, stage)
+            pos += 1
+            value = stack.pop()[0]
+
+        elif state == _KEY:
+            if c == '}':
+                pos += 1
+                value = stack.pop()[0]
+            else:
+                pos = _read_key(text, pos, stack[-1], stage)
+                state = _COLON
+                continue
+
+        else:
+            # state == _VALUE
+            if c == '{':
+                stack.append([{}, None])
+                pos += 1
+                state = _KEY
+                continue
+            if c == '[':
+                stack.append([[], None])
+                pos += 1
+                continue
+            if c == ']' and stack and isinstance(stack[-1][0], list):
+                # Empty list or trailing comma
+                pos += 1
+                value = stack.pop()[0]
+            else:
+                value, pos = _read_scalar(text, pos, stage)
+
+        # A value (scalar or just-closed container) is complete.
+        if not stack:
+            return value
+        container, key = stack[-1]
+        if isinstance(container, dict):
+            key = _json_key(key)
+            if concat and isinstance(value, str) and isinstance(container.get(key), str):
+                container[key] += value
+            else:
+                container[key] = value
+        elif concat and isinstance(value, str) and container and isinstance(container[-1], str):
+            container[-1] += value
+        else:
+            container.append(value)
+        concat = False
+        state = _AFTER
+
+
+def normalize_segments(segments: List[dict]) -> List[dict]:
+    """Give every content segment a 'content' string, from 'script' or speaker 'lines'"""
+    for segment in segments:
+        # Use the script as content if not present
+        if "content" not in segment:
+            segment["content"] = segment.get("script", "")
+        # Combine speaker's lines if present
+        if "lines" in segment:
+            segment["content"] = "\n".join(
+                f"{line.get('speaker', 'Speaker')}: {line.get('text', '')}"
+                for line in segment["lines"]
+            )
+    return segments
@@ -3,8 +3,10 @@ from typing import Dict, List, Callable, Optional
 import json
 from .agents import PodcastCrewAgents
 from .tasks import PodcastCrewTasks
-import re
-import ast
+from .parsing import parse_crew_json, normalize_segments, CrewOutputParseError
+from .checkpoint import RunCheckpoint
+from telemetry.metrics import LLM_TOKENS, STAGE_SECONDS
+from telemetry.tracing import span
 
 class PodcastCrew:
     def __init__(self):
@@ -14,92 +16,56 @@ class PodcastCrew:
         
     def parse_crew_output(self, result_str: str, stage: str) -> dict:
         """Parse CrewAI output into a JSON object"""
-        print(f"\nParsing {stage} output...")
-        print(f"Raw result: {result_str}")
+        print(f"\nParsing {stage} output ({len(result_str)} chars)...")
         
         try:
-            # First try using ast.literal_eval since CrewAI returns Python dict strings
-            try:
-                # Find the dictionary content
-                dict_start = result_str.find('{')
-                dict_end = result_str.rfind('}') + 1
-                if dict_start == -1 or dict_end == 0:
-                    raise ValueError(f"No dictionary content found in {stage} result")
-                
-                dict_str = result_str[dict_start:dict_end]
-                print(f"\nExtracted dictionary string: {dict_str}")
-                
-                # Parse using ast.literal_eval which can handle Python literals
-                result = ast.literal_eval(dict_str)
-                print(f"\nParsed result: {result}")
-                
-                # Convert Python types to JSON-compatible types
-                def convert_to_json_types(obj):
-                    if isinstance(obj, dict):
-                        return {str(k): convert_to_json_types(v) for k, v in obj.items()}
-                    elif isinstance(obj, (list, tuple)):
-                        return [convert_to_json_types(x) for x in obj]
-                    elif isinstance(obj, (int, float, str, bool, type(None))):
-                        return obj
-                    else:
-                        return str(obj)
-                
-                return convert_to_json_types(result)
-                
-            except (ValueError, SyntaxError) as e:
-                print(f"\nFailed to parse with ast.literal_eval: {e}")
-                print("Falling back to JSON parsing...")
-                
-                # Find the JSON content
-                json_start = result_str.find('{')
-                json_end = result_str.rfind('}') + 1
-                if json_start == -1 or json_end == 0:
-                    raise ValueError(f"No JSON content found in {stage} result")
-                
-                json_str = result_str[json_start:json_end]
-                print(f"\nExtracted JSON string: {json_str}")
-                
-                # Clean up the JSON string
-                json_str = json_str.replace("'", '"')  # Replace single quotes with double quotes
-                json_str = json_str.replace('None', 'null')  # Replace Python None with JSON null
-                json_str = json_str.replace('True', 'true')  # Replace Python True with JSON true
-                json_str = json_str.replace('False', 'false')  # Replace Python False with JSON false
-                print(f"\nAfter basic replacements: {json_str}")
-                
-                # Add quotes around unquoted property names
-                json_str = re.sub(r'(\{|\,)\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:', r'\1 "\2":', json_str)
-                print(f"\nAfter property name quoting: {json_str}")
-                
-                # Fix common JSON formatting issues
-                json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)  # Remove trailing commas
-                json_str = re.sub(r'"\s*\+\s*"', '', json_str)  # Remove string concatenation
-                json_str = re.sub(r'\s+', ' ', json_str)  # Normalize whitespace
-                
-                # Additional cleanup for CrewAI output
-                json_str = re.sub(r'(["\d])\s+(["\w{[])', r'\1,\2', json_str)  # Add missing commas
-                json_str = re.sub(r'}\s*{', '},{', json_str)  # Add commas between objects
-                json_str = re.sub(r']\s*{', '],{', json_str)  # Add commas between array and object
-                json_str = re.sub(r'}\s*\[', '},\[', json_str)  # Add commas between object and array
-                json_str = re.sub(r']\s*\[', '],\[', json_str)  # Add commas between arrays
-                
-                # Remove any remaining invalid characters
-                json_str = re.sub(r'[^\x20-\x7E]', '', json_str)  # Remove non-printable characters
-                
-                print(f"\nFinal JSON string: {json_str}")
-                print("\nCharacter by character:")
-                for i, c in enumerate(json_str):
-                    print(f"[{i}] {c!r}")
-                
-                return json.loads(json_str)
-                
-        except Exception as e:
+            with span("parse", stage=stage, chars=len(result_str)):
+                result = parse_crew_json(result_str, stage)
+            print(f"Parsed {stage} output with keys: {list(result.keys())}")
+            return result
+            
+        except CrewOutputParseError as e:
             print(f"\nError parsing {stage} output: {e}")
             print(f"Raw output: {result_str}")
             raise
 
-    def create_podcast(self, topic: str, duration_minutes: int, style: str = "Conversational", progress_callback: Optional[Callable[[str, str], None]] = None) -> Dict:
-        """Create a full podcast with research, content, and enhancements"""
+    def kickoff(self, crew: Crew, stage: str):
+        """Run a crew, recording its latency and LLM token usage"""
+        with STAGE_SECONDS.time(stage=stage), span(f"crew.{stage}") as s:
+            result = crew.kickoff()
+            usage = getattr(result, "token_usage", None) or getattr(crew, "usage_metrics", None)
+            for kind in ("prompt_tokens", "completion_tokens"):
+                count = getattr(usage, kind, None) if usage is not None else None
+                if count:
+                    LLM_TOKENS.inc(count, stage=stage, kind=kind[:-len("_tokens")])
+                    s.set(**{kind: count})
+        return result
+
+    def run_stage(self, checkpoint: Optional[RunCheckpoint], stage: str, build_crew: Callable[[], Crew],
+                  label: str, part: Optional[str] = None) -> dict:
+        """Kick off and parse one stage, or load its output from the run's checkpoint"""
+        if checkpoint is not None:
+            cached = checkpoint.load(stage, part)
+            if cached is not None:
+                print(f"\nResuming {label} from checkpoint")
+                return cached
+        result = self.parse_crew_output(str(self.kickoff(build_crew(), stage)), label)
+        if checkpoint is not None:
+            checkpoint.save(stage, result, part)
+        return result
+
+    def create_podcast(self, topic: str, duration_minutes: int, style: str = "Conversational", progress_callback: Optional[Callable[[str, str], None]] = None,
+                       checkpoint: Optional[RunCheckpoint] = None, resume_from: Optional[str] = None) -> Dict:
+        """Create a full podcast with research, content, and enhancements.
+
+        With a checkpoint, each stage's parsed output is saved as it completes
+        and reused on the next call; resume_from reruns that stage and all
+        later ones.
+        """
         try:
+            if checkpoint is not None and resume_from is not None:
+                checkpoint.invalidate_from(resume_from)
+            
             # Initialize agents with style
             researcher = self.agents.get_research_agent()
             content_creator = self.agents.get_content_agent(style)
@@ -111,71 +77,49 @@ class PodcastCrew:
                 progress_callback("Research Agent", "Starting research phase...")
             
             # 1. Research
-            research_task = self.tasks.research_task(topic, researcher)
-            research_crew = Crew(
+            print("\nResearching topic...")
+            research_data = self.run_stage(checkpoint, "research", lambda: Crew(
                 agents=[researcher],
-                tasks=[research_task],
+                tasks=[self.tasks.research_task(topic, researcher)],
                 verbose=True
-            )
-            print("\nResearching topic...")
-            research_result = research_crew.kickoff()
-            research_data = self.parse_crew_output(str(research_result), "research")
+            ), "research")
             
             if progress_callback:
                 progress_callback("Content Creator", "Creating podcast content...")
             
             # 2. Content creation
-            content_task = self.tasks.content_creation_task(research_data, duration_minutes, content_creator)
-            content_crew = Crew(
+            print("\nCreating content...")
+            content_data = self.run_stage(checkpoint, "content", lambda: Crew(
                 agents=[content_creator],
-                tasks=[content_task],
+                tasks=[self.tasks.content_creation_task(research_data, duration_minutes, content_creator)],
                 verbose=True
-            )
-            print("\nCreating content...")
-            content_result = content_crew.kickoff()
-            content_data = self.parse_crew_output(str(content_result), "content")
+            ), "content")
             
             # Process segments to ensure they have content
-            segments = content_data.get("segments", [])
-            for segment in segments:
-                # Use the script as content if not present
-                if "content" not in segment:
-                    segment["content"] = segment.get("script", "")
-                # Combine speaker's lines if present
-                if "lines" in segment:
-                    segment["content"] = "\n".join(
-                        f"{line.get('speaker', 'Speaker')}: {line.get('text', '')}"
-                        for line in segment["lines"]
-                    )
+            segments = normalize_segments(content_data.get("segments", []))
             content_data["segments"] = segments
             
             if progress_callback:
                 progress_callback("Fact Checker", "Verifying facts...")
             
             # 3. Fact checking
-            fact_check_task = self.tasks.fact_checking_task(content_data, fact_checker)
-            fact_check_crew = Crew(
+            print("\nVerifying facts...")
+            fact_check_data = self.run_stage(checkpoint, "fact_check", lambda: Crew(
                 agents=[fact_checker],
-                tasks=[fact_check_task],
+                tasks=[self.tasks.fact_checking_task(content_data, fact_checker)],
                 verbose=True
-            )
-            print("\nVerifying facts...")
-            fact_check_result = fact_check_crew.kickoff()
-            fact_check_data = self.parse_crew_output(str(fact_check_result), "fact check")
+            ), "fact check")
             
             if progress_callback:
                 progress_callback("Show Notes Agent", "Creating show notes...")
             
             # 4. Show notes
-            show_notes_task = self.tasks.show_notes_task(content_data, fact_check_data, show_notes_agent)
-            show_notes_crew = Crew(
+            print("\nCreating show notes...")
+            show_notes = self.run_stage(checkpoint, "show_notes", lambda: Crew(
                 agents=[show_notes_agent],
-                tasks=[show_notes_task],
+                tasks=[self.tasks.show_notes_task(content_data, fact_check_data, show_notes_agent)],
                 verbose=True
-            )
-            print("\nCreating show notes...")
-            show_notes_result = show_notes_crew.kickoff()
-            show_notes = self.parse_crew_output(str(show_notes_result), "show notes")
+            ), "show notes")
             
             if progress_callback:
                 progress_callback("Audio Enhancement Agent", "Optimizing audio parameters...")
@@ -183,15 +127,12 @@ class PodcastCrew:
             # 5. Audio enhancement for each segment
             print("\nOptimizing audio parameters...")
             audio_enhancements = []
-            for segment in segments:
-                audio_task = self.tasks.audio_enhancement_task(segment, audio_agent)
-                audio_crew = Crew(
+            for i, segment in enumerate(segments):
+                enhancement = self.run_stage(checkpoint, "enhancement", lambda: Crew(
                     agents=[audio_agent],
-                    tasks=[audio_task],
+                    tasks=[self.tasks.audio_enhancement_task(segment, audio_agent)],
                     verbose=True
-                )
-                enhancement_result = audio_crew.kickoff()
-                enhancement = self.parse_crew_output(str(enhancement_result), "audio enhancement")
+                ), "audio enhancement", part=str(i))
                 # Add enhancements to segment
                 segment["enhancements"] = enhancement
                 audio_enhancements.append(enhancement)
@@ -0,0 +1,194 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from telemetry.metrics import PROMPT_TOKENS
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character heuristic
+    _encoding = None
+
+# Fields each task actually reads from its upstream payloads, as dotted paths
+# where "[]" maps over a list. Anything not listed is dropped before the
+# payload is serialized into the prompt.
+TASK_FIELDS: Dict[str, Dict[str, List[str]]] = {
+    "content_creation": {
+        "research": ["key_points", "facts", "statistics", "expert_opinions", "trends"],
+    },
+    "fact_checking": {
+        "content": ["title", "segments[].title", "segments[].content"],
+    },
+    "show_notes": {
+        "content": [
+            "title", "description", "keywords",
+            "segments[].timestamp", "segments[].title", "segments[].content",
+        ],
+        "fact_check": [
+            "verified_claims[].claim", "verified_claims[].source",
+            "uncertain_claims[].claim",
+        ],
+    },
+    "audio_enhancement": {
+        "segment": ["title", "speaker", "tone", "music", "sound_effect", "content"],
+    },
+}
+
+# Token budget for each serialized payload
+TASK_BUDGETS: Dict[str, Dict[str, int]] = {
+    "content_creation": {"research": 3000},
+    "fact_checking": {"content": 4000},
+    "show_notes": {"content": 2500, "fact_check": 1000},
+    "audio_enhancement": {"segment": 600},
+}
+
+MIN_STRING_CHARS = 80
+_SENTENCE_END = re.compile(r'[.!?](?=\s)')
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens with tiktoken, or estimate ~4 characters per token"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def compact_json(obj: Any) -> str:
+    """Serialize without indentation or padding after separators"""
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def project(obj: Any, paths: List[str]) -> Any:
+    """Keep only the given dotted paths of obj ("segments[].title" maps over lists)"""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return _project(obj, tree)
+
+
+def _project(obj: Any, tree: Dict[str, Any]) -> Any:
+    if not tree:
+        return obj
+    if not isinstance(obj, dict):
+        return obj
+    result = {}
+    for key, subtree in tree.items():
+        if key.endswith('[]'):
+            key = key[:-2]
+            if isinstance(obj.get(key), list):
+                result[key] = [_project(item, subtree) for item in obj[key]]
+        elif key in obj:
+            result[key] = _project(obj[key], subtree)
+    return result
+
+
+def shorten(text: str, max_chars: int) -> str:
+    """Cut text to at most max_chars, preferring a sentence boundary"""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max(max_chars - 1, 0)]
+    cut = 0
+    for match in _SENTENCE_END.finditer(head):
+        cut = match.end()
+    if cut < max_chars // 2:
+        cut = head.rfind(' ')
+        if cut < max_chars // 2:
+            cut = len(head)
+    return head[:cut].rstrip() + '…'
+
+
+def _map_strings(obj: Any, fn) -> Any:
+    if isinstance(obj, str):
+        return fn(obj)
+    if isinstance(obj, dict):
+        return {k: _map_strings(v, fn) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_map_strings(v, fn) for v in obj]
+    return obj
+
+
+def _string_lengths(obj: Any, out: List[int]) -> List[int]:
+    if isinstance(obj, str):
+        out.append(len(obj))
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _string_lengths(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _string_lengths(v, out)
+    return out
+
+
+def _string_cap(lengths: List[int], allowed: int) -> int:
+    """Largest per-string cap L with sum(min(len, L)) <= allowed (water filling)"""
+    lengths = sorted(lengths)
+    remaining = allowed
+    for i, length in enumerate(lengths):
+        share = remaining // (len(lengths) - i)
+        if length > share:
+            return share
+        remaining -= length
+    return lengths[-1] if lengths else 0
+
+
+def _halve_longest_list(obj: Any) -> bool:
+    """Drop the second half of the longest list in obj; False if nothing to drop"""
+    longest: Optional[list] = None
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            if len(node) > 1 and (longest is None or len(node) > len(longest)):
+                longest = node
+            stack.extend(node)
+    if longest is None:
+        return False
+    del longest[(len(longest) + 1) // 2:]
+    return True
+
+
+def fit_to_budget(obj: Any, budget: int) -> Tuple[str, int]:
+    """Serialize obj compactly within budget tokens, truncating strings then lists"""
+    text = compact_json(obj)
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text, tokens
+
+    obj = json.loads(text)  # private copy we can trim in place
+    for _ in range(16):
+        chars_per_token = len(text) / max(tokens, 1)
+        lengths = _string_lengths(obj, [])
+        overhead = len(text) - sum(lengths)
+        allowed = int(budget * chars_per_token * 0.95) - overhead
+        cap = _string_cap(lengths, allowed) if lengths else 0
+        if lengths and MIN_STRING_CHARS <= cap < max(lengths):
+            obj = _map_strings(obj, lambda s: shorten(s, cap))
+        elif not _halve_longest_list(obj):
+            obj = _map_strings(obj, lambda s: shorten(s, max(cap, 1)))
+        text = compact_json(obj)
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            break
+    return text, tokens
+
+
+def render_payload(task: str, name: str, payload: Any) -> str:
+    """Project, compact and budget one upstream payload for a task prompt"""
+    fields = TASK_FIELDS.get(task, {}).get(name)
+    budget = TASK_BUDGETS.get(task, {}).get(name)
+    original = count_tokens(json.dumps(payload, indent=2))
+    if fields:
+        payload = project(payload, fields)
+    if budget:
+        text, tokens = fit_to_budget(payload, budget)
+    else:
+        text = compact_json(payload)
+        tokens = count_tokens(text)
+    PROMPT_TOKENS.inc(tokens, task=task, payload=name)
+    print(f"Prompt payload {task}.{name}: {original} -> {tokens} tokens")
+    return text
@@ -1,6 +1,6 @@
 from crewai import Task
 from typing import Dict, List
-import json
+from .prompts import render_payload
 
 class PodcastCrewTasks:
     def research_task(self, topic: str, agent) -> Task:
@@ -28,7 +28,7 @@ class PodcastCrewTasks:
     def content_creation_task(self, research_data: Dict, duration_minutes: int, agent) -> Task:
         return Task(
             description=f"""Create a {duration_minutes}-minute podcast script using this research:
-            {json.dumps(research_data, indent=2)}
+            {render_payload("content_creation", "research", research_data)}
             
             Create multiple segments including:
             1. Engaging introduction
@@ -77,7 +77,7 @@ class PodcastCrewTasks:
     def fact_checking_task(self, content: Dict, agent) -> Task:
         return Task(
             description=f"""Verify all facts in this content:
-            {json.dumps(content, indent=2)}
+            {render_payload("fact_checking", "content", content)}
             
             For each segment:
             1. Extract all factual claims
@@ -106,8 +106,8 @@ class PodcastCrewTasks:
     def show_notes_task(self, content: Dict, fact_check: Dict, agent) -> Task:
         return Task(
             description=f"""Create comprehensive show notes using:
-            Content: {json.dumps(content, indent=2)}
-            Fact Check: {json.dumps(fact_check, indent=2)}
+            Content: {render_payload("show_notes", "content", content)}
+            Fact Check: {render_payload("show_notes", "fact_check", fact_check)}
             
             Include:
             1. Episode title and description
@@ -143,7 +143,7 @@ class PodcastCrewTasks:
     def audio_enhancement_task(self, segment: Dict, agent) -> Task:
         return Task(
             description=f"""Optimize audio parameters for this segment:
-            {json.dumps(segment, indent=2)}
+            {render_payload("audio_enhancement", "segment", segment)}
             
             Determine:
             1. Voice characteristics (pitch, speed, emotion)
@@ -1,5 +1,6 @@
 import gradio as gr
 from auto_podcast_creator import AutoPodcastCreator
+from telemetry.metrics import start_from_env
 from datetime import datetime
 import traceback
 
@@ -138,5 +139,6 @@ def create_interface():
     return demo
 
 if __name__ == "__main__":
+    start_from_env()
     interface = create_interface()
     interface.launch()
@@ -0,0 +1,6 @@
+from .metrics import (REGISTRY, Counter, Gauge, Histogram, Registry, STAGE_SECONDS, render, serve_metrics,
+                      start_from_env, write_metrics)
+from .tracing import Span, Trace, bind, span, start_trace, stop_trace, traced
+
+__all__ = ['REGISTRY', 'Counter', 'Gauge', 'Histogram', 'Registry', 'STAGE_SECONDS', 'render', 'serve_metrics',
+           'start_from_env', 'write_metrics', 'Span', 'Trace', 'bind', 'span', 'start_trace', 'stop_trace', 'traced']
@@ -0,0 +1,325 @@
+"""In-process metrics with a Prometheus text-format exporter.
+
+Counters, gauges and histograms are registered once by name and updated
+from anywhere in the pipeline with labels:
+
+    STAGE_SECONDS.labels(stage="research").observe(12.3)
+    with STAGE_SECONDS.time(stage="mix"):
+        ...
+
+render() produces the Prometheus exposition format, which write_metrics()
+dumps to a file and serve_metrics() serves on /metrics from a background
+thread, next to a /ready probe that answers 200 once ENGINE_READY is set
+and 503 before. Updates take one lock per metric, so recording from encoder and
+enhancement threads is safe.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond text processing up to multi-minute crew stages
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def labels(self, **labels) -> '_Child':
+        return _Child(self, self._key(labels))
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _Child:
+    """A metric bound to one set of label values"""
+
+    __slots__ = ('metric', 'key')
+
+    def __init__(self, metric: _Metric, key: LabelKey):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.metric._inc(self.key, amount)
+
+    def set(self, value: float) -> None:
+        self.metric._set(self.key, value)
+
+    def observe(self, value: float) -> None:
+        self.metric._observe(self.key, value)
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key: LabelKey, amount: float) -> None:
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} cannot decrease")
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield '', _format_labels(self.labelnames, key), value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. a queue depth"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self._set(self._key(labels), value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self._inc(self._key(labels), amount)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self._inc(self._key(labels), -amount)
+
+    def _set(self, key: LabelKey, value: float) -> None:
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _inc(self, key: LabelKey, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield '', _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: LabelKey, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block in seconds"""
+        key = self._key(labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(key, time.perf_counter() - start)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                yield '_bucket', _format_labels(self.labelnames, key, le), cumulative
+            yield '_sum', _format_labels(self.labelnames, key), total
+            yield '_count', _format_labels(self.labelnames, key), count
+
+
+class Registry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Pipeline metrics
+STAGE_SECONDS = REGISTRY.histogram(
+    'podcast_stage_seconds', 'Wall time of each pipeline stage', ['stage'])
+LLM_TOKENS = REGISTRY.counter(
+    'podcast_llm_tokens_total', 'LLM tokens used by crew stages', ['stage', 'kind'])
+PROMPT_TOKENS = REGISTRY.counter(
+    'podcast_prompt_payload_tokens_total', 'Tokens of upstream payloads serialized into prompts', ['task', 'payload'])
+SYNTHESIS_RTF = REGISTRY.histogram(
+    'podcast_synthesis_rtf', 'Speech synthesis real-time factor (compute seconds per audio second)',
+    buckets=RTF_BUCKETS)
+AUDIO_SECONDS = REGISTRY.counter(
+    'podcast_audio_seconds_total', 'Seconds of audio produced', ['kind'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'podcast_cache_requests_total', 'Cache lookups by cache and result (hit or miss)', ['cache', 'result'])
+QUEUE_DEPTH = REGISTRY.gauge(
+    'podcast_queue_depth', 'Items waiting in a work queue', ['queue'])
+JOBS = REGISTRY.counter(
+    'podcast_jobs_total', 'Podcast render jobs by outcome', ['status'])
+ENGINE_READY = REGISTRY.gauge(
+    'podcast_engine_ready', '1 once the synthesis engine has loaded and warmed up')
+
+
+def cache_result(cache: str, hit: bool) -> None:
+    """Count one cache lookup as a hit or a miss"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def write_metrics(path: str, registry: Registry = REGISTRY) -> str:
+    """Dump the registry to path atomically (e.g. for the node exporter textfile collector)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/ready':
+            ready = ENGINE_READY.value() >= 1
+            body = b'ready\n' if ready else b'warming up\n'
+            self.send_response(200 if ready else 503)
+        elif path == '/metrics':
+            body = self.registry.render().encode('utf-8')
+            self.send_response(200)
+        else:
+            self.send_error(404)
+            return
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = '0.0.0.0', registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread and return the server"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def start_from_env() -> Optional[ThreadingHTTPServer]:
+    """Start the /metrics server if PODCAST_METRICS_PORT is set"""
+    port = os.environ.get('PODCAST_METRICS_PORT')
+    if not port:
+        return None
+    try:
+        return serve_metrics(int(port))
+    except Exception as e:
+        print(f"Error starting metrics server: {str(e)}")
+        return None
@@ -0,0 +1,215 @@
+"""Lightweight nested spans exported as a Chrome trace.
+
+Spans are recorded only while a trace is active, so instrumentation left
+in hot paths costs one context variable lookup otherwise:
+
+    trace = start_trace("episode")
+    with span("crew.research", topic=topic) as s:
+        ...
+        s.set(tokens=1234)
+    stop_trace().save("output/<job>/trace.json")
+
+Spans nest per thread and carry their thread id, so work done on encoder
+or enhancement threads shows up as parallel lanes. The saved file uses
+the Trace Event Format and opens in chrome://tracing or ui.perfetto.dev.
+
+The active trace is held in a context variable, so jobs running
+concurrently on different threads each record into their own trace.
+New threads start without one: wrap work handed to a pool or thread with
+bind() to record it into the submitting job's trace.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    """One timed operation with attributes"""
+
+    __slots__ = ('name', 'start', 'end', 'attributes', 'thread_id', 'thread_name', 'parent')
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional['Span']):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        thread = threading.current_thread()
+        self.thread_id = threading.get_ident()
+        self.thread_name = thread.name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    def set(self, **attributes) -> 'Span':
+        """Attach attributes such as tokens, bytes or samples"""
+        self.attributes.update(attributes)
+        return self
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes) -> '_NoopSpan':
+        return self
+
+
+_NOOP = _NoopSpan()
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class Trace:
+    """Spans collected between start_trace() and stop_trace()"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.spans: List[Span] = []
+        self.origin = time.perf_counter()
+        self.wall_start = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name: str, attributes: Dict[str, Any]) -> Span:
+        stack = self._stack()
+        s = Span(name, attributes, stack[-1] if stack else None)
+        stack.append(s)
+        return s
+
+    def finish(self, s: Span) -> None:
+        s.end = time.perf_counter()
+        stack = self._stack()
+        if stack and stack[-1] is s:
+            stack.pop()
+        with self._lock:
+            self.spans.append(s)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Trace Event Format: one complete ("X") event per span, times in µs"""
+        pid = os.getpid()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.name}}]
+        threads = {}
+        for s in spans:
+            threads.setdefault(s.thread_id, s.thread_name)
+            events.append({
+                "name": s.name,
+                "cat": s.name.split('.')[0],
+                "ph": "X",
+                "ts": (s.start - self.origin) * 1e6,
+                "dur": (s.end - s.start) * 1e6,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": {k: _jsonable(v) for k, v in s.attributes.items()},
+            })
+        for tid, name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"trace": self.name, "started": self.wall_start}}
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome(), f)
+        print(f"Saved trace with {len(self.spans)} spans to {path}")
+        return path
+
+    def summary(self, top: int = 10) -> List[Dict[str, Any]]:
+        """Total and self time per span name, slowest first"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        children: Dict[int, float] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            if s.parent is not None:
+                children[id(s.parent)] = children.get(id(s.parent), 0.0) + s.duration
+        for s in spans:
+            row = totals.setdefault(s.name, {"name": s.name, "count": 0, "total_s": 0.0, "self_s": 0.0})
+            row["count"] += 1
+            row["total_s"] += s.duration
+            row["self_s"] += s.duration - children.get(id(s), 0.0)
+        return sorted(totals.values(), key=lambda r: r["total_s"], reverse=True)[:top]
+
+
+_active: contextvars.ContextVar = contextvars.ContextVar('trace', default=None)
+
+
+def start_trace(name: str = 'podcast') -> Trace:
+    """Begin collecting spans in the current context (this thread's job)"""
+    trace = Trace(name)
+    _active.set(trace)
+    return trace
+
+
+def stop_trace() -> Optional[Trace]:
+    """Stop collecting in the current context and return the finished trace"""
+    trace = _active.get()
+    _active.set(None)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _active.get()
+
+
+def bind(fn):
+    """fn wrapped to record its spans into the caller's trace on whichever thread runs it"""
+    trace = _active.get()
+    if trace is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = _active.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return run
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Time the with-block as a span nested under the thread's current span"""
+    trace = _active.get()
+    if trace is None:
+        yield _NOOP
+        return
+    s = trace.begin(name, attributes)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        trace.finish(s)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of span(), named after the function by default"""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
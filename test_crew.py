@@ -16,7 +16,7 @@ def main():
     duration_minutes = 5
     options = {
         "add_music": True,
-        "music_volume": 0.1,
+        "music_volume": -20,
         "voice_type": "default",
         "accent": "American",
         "speed": 1.0,
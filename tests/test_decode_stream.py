@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+kokoro = pytest.importorskip('kokoro')
+
+HAR_PER_FRAME = 120
+
+
+class StubGenerator:
+    def source(self, F0_pred, generator=None):
+        frames = F0_pred.shape[-1] // 2
+        return torch.zeros(1, 22, frames * HAR_PER_FRAME + 1)
+
+
+class StubDecoder:
+    """Emits each asr frame's value for its 600 samples, so windows must line up exactly"""
+
+    generator = StubGenerator()
+
+    def __call__(self, asr, F0_pred, N_pred, s, har=None, generator=None):
+        frames = asr.shape[-1]
+        assert F0_pred.shape[-1] == N_pred.shape[-1] == 2 * frames
+        if har is not None:
+            assert har.shape[-1] == frames * HAR_PER_FRAME + 1
+        return asr[0, 0].repeat_interleave(kokoro.SAMPLES_PER_FRAME)[None, None]
+
+
+class StubModel:
+    decoder = StubDecoder()
+
+
+def decode(frames, **kwargs):
+    asr = torch.arange(frames, dtype=torch.float32).expand(1, 4, frames)
+    curves = torch.zeros(1, 2 * frames)
+    return list(kokoro.decode_stream(StubModel(), asr, curves, curves, torch.zeros(1, 128), **kwargs))
+
+
+@pytest.mark.parametrize('frames', [*range(120, 140), *range(250, 270), *range(376, 400), 600])
+def test_windows_cover_every_frame_once(frames):
+    pieces = decode(frames)
+    expected = np.repeat(np.arange(frames, dtype=np.float32), kokoro.SAMPLES_PER_FRAME)
+    np.testing.assert_allclose(np.concatenate(pieces), expected, atol=1e-3)
+
+
+@pytest.mark.parametrize('frames', range(20, 60))
+def test_small_windows_across_boundaries(frames):
+    pieces = decode(frames, window=8, context=3, crossfade=2)
+    expected = np.repeat(np.arange(frames, dtype=np.float32), kokoro.SAMPLES_PER_FRAME)
+    np.testing.assert_allclose(np.concatenate(pieces), expected, atol=1e-3)
+    assert len(pieces) > 1
@@ -0,0 +1,75 @@
+import pytest
+
+from tts import DialogueRenderer, VoiceCast, split_turns
+
+
+def segment(content, speaker='Host'):
+    return {'speaker': speaker, 'content': content}
+
+
+@pytest.mark.parametrize('content', [
+    "Here are three tips.\nTip 1: sleep well.\nTip 2: drink water.",
+    "Step 1: open the app.\nStep 2: sign in.\nStep 3: pick a plan.",
+    "Note: this applies to everyone.\nAnd it is worth repeating.",
+    "Example: a morning walk.\nResult: better sleep.",
+    "Warning: hot.\nWarning: sharp.\nWarning: heavy.",
+])
+def test_labelled_prose_stays_with_the_narrator(content):
+    assert split_turns(segment(content)) == [('Host', ' '.join(content.split()))]
+
+
+def test_two_speaker_exchange():
+    content = ("Host: Welcome back to the show.\n"
+               "Guest: Thanks for having me.\n"
+               "Host: Let's start with sleep.\n"
+               "It matters more than most people think.\n"
+               "Guest: Agreed. Tip 1: keep a schedule.")
+    assert split_turns(segment(content)) == [
+        ('Host', 'Welcome back to the show.'),
+        ('Guest', 'Thanks for having me.'),
+        ('Host', "Let's start with sleep. It matters more than most people think."),
+        ('Guest', 'Agreed. Tip 1: keep a schedule.'),
+    ]
+
+
+def test_list_inside_a_dialogue_keeps_its_labels():
+    content = ("Alice: Here is the plan.\n"
+               "Bob: Go on.\n"
+               "Alice: Two steps.\n"
+               "Step 1: breathe.\n"
+               "Step 2: relax.\n"
+               "Bob: Simple enough.")
+    assert split_turns(segment(content)) == [
+        ('Alice', 'Here is the plan.'),
+        ('Bob', 'Go on.'),
+        ('Alice', 'Two steps. Step 1: breathe. Step 2: relax.'),
+        ('Bob', 'Simple enough.'),
+    ]
+
+
+def test_segment_speaker_and_named_speakers_start_turns():
+    content = "Welcome.\nExpert: Glad to be here.\nHost: Great."
+    assert split_turns(segment(content)) == [('Host', 'Welcome. Expert: Glad to be here.'), ('Host', 'Great.')]
+    assert split_turns(segment(content), ['expert']) == [
+        ('Host', 'Welcome.'), ('Expert', 'Glad to be here.'), ('Host', 'Great.')]
+
+
+def test_lines_are_used_as_given():
+    lines = [{'speaker': 'Tip 1', 'text': 'Sleep.'}, {'text': 'Water.'}]
+    assert split_turns({'speaker': 'Host', 'lines': lines}) == [('Tip 1', 'Sleep.'), ('Host', 'Water.')]
+
+
+def test_numbered_tips_are_voiced_by_the_host():
+    cast = VoiceCast('Bella (American Female)')
+    renderer = DialogueRenderer(lambda *args: None)
+    chunks = renderer.plan(0, segment("Here are three tips.\nTip 1: sleep well.\nTip 2: drink water."), cast, 1.0)
+    assert [(c.speaker, c.voice, c.text) for c in chunks] == [
+        ('Host', 'Bella (American Female)', 'Here are three tips. Tip 1: sleep well. Tip 2: drink water.')]
+
+
+def test_cast_names_count_as_speakers():
+    cast = VoiceCast('Bella (American Female)', speaker_voices={'Guest': 'George (British Male)'})
+    renderer = DialogueRenderer(lambda *args: None)
+    chunks = renderer.plan(0, segment("Host: Hello.\nGuest: Hi there."), cast, 1.0)
+    assert [(c.speaker, c.voice) for c in chunks] == [
+        ('Host', 'Bella (American Female)'), ('Guest', 'George (British Male)')]
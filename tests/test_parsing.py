@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from crew.parsing import CrewOutputParseError, normalize_segments, parse_crew_json
+
+SCRIPT = {"title": "Sleep", "segments": [{"type": "intro", "content": "Welcome."}]}
+
+
+@pytest.mark.parametrize('text', [
+    json.dumps(SCRIPT),
+    "Here is the script you asked for:\n" + json.dumps(SCRIPT, indent=2) + "\nLet me know if you want changes.",
+    "```json\n" + json.dumps(SCRIPT, indent=2) + "\n```",
+    "Sure!\n```\n" + json.dumps(SCRIPT) + "\n```\nThe {segments} above follow the outline.",
+])
+def test_object_is_extracted_from_surrounding_prose_and_fences(text):
+    assert parse_crew_json(text) == SCRIPT
+
+
+def test_trailing_commas():
+    text = '{"title": "Sleep", "segments": [{"type": "intro", "content": "Welcome.",},],}'
+    assert parse_crew_json(text) == SCRIPT
+
+
+def test_braces_and_quotes_inside_strings():
+    text = 'Output: {"content": "Use {braces} and [brackets]: \\"quoted\\" }", "n": 1,} trailing }'
+    assert parse_crew_json(text) == {"content": 'Use {braces} and [brackets]: "quoted" }', "n": 1}
+
+
+def test_python_literals_and_llm_quirks():
+    text = ("{'title': 'Part ' + 'one', done: True, notes: None, // a comment\n"
+            " 'tags': ['a' 'b'], # another\n 'score': 1e3}")
+    assert parse_crew_json(text) == {"title": "Part one", "done": True, "notes": None,
+                                     "tags": ["a", "b"], "score": 1000.0}
+
+
+def test_deep_nesting_is_not_limited_by_recursion():
+    depth = 5000
+    text = '{"a": ' + '[' * depth + ']' * depth + ',}'
+    value = parse_crew_json(text)['a']
+    for _ in range(depth - 1):
+        value = value[0]
+    assert value == []
+
+
+def test_truncated_output_reports_the_end_of_input():
+    text = '{"title": "Sleep", "segments": [{"type": "intro", "content": "Wel'
+    with pytest.raises(CrewOutputParseError) as error:
+        parse_crew_json(text, stage='script')
+    assert error.value.message == 'Unterminated string'
+    assert error.value.position == text.index('"Wel')
+
+    text = '{"title": "Sleep",\n "segments": [1, 2'
+    with pytest.raises(CrewOutputParseError) as error:
+        parse_crew_json(text)
+    assert error.value.message.startswith('Unexpected end of input (2 unclosed')
+    assert (error.value.position, error.value.line, error.value.column) == (len(text), 2, 19)
+
+
+def test_error_reports_line_column_and_excerpt():
+    text = 'Result:\n{\n  "title": "Sleep",\n  "segments": @\n}'
+    with pytest.raises(CrewOutputParseError) as error:
+        parse_crew_json(text, stage='script')
+    e = error.value
+    assert (e.line, e.column) == (4, 15)
+    assert text[e.position] == '@'
+    assert e.excerpt[e.pointer] == '@'
+    assert e.stage == 'script'
+    assert str(e).startswith("Unexpected '@' where a value was expected in script output at line 4, column 15")
+
+
+def test_no_object_found():
+    with pytest.raises(CrewOutputParseError) as error:
+        parse_crew_json('I could not write the script.')
+    assert (error.value.message, error.value.line, error.value.column) == ('No JSON object found', 1, 1)
+
+
+def test_normalize_segments():
+    segments = normalize_segments([
+        {'script': 'From the script.'},
+        {'content': 'Kept.'},
+        {'content': 'Replaced.', 'lines': [{'speaker': 'Host', 'text': 'Hi.'}, {'text': 'Hello.'}]},
+        {},
+    ])
+    assert [s['content'] for s in segments] == ['From the script.', 'Kept.', 'Host: Hi.\nSpeaker: Hello.', '']
@@ -0,0 +1,76 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+plbert = pytest.importorskip('plbert')
+
+
+@pytest.fixture(scope='module')
+def bert():
+    torch.manual_seed(0)
+    model = plbert.load_plbert().eval()
+    calls = []
+    fused_layer = model.fused_layer
+
+    def counted(*args):
+        calls.append(1)
+        return fused_layer(*args)
+
+    model.fused_layer = counted
+    model.calls = calls
+    return model
+
+
+def stock(bert, input_ids, attention_mask):
+    return transformers.AlbertModel.forward(bert, input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+@pytest.fixture
+def input_ids():
+    return torch.randint(1, 178, (2, 40), generator=torch.Generator().manual_seed(1))
+
+
+@torch.no_grad()
+def test_fused_matches_stock_unpadded(bert, input_ids):
+    mask = torch.ones_like(input_ids)
+    bert.calls.clear()
+    fused = bert(input_ids, attention_mask=mask)
+    assert len(bert.calls) == bert.config.num_hidden_layers
+    expected = stock(bert, input_ids, mask)
+    assert (fused - expected).abs().max() <= 1e-6
+
+
+@torch.no_grad()
+def test_fused_matches_stock_padded(bert, input_ids):
+    mask = torch.ones_like(input_ids)
+    mask[1, 25:] = 0
+    bert.calls.clear()
+    fused = bert(input_ids, attention_mask=mask)
+    assert len(bert.calls) == bert.config.num_hidden_layers
+    expected = stock(bert, input_ids, mask)
+    # Padded positions are never read downstream
+    valid = mask.bool()
+    assert (fused[valid] - expected[valid]).abs().max() <= 1e-6
+
+
+@torch.no_grad()
+def test_fused_qkv_follows_weight_updates(bert, input_ids):
+    mask = torch.ones_like(input_ids)
+    query = bert.encoder.albert_layer_groups[0].albert_layers[0].attention.query
+    original = query.weight.clone()
+    try:
+        query.weight.mul_(0.5)
+        assert (bert(input_ids, attention_mask=mask) - stock(bert, input_ids, mask)).abs().max() <= 1e-6
+    finally:
+        query.weight.copy_(original)
+
+
+def test_training_uses_stock_forward(bert, input_ids):
+    bert.train()
+    try:
+        bert.calls.clear()
+        with torch.no_grad():
+            bert(input_ids, attention_mask=torch.ones_like(input_ids))
+        assert bert.calls == []
+    finally:
+        bert.eval()
@@ -0,0 +1,95 @@
+import copy
+import threading
+
+import numpy as np
+import pytest
+
+from audio import EpisodeProject, LoopedAsset, Timeline
+
+RATE = 24000
+
+
+def tone(seconds, freq):
+    t = np.arange(int(round(seconds * RATE))) / RATE
+    return (0.1 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def lay_out(stems):
+    timeline = Timeline(RATE)
+    entries = []
+    for i, audio in enumerate(stems):
+        clip = timeline.add_speech(audio)
+        entries.append({'index': i, 'start': clip.start, 'end': clip.end})
+    return timeline, entries
+
+
+def test_splice_keeps_the_new_length_when_regions_nearly_touch(tmp_path):
+    old_stems = [tone(5, 200), tone(4.05, 300), tone(5, 400), tone(5, 500)]
+    old, old_entries = lay_out(old_stems)
+    project = EpisodeProject(str(tmp_path), RATE)
+    mixdown = project.open_mixdown(len(old))
+    for start, block in old.blocks():
+        mixdown[start:start + len(block)] = block
+    mixdown.flush()
+    project.data.update(segments=old_entries, length=len(old))
+
+    new_stems = list(old_stems)
+    new_stems[0], new_stems[2] = tone(5, 250), tone(5, 450)
+    new, new_entries = lay_out(new_stems)
+    # Padded by the 2 s music crossfade, the two runs end up 1200 samples apart
+    regions = project.regions([0, 2], new_entries, len(new), 2 * RATE)
+    spliced = np.concatenate([np.array(b) for b in project.splice(new, regions, 0.0)])
+
+    assert len(spliced) == len(new)
+    expected = np.concatenate([b.copy() for _, b in new.blocks()])
+    np.testing.assert_allclose(spliced, expected, atol=1e-6)
+
+
+@pytest.fixture
+def creator(tmp_path):
+    auto_podcast_creator = pytest.importorskip('auto_podcast_creator')
+    c = auto_podcast_creator.AutoPodcastCreator.__new__(auto_podcast_creator.AutoPodcastCreator)
+    c.SAMPLE_RATE = RATE
+    c.OUTPUT_ROOT = str(tmp_path)
+    c.ready = threading.Event()
+    c.ready.set()
+    c._podcast_crew = None
+
+    def generate_speech(text, voice_type, accent, speed):
+        return tone(0.02 * len(text), 150 + len(text) % 200)
+
+    beds = {mood: LoopedAsset(mood, (0.05 * np.random.default_rng(seed).standard_normal(3 * RATE)).astype(np.float32))
+            for seed, mood in enumerate(('calm', 'upbeat'))}
+    c.generate_speech = generate_speech
+    c.get_background_music = beds.get
+    return c
+
+
+@pytest.mark.parametrize('index, edit', [
+    (1, {'content': 'Host: Much shorter now.'}),
+    # Splits the calm bed; it restarts after the edited segment
+    (2, {'music': {'mood': 'upbeat', 'volume': -20}}),
+])
+def test_reexport_matches_a_full_render(creator, tmp_path, index, edit):
+    script = {'title': 'T', 'description': 'D', 'segments': [
+        {'title': f'S{i}', 'content': f'Host: Segment {i} has this much to say. ' * (1 + i % 3),
+         'music': {'mood': 'calm' if i < 5 else 'upbeat', 'volume': -20}} for i in range(8)]}
+    creator.create_full_podcast('T', 0, add_music=True, output_formats=['wav'], job_id='ep',
+                                script=copy.deepcopy(script))
+
+    edited = copy.deepcopy(script)
+    edited['segments'][index].update(edit)
+    result = creator.reexport('ep', copy.deepcopy(edited))
+    assert result['rerendered'] == [index]
+    spliced = np.load(tmp_path / 'ep' / 'mixdown.npy')
+
+    creator.OUTPUT_ROOT = str(tmp_path / 'full')
+    creator.create_full_podcast('T', 0, add_music=True, output_formats=['wav'], job_id='ep',
+                                script=copy.deepcopy(edited))
+    full = np.load(tmp_path / 'full' / 'ep' / 'mixdown.npy')
+    gains = [EpisodeProject(str(d)).load().data['mix']['gain_db'] for d in (tmp_path / 'ep', tmp_path / 'full' / 'ep')]
+
+    # The calm bed plays on from a new position after the edit, through segment 4,
+    # so the segments after the edited one must be remixed too
+    assert len(spliced) == len(full)
+    np.testing.assert_allclose(spliced, full * 10 ** ((gains[0] - gains[1]) / 20), atol=1e-5)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+istftnet = pytest.importorskip('istftnet')
+
+# Generator settings: gen_istft_n_fft=20, gen_istft_hop_size=5
+N_FFT, HOP = 20, 5
+TOLERANCE = 1.9e-6
+
+
+@pytest.fixture
+def stfts():
+    return (istftnet.TorchSTFT(filter_length=N_FFT, hop_length=HOP, win_length=N_FFT),
+            istftnet.ConvSTFT(filter_length=N_FFT, hop_length=HOP, win_length=N_FFT))
+
+
+@pytest.fixture
+def signal():
+    generator = torch.Generator().manual_seed(0)
+    return torch.rand(2, 24000, generator=generator) * 2 - 1
+
+
+def test_transform_matches_torch_stft(stfts, signal):
+    reference, conv = stfts
+    magnitude, phase = reference.transform(signal)
+    conv_magnitude, conv_phase = conv.transform(signal)
+    assert conv_magnitude.shape == magnitude.shape
+    assert (conv_magnitude - magnitude).abs().max() <= TOLERANCE
+    # Compare phase as a point on the unit circle, so +/-pi count as the same angle
+    error = (magnitude * (torch.exp(1j * conv_phase) - torch.exp(1j * phase))).abs()
+    assert error.max() <= TOLERANCE
+
+
+def test_inverse_matches_torch_istft(stfts, signal):
+    reference, conv = stfts
+    magnitude, phase = reference.transform(signal)
+    expected = reference.inverse(magnitude, phase)
+    result = conv.inverse(magnitude, phase)
+    assert result.shape == expected.shape
+    assert (result - expected).abs().max() <= TOLERANCE
+
+
+def test_round_trip_reconstructs_signal(stfts, signal):
+    _, conv = stfts
+    reconstruction = conv(signal)[:, 0]
+    np.testing.assert_allclose(reconstruction.numpy(), signal.numpy(), atol=TOLERANCE)
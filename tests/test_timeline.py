@@ -0,0 +1,40 @@
+import numpy as np
+
+from audio import AssetLibrary, Timeline
+
+
+def library(tmp_path):
+    assets = AssetLibrary(str(tmp_path))
+    assets.assets['music'] = {'calm': np.linspace(-0.5, 0.5, 1000, dtype=np.float32),
+                              'upbeat': np.full(700, 0.25, dtype=np.float32)}
+    return assets
+
+
+def test_music_returns_one_bed_per_mood(tmp_path):
+    assets = library(tmp_path)
+    assert assets.music('calm') is assets.music('Calm')
+    assert assets.music('calm') is not assets.music('upbeat')
+    assert assets.music('missing') is None
+
+
+def test_segments_sharing_a_mood_keep_one_bed_playing(tmp_path):
+    assets = library(tmp_path)
+    timeline = Timeline(sample_rate=1000)
+    regions = [(assets.music('calm'), 0, 3000, 0.5), (assets.music('calm'), 3200, 6000, 0.5),
+               (assets.music('upbeat'), 6200, 9000, 0.5)]
+    clips = timeline.add_music_beds(regions, crossfade=100)
+
+    assert [c.source.name for c in clips] == ['calm', 'upbeat']
+    # The calm bed runs on through the second segment instead of restarting
+    assert clips[0].start == 0 and clips[0].end >= 6200
+    assert clips[0].offset == 0
+
+
+
+def test_blocks_cover_the_requested_range(tmp_path):
+    timeline = Timeline(sample_rate=1000)
+    timeline.add_speech(np.ones(2500, dtype=np.float32))
+    full = np.concatenate([b.copy() for _, b in timeline.blocks(block_size=1024)])
+    part = np.concatenate([b.copy() for _, b in timeline.blocks(block_size=1024, start=700, stop=2100)])
+    assert len(full) == 2500
+    np.testing.assert_array_equal(part, full[700:2100])
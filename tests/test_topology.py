@@ -0,0 +1,28 @@
+from tts import topology
+from tts.topology import Topology, apply_saved, available_cpus
+
+
+def applied(monkeypatch, tmp_path, saved):
+    path = str(tmp_path / 'topology.json')
+    saved.save(path)
+    calls = []
+    monkeypatch.setattr(topology, '_applied', None)
+    monkeypatch.setattr(Topology, 'apply', lambda self, worker=0: calls.append((self, worker)))
+    apply_saved(path)
+    return calls
+
+
+def test_single_process_uses_every_core_unpinned(monkeypatch, tmp_path):
+    calls = applied(monkeypatch, tmp_path, Topology(4, 2, cores=[[0, 1], [2, 3], [4, 5], [6, 7]]))
+    (applied_topology, worker), = calls
+    assert worker == 0
+    assert applied_topology.processes == 1
+    assert applied_topology.threads == len(available_cpus())
+    assert not applied_topology.pin
+
+
+def test_single_process_topology_is_applied_as_saved(monkeypatch, tmp_path):
+    calls = applied(monkeypatch, tmp_path, Topology(1, 1, cores=[[0]]))
+    (applied_topology, _), = calls
+    assert (applied_topology.processes, applied_topology.threads, applied_topology.pin) == (1, 1, True)
+    assert applied_topology.cores == [[0]]
@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry.tracing import bind, current_trace, span, start_trace, stop_trace
+
+
+def test_concurrent_jobs_keep_their_own_traces():
+    both_started = threading.Barrier(2)
+    traces = {}
+
+    def work(name):
+        with span(f"{name}.work"):
+            pass
+
+    def job(name):
+        start_trace(name)
+        both_started.wait()
+        with span(f"{name}.stage"):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(bind(work), [name, name]))
+            both_started.wait()
+        traces[name] = stop_trace()
+
+    threads = [threading.Thread(target=job, args=(name,)) for name in ('a', 'b')]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for name in ('a', 'b'):
+        names = {s.name for s in traces[name].spans}
+        assert names == {f"{name}.stage", f"{name}.work"}, names
+        assert len(traces[name].spans) == 3
+
+
+def test_bound_work_records_into_the_submitting_trace():
+    trace = start_trace('job')
+    try:
+        def work():
+            with span('pool.work'):
+                return current_trace()
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            assert pool.submit(bind(work)).result() is trace
+            assert pool.submit(work).result() is None
+    finally:
+        stop_trace()
+    assert [s.name for s in trace.spans] == ['pool.work']
@@ -0,0 +1,3 @@
+from .dialogue import Chunk, DialogueRenderer, VoiceCast, accent_of, known_labels, split_text, split_turns
+
+__all__ = ['Chunk', 'DialogueRenderer', 'VoiceCast', 'accent_of', 'known_labels', 'split_text', 'split_turns']
@@ -0,0 +1,228 @@
+"""Multi-speaker dialogue rendering.
+
+Segments are split into speaker turns, either from their "lines" or from
+"Speaker: text" lines in their content whose label is a known speaker,
+and long turns into sentence chunks the model can take in one pass. A
+VoiceCast maps each speaker role to a voice. The DialogueRenderer
+synthesizes the chunks grouped by voice, so each voicepack is resolved
+once and stays hot, then puts every segment back together in script
+order with a short pause between a speaker's sentences and a longer one
+when the speaker changes.
+"""
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from audio.assets import SAMPLE_RATE
+from telemetry.tracing import span
+
+TURN_GAP_SECONDS = 0.35
+LINE_GAP_SECONDS = 0.12
+
+# Kokoro takes at most 510 phoneme tokens per pass; English runs at
+# roughly one token per character, so chunks stay well under that
+MAX_CHUNK_CHARS = 400
+
+# Voices given to further speakers when the cast does not name them
+AMERICAN_CAST = ["Bella (American Female)", "Adam (American Male)", "Sarah (American Female)",
+                 "Michael (American Male)", "Nicole (American Female)", "Sky (American Female)"]
+BRITISH_CAST = ["Emma (British Female)", "George (British Male)", "Isabella (British Female)",
+                "Lewis (British Male)"]
+
+# "Host: ..." at the start of a line; labels are at most three words.
+# Whether one starts a turn is decided by known_labels
+_LABEL = re.compile(r"^\s*([A-Z][\w.'-]*(?: [\w.'-]+){0,2})\s*:\s*(.+)$")
+_SENTENCE = re.compile(r'(?<=[.!?…])\s+')
+
+Synthesize = Callable[[str, str, str, float], Optional[np.ndarray]]
+
+
+class Chunk:
+    """One piece of text spoken by one voice, in script order within its segment"""
+
+    __slots__ = ('segment', 'order', 'speaker', 'voice', 'accent', 'text', 'speed')
+
+    def __init__(self, segment: int, order: int, speaker: str, voice: str, accent: str, text: str, speed: float):
+        self.segment = segment
+        self.order = order
+        self.speaker = speaker
+        self.voice = voice
+        self.accent = accent
+        self.text = text
+        self.speed = speed
+
+
+def _role(speaker: str) -> str:
+    return ' '.join(str(speaker).lower().split())
+
+
+def known_labels(labels: List[str], default: str, speakers: Iterable[str] = ()) -> Set[str]:
+    """Roles whose labels start a turn, as opposed to prose like "Tip 1:" or "Note:".
+
+    A label is a speaker when it is the segment's speaker, one of the cast's
+    named speakers, or comes back in at least two turns that are not next to
+    each other.
+    """
+    known = {_role(default)} | {_role(s) for s in speakers}
+    last: Dict[str, int] = {}
+    for position, label in enumerate(map(_role, labels)):
+        # Another label in between, so this is a reply rather than a list
+        if label in last and position - last[label] > 1:
+            known.add(label)
+        last[label] = position
+    return known
+
+
+def split_turns(segment: Dict, speakers: Iterable[str] = ()) -> List[Tuple[str, str]]:
+    """(speaker, text) turns of a segment, from its lines or labelled content
+
+    Only "X: text" lines whose label is a known speaker (see known_labels)
+    start a turn; any other line, label included, is spoken as written by
+    the current speaker.
+    """
+    default = str(segment.get('speaker') or 'Host')
+    lines = segment.get('lines')
+    if isinstance(lines, list):
+        turns = [[str(line.get('speaker') or default), str(line.get('text', ''))]
+                 for line in lines if isinstance(line, dict)]
+    else:
+        raw_lines = str(segment.get('content', '')).splitlines()
+        matches = [_LABEL.match(raw) for raw in raw_lines]
+        known = known_labels([m.group(1) for m in matches if m], default, speakers)
+        turns = []
+        for raw, match in zip(raw_lines, matches):
+            if match and _role(match.group(1)) in known:
+                turns.append([match.group(1), match.group(2)])
+            elif raw.strip():
+                # Other lines, labels and all, continue the current speaker
+                if turns:
+                    turns[-1][1] += ' ' + raw.strip()
+                else:
+                    turns.append([default, raw.strip()])
+    return [(speaker.strip(), ' '.join(text.split())) for speaker, text in turns if text.strip()]
+
+
+def split_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """Pack whole sentences into chunks of at most max_chars where possible"""
+    chunks, current = [], ''
+    for sentence in _SENTENCE.split(text.strip()):
+        while len(sentence) > max_chars:
+            # A single overlong sentence is cut at the last space that fits
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def accent_of(voice: str, default: str = 'American') -> str:
+    """Accent a voice was recorded in, from its display name"""
+    if '(British' in voice:
+        return 'British'
+    if '(American' in voice:
+        return 'American'
+    return default
+
+
+class VoiceCast:
+    """Maps speaker roles to voices.
+
+    Roles named in speaker_voices keep their voice; the first other speaker
+    gets the episode's voice and later ones the next unused voice from the
+    cast for the episode's accent.
+    """
+
+    def __init__(self, voice_type: str, accent: str = 'American', speaker_voices: Optional[Dict[str, str]] = None):
+        self.voice_type = voice_type
+        self.accent = accent
+        self.voices = {_role(k): v for k, v in (speaker_voices or {}).items()}
+        # Roles given a voice up front always count as speakers in split_turns
+        self.named = set(self.voices)
+        self._pool = BRITISH_CAST if accent == 'British' else AMERICAN_CAST
+
+    def voice_for(self, speaker: str) -> str:
+        role = _role(speaker)
+        if role not in self.voices:
+            used = set(self.voices.values())
+            if self.voice_type not in used:
+                self.voices[role] = self.voice_type
+            else:
+                self.voices[role] = next((v for v in self._pool if v not in used), self.voice_type)
+            print(f"Cast {speaker} as {self.voices[role]}")
+        return self.voices[role]
+
+
+class DialogueRenderer:
+    """Synthesizes segment chunks grouped by voice and reassembles them in order"""
+
+    def __init__(self, synthesize: Synthesize, sample_rate: int = SAMPLE_RATE,
+                 turn_gap: float = TURN_GAP_SECONDS, line_gap: float = LINE_GAP_SECONDS,
+                 max_chars: int = MAX_CHUNK_CHARS):
+        self.synthesize = synthesize
+        self.sample_rate = sample_rate
+        self.turn_gap = int(round(turn_gap * sample_rate))
+        self.line_gap = int(round(line_gap * sample_rate))
+        self.max_chars = max_chars
+
+    def plan(self, index: int, segment: Dict, cast: VoiceCast, speed: float) -> List[Chunk]:
+        """Chunks for one segment, each with its speaker's voice"""
+        chunks = []
+        for speaker, text in split_turns(segment, cast.named):
+            voice = cast.voice_for(speaker)
+            for piece in split_text(text, self.max_chars):
+                chunks.append(Chunk(index, len(chunks), speaker, voice, accent_of(voice, cast.accent), piece, speed))
+        return chunks
+
+    def assemble(self, chunks: List[Chunk], audio: Dict[Tuple[int, int], np.ndarray]) -> Optional[np.ndarray]:
+        """Join one segment's chunk audio in order with pauses between them"""
+        parts, previous = [], None
+        for chunk in sorted(chunks, key=lambda c: c.order):
+            clip = audio.get((chunk.segment, chunk.order))
+            if clip is None:
+                continue
+            if previous is not None:
+                gap = self.line_gap if chunk.speaker == previous else self.turn_gap
+                parts.append(np.zeros(gap, dtype=np.float32))
+            parts.append(np.asarray(clip, dtype=np.float32))
+            previous = chunk.speaker
+        return np.concatenate(parts) if parts else None
+
+    def render(self, chunks: List[Chunk],
+               on_segment: Optional[Callable[[int, Optional[np.ndarray]], None]] = None) -> Dict[int, Optional[np.ndarray]]:
+        """Audio per segment index; on_segment fires as soon as a segment's last chunk is done"""
+        by_voice: Dict[Tuple[str, str], List[Chunk]] = {}
+        by_segment: Dict[int, List[Chunk]] = {}
+        for chunk in chunks:
+            by_voice.setdefault((chunk.voice, chunk.accent), []).append(chunk)
+            by_segment.setdefault(chunk.segment, []).append(chunk)
+        remaining = Counter(chunk.segment for chunk in chunks)
+
+        audio: Dict[Tuple[int, int], np.ndarray] = {}
+        segments: Dict[int, Optional[np.ndarray]] = {}
+        for (voice, accent), group in by_voice.items():
+            print(f"\nSynthesizing {len(group)} chunks with {voice} ({accent})")
+            with span("tts.voice", voice=voice, chunks=len(group)):
+                for chunk in group:
+                    clip = self.synthesize(chunk.text, voice, accent, chunk.speed)
+                    if clip is None:
+                        print(f"Warning: Failed to synthesize chunk {chunk.order} of segment {chunk.segment}")
+                    else:
+                        audio[(chunk.segment, chunk.order)] = clip
+                    remaining[chunk.segment] -= 1
+                    if remaining[chunk.segment] == 0:
+                        segments[chunk.segment] = self.assemble(by_segment[chunk.segment], audio)
+                        if on_segment is not None:
+                            on_segment(chunk.segment, segments[chunk.segment])
+        return segments
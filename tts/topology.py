@@ -0,0 +1,187 @@
+"""Process and thread topology for speech synthesis workers.
+
+A Topology says how many synthesis processes to run, how many torch
+intra-op and inter-op threads each one gets, and which cores each one is
+pinned to. Workers are spread across NUMA nodes and kept on one node each
+where they fit. benchmarks/autotune.py measures candidate topologies on
+the current machine and saves the fastest to topology.json, keyed by
+machine, so one file can hold results for several hardware generations.
+batch_render gives each worker process one slot of the saved topology.
+AutoPodcastCreator on its own (the interactive server) applies a
+single-process topology as saved, and widens one tuned for several
+processes to every available core, unpinned. Without a saved topology,
+torch keeps its defaults.
+"""
+import glob
+import json
+import os
+import platform
+from typing import Dict, List, Optional
+
+TOPOLOGY_FILE = os.environ.get(
+    'PODCAST_TOPOLOGY', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'topology.json'))
+
+# Topology applied in this process, so a second apply() is a no-op
+_applied = None
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on, honouring container and taskset limits"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _parse_cpulist(text: str) -> List[int]:
+    cpus = []
+    for part in text.strip().split(','):
+        if '-' in part:
+            lo, hi = part.split('-')
+            cpus.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def numa_nodes() -> List[List[int]]:
+    """Available CPUs grouped by NUMA node; one group where the kernel does not say"""
+    allowed = set(available_cpus())
+    nodes = []
+    for path in sorted(glob.glob('/sys/devices/system/node/node[0-9]*/cpulist')):
+        try:
+            with open(path) as f:
+                cpus = [c for c in _parse_cpulist(f.read()) if c in allowed]
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(allowed)]
+
+
+def machine_key() -> str:
+    """Identifies the hardware a topology was tuned on"""
+    model = platform.processor() or platform.machine()
+    try:
+        with open('/proc/cpuinfo') as f:
+            model = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')), model)
+    except OSError:
+        pass
+    return f"{model} / {len(available_cpus())} cpus / {len(numa_nodes())} nodes"
+
+
+def plan_cores(processes: int, threads: int) -> List[List[int]]:
+    """Cores for each worker: round-robin over NUMA nodes, contiguous within a node"""
+    nodes = [list(cpus) for cpus in numa_nodes()]
+    plan, placed = [], 0
+    for worker in range(processes):
+        # Prefer the node with the most free cores that can hold the whole worker
+        fits = [n for n in nodes if len(n) >= threads]
+        node = max(fits or nodes, key=len)
+        if node:
+            plan.append(node[:threads])
+            del node[:threads]
+            placed += 1
+        else:
+            # More workers than cores; share the placed workers' cores in turn
+            plan.append(list(plan[worker % placed]))
+    return plan
+
+
+class Topology:
+    """How synthesis work is laid out over this machine's cores"""
+
+    def __init__(self, processes: int = 1, threads: int = 1, interop_threads: int = 1,
+                 cores: Optional[List[List[int]]] = None, pin: bool = True, results: Optional[Dict] = None):
+        self.processes = processes
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.pin = pin
+        self.cores = cores if cores is not None else plan_cores(processes, threads)
+        # What the autotuner measured for this topology
+        self.results = results or {}
+
+    def to_dict(self) -> Dict:
+        return {'processes': self.processes, 'threads': self.threads, 'interop_threads': self.interop_threads,
+                'pin': self.pin, 'cores': self.cores, 'results': self.results}
+
+    def __repr__(self):
+        return (f"Topology({self.processes} x {self.threads} threads, interop {self.interop_threads}, "
+                f"{'pinned' if self.pin else 'unpinned'})")
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['Topology']:
+        """The topology saved for this machine, or None if it has not been tuned"""
+        path = path or TOPOLOGY_FILE
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f).get(machine_key())
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable topology file {path}: {str(e)}")
+            return None
+        if entry is None:
+            print(f"No tuned topology for this machine in {path}; run python -m benchmarks.autotune")
+            return None
+        return cls(**entry)
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Store this topology for this machine, keeping other machines' entries"""
+        path = path or TOPOLOGY_FILE
+        saved = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f)
+        saved[machine_key()] = self.to_dict()
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp, path)
+        return path
+
+    def apply(self, worker: int = 0) -> None:
+        """Set torch threads and pin this process to the cores of the given worker slot"""
+        global _applied
+        import torch
+        torch.set_num_threads(self.threads)
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError:
+            # Only possible before the first parallel op in this process
+            pass
+        cores = self.cores[worker % len(self.cores)] if self.cores else []
+        if self.pin and cores and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cores)
+            except OSError as e:
+                print(f"Could not pin worker {worker} to cores {cores}: {str(e)}")
+        _applied = self
+        print(f"Applied {self} to worker {worker}" + (f" on cores {cores}" if self.pin and cores else ""))
+
+
+def single_process(topology: Topology) -> Topology:
+    """The layout for a process that runs alone, such as the interactive server.
+
+    A topology tuned for several worker processes would confine it to one
+    worker's cores, leaving its encoder and enhancement threads and every
+    other core idle; it gets all available cores, unpinned, instead.
+    """
+    if topology.processes <= 1:
+        return topology
+    return Topology(1, len(available_cpus()), topology.interop_threads, cores=[available_cpus()], pin=False,
+                    results=topology.results)
+
+
+def apply_saved(path: Optional[str] = None) -> Optional[Topology]:
+    """Apply the tuned topology to a single process, once; later calls return what was applied.
+
+    Batch workers apply their own slot with Topology.apply(worker) first.
+    """
+    if _applied is not None:
+        return _applied
+    topology = Topology.load(path)
+    if topology is not None:
+        topology = single_process(topology)
+        topology.apply()
+    return topology